@@ -1,17 +1,15 @@
 import os
 import platform
 import sys
-import requests
 import logging
 import logging.handlers
-import splunk
 import time
-import md5
-import json
-import re
-import splunklib.client as client
 from splunklib.modularinput import *
 
+# requests, splunk, splunklib.client, md5, json and re are imported where they
+# are used: Splunk runs this script with --scheme on every load of the Data
+# Inputs page and that should not pay for loading the HTTP and SDK stacks.
+
 # ENVIRONMENTAL INFORMATION
 __author__ = 'Coen Meerbeek'
 _MI_APP_NAME = 'TA-octopus_deploy'
@@ -24,135 +22,155 @@ if _SPLUNK_HOME is None:
 _OPERATING_SYSTEM = platform.system()
 _APP_HOME = _SPLUNK_HOME + '/etc/apps/' + _MI_APP_NAME
 _APP_BIN = _APP_HOME + '/bin'
+_CHECKPOINT_DIR = os.path.join(_SPLUNK_HOME, 'var', 'lib', 'splunk', 'modinputs', _MI_APP_NAME)
 
 if _OPERATING_SYSTEM.lower() == 'windows':
     _IS_WINDOWS = True
     _APP_HOME.replace('/', '\\')
     _APP_BIN.replace('/', '\\')
 
+
+def get_app_version():
+    """
+    Return the version from default/app.conf or None if it can't be read
+    """
+    app_conf = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'default', 'app.conf')
+    try:
+        with open(app_conf, 'r') as f:
+            for line in f:
+                key, sep, value = line.partition('=')
+                if sep and key.strip() == 'version':
+                    return value.strip()
+    except IOError:
+        pass
+
+    return None
+
 ###############################
-### Octopus Deploy class ##
+####### Logger functions ######
 ###############################
 
 
-class OctopusDeploy(Script):
-    # Define some global variables
-    MASK         = "<nothing to see here>"
-    CLEAR_APIKEY = None
+def setup_logging():
+    """
+    Setup logging
 
-    ###############################
-    ####### Logger functions ######
-    ###############################
+    Log is written to /opt/splunk/var/log/splunk/octopus.log
+    """
+    import splunk
 
+    logger = logging.getLogger('splunk.octopus')
+    if logger.handlers:
+        # Already set up by an earlier call in this process
+        return logger
+    logger.setLevel(logging.INFO)
+    SPLUNK_HOME = os.environ['SPLUNK_HOME']
+
+    LOGGING_DEFAULT_CONFIG_FILE = os.path.join(_SPLUNK_HOME, 'etc', 'log.cfg')
+    LOGGING_LOCAL_CONFIG_FILE = os.path.join(
+        _SPLUNK_HOME, 'etc', 'log-local.cfg')
+    LOGGING_STANZA_NAME = 'python'
+    LOGGING_FILE_NAME = "octopus.log"
+    BASE_LOG_PATH = os.path.join('var', 'log', 'splunk')
+    LOGGING_FORMAT = "%(asctime)s %(levelname)-s\t%(module)s:%(lineno)d - %(message)s"
+
+    splunk_log_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(_SPLUNK_HOME, BASE_LOG_PATH, LOGGING_FILE_NAME), mode='a')
+    splunk_log_handler.setFormatter(logging.Formatter(LOGGING_FORMAT))
+    logger.addHandler(splunk_log_handler)
+    splunk.setupSplunkLogger(logger, LOGGING_DEFAULT_CONFIG_FILE,
+                             LOGGING_LOCAL_CONFIG_FILE, LOGGING_STANZA_NAME)
+
+    return logger
 
-    def setup_logging():
-        """
-        Setup logging
+###############################
+### Checkpointing functions ###
+###############################
 
-        Log is written to /opt/splunk/var/log/splunk/octopus.log
-        """
-        logger = logging.getLogger('splunk.octopus')
-        logger.setLevel(logging.INFO)
-        SPLUNK_HOME = os.environ['SPLUNK_HOME']
-
-        LOGGING_DEFAULT_CONFIG_FILE = os.path.join(_SPLUNK_HOME, 'etc', 'log.cfg')
-        LOGGING_LOCAL_CONFIG_FILE = os.path.join(
-            _SPLUNK_HOME, 'etc', 'log-local.cfg')
-        LOGGING_STANZA_NAME = 'python'
-        LOGGING_FILE_NAME = "octopus.log"
-        BASE_LOG_PATH = os.path.join('var', 'log', 'splunk')
-        LOGGING_FORMAT = "%(asctime)s %(levelname)-s\t%(module)s:%(lineno)d - %(message)s"
-
-        splunk_log_handler = logging.handlers.RotatingFileHandler(
-            os.path.join(_SPLUNK_HOME, BASE_LOG_PATH, LOGGING_FILE_NAME), mode='a')
-        splunk_log_handler.setFormatter(logging.Formatter(LOGGING_FORMAT))
-        logger.addHandler(splunk_log_handler)
-        splunk.setupSplunkLogger(logger, LOGGING_DEFAULT_CONFIG_FILE,
-                                 LOGGING_LOCAL_CONFIG_FILE, LOGGING_STANZA_NAME)
+# creates a checkpoint file to store it's value
 
-        return logger
 
-    ###############################
-    ### Checkpointing functions ###
-    ###############################
+def save_checkpoint(checkpoint, checkpoint_dir, event_id):
+    logger = setup_logging()
+    chk_file = os.path.join(checkpoint_dir, checkpoint)
+    logger.info("save_checkpoint: " + chk_file)
 
-    # creates a checkpoint file to store it's value
+    try:
+        with open(chk_file, 'w') as f:
+            f.write(event_id.strip(' \t\n\r'))
+    except IOError as exception:
+        logger.error('Could not save checkpoint to: ' + chk_file)
 
+# returns true if the checkpoint file exists
 
-    def save_checkpoint(checkpoint, checkpoint_dir, event_id):
-        logger = setup_logging()
-        chk_file = os.path.join(checkpoint_dir, checkpoint)
-        logger.info("save_checkpoint: " + chk_file)
 
-        try:
-            with open(chk_file, 'w') as f:
-                f.write(event_id.strip(' \t\n\r'))
-        except IOError as exception:
-            logger.error('Could not save checkpoint to: ' + chk_file)
+def exists_checkpoint(checkpoint, checkpoint_dir):
+    chk_file = os.path.join(checkpoint_dir, checkpoint)
 
-    # returns true if the checkpoint file exists
+    try:
+        open(chk_file, "r").close()
+    except:
+        # assume that this means the checkpoint is not there
+        return False
 
+    return True
 
-    def exists_checkpoint(checkpoint, checkpoint_dir):
-        chk_file = os.path.join(checkpoint_dir, checkpoint)
+# returns last checkpoint or 0
 
-        try:
-            open(chk_file, "r").close()
-        except:
-            # assume that this means the checkpoint is not there
-            return False
 
-        return True
+def load_checkpoint(checkpoint, checkpoint_dir):
+    logger = setup_logging()
+    chk_file = os.path.join(checkpoint_dir, checkpoint)
+    logger.info("load_checkpoint: " + chk_file)
 
-    # returns last checkpoint or 0
+    try:
+        f = open(chk_file, "r")
+        event_id = int(f.readline().strip(' \t\n\r'))
+        f.close()
+        return event_id
+    except:
+        return 0
 
 
-    def load_checkpoint(checkpoint, checkpoint_dir):
-        logger = setup_logging()
-        chk_file = os.path.join(checkpoint_dir, checkpoint)
-        logger.info("load_checkpoint: " + chk_file)
+###############################
+### Octopus Deploy class ##
+###############################
+
+
+class OctopusDeploy(Script):
+    # Define some global variables
+    MASK         = "<nothing to see here>"
+    CLEAR_APIKEY = None
+
+    # Start streaming the first stanza before the whole configuration is read
+    streaming_input_definition = True
+
+    def getEntries(self, endpoint, hostname, verify_ssl, use_checkpoint, checkpoint, session_key):
+        """
+        Yield the new items of each page of the endpoint, one page at a time,
+        with the checkpoint ID to save once they are written (or None)
+        """
+        import octopus_api
 
-        try:
-            f = open(chk_file, "r")
-            event_id = int(f.readline().strip(' \t\n\r'))
-            f.close()
-            return event_id
-        except:
-            return 0
-
-    def getEntries(endpoint, hostname, verify_ssl, use_checkpoint, checkpoint, session_key):
         logger = setup_logging()
         logger.info("getEntries: " + time.strftime("%d-%m-%Y %H:%M:%S"))
-        octopus_url = "%s/api/%s" % (hostname, endpoint)
         if int(verify_ssl) == 1:
             verify_ssl_bool = True
         else:
             verify_ssl_bool = False
 
         if int(use_checkpoint) == 1:
-            checkpoint_dir = os.path.join(
-                _SPLUNK_HOME, 'var', 'lib', 'splunk', 'modinputs', 'TA-octopus_deploy')
-            last_checkpoint_id = load_checkpoint(checkpoint, checkpoint_dir)
-        data = []
+            last_checkpoint_id = load_checkpoint(checkpoint, _CHECKPOINT_DIR)
+        new_checkpoint_id = None
 
         try:
             self.CLEAR_APIKEY = self.get_password(session_key, endpoint)
         except Exception as e:
             logger.error("Error decrypting api key: %s" % str(e))
 
-        while True:
-            response = requests.get(
-                url=octopus_url,
-                headers={
-                    "X-Octopus-ApiKey": api_key,
-                },
-                verify=verify_ssl_bool,
-            )
-            response.raise_for_status()
-
-            # Handle response
-            json_response = json.loads(response.content)
-
+        # Pages are followed through their Page.Next links
+        for json_response in octopus_api.iter_pages(hostname, endpoint, self.CLEAR_APIKEY, verify_ssl_bool):
             # Get item ID from first item returned by the API which is the most
             # recent item
             if int(use_checkpoint) == 1:
@@ -160,13 +178,15 @@ class OctopusDeploy(Script):
                     if json_response['Links']['Page.Current'].split('=')[1][:1] == '0':
                         checkpoint_id = json_response[
                             'Items'][0]['Id'].split('-')[1]
-                        save_checkpoint(checkpoint, checkpoint_dir, checkpoint_id)
+                        # Saved by the caller once the events are written
+                        new_checkpoint_id = checkpoint_id
                 except Exception as exc:
-                    logger.error("use_checkpoint: " + exc)
+                    logger.error("use_checkpoint: " + str(exc))
                     break
 
             # Iterate deployments and print results to Splunk if it hasn't been
             # printed before
+            data = []
             for item in json_response['Items']:
                 # Get deployment ID
                 item_id = item['Id'].split('-')[1]
@@ -177,15 +197,27 @@ class OctopusDeploy(Script):
                 else:
                     data.append(item)
 
-            # Try to get next page if available, else write most recent deployment
-            # id and exit
-            try:
-                octopus_url = hostname + \
-                    re.sub(r'.*/api','/api',json_response['Links']['Page.Next'])
-            except Exception:
-                break
+            yield data, new_checkpoint_id
+
+    def scheme_cache_path(self):
+        # The scheme only changes with a new release of the TA, so cache it
+        # per app version next to the checkpoints.
+        version = get_app_version()
+        if version is None:
+            return None
+
+        return os.path.join(_CHECKPOINT_DIR, 'scheme-%s.xml' % version)
 
-        return data
+    def prune_scheme_cache(self, path):
+        # Remove the schemes cached by other versions of the TA
+        import glob
+
+        for stale_path in glob.glob(os.path.join(os.path.dirname(path), 'scheme-*.xml')):
+            if stale_path != path:
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
 
     def get_scheme(self):
         # Returns scheme.
@@ -233,7 +265,19 @@ class OctopusDeploy(Script):
 
         return scheme
 
+    def run(self, args):
+        if len(args) == 1:
+            # Streaming events: spill to disk instead of blocking the fetch
+            # when splunkd reads our stdout slower than Octopus delivers.
+            event_writer = SpillingEventWriter(spill_dir=os.path.join(_CHECKPOINT_DIR, 'spill'))
+            return self.run_script(args, event_writer, sys.stdin)
+
+        return super(OctopusDeploy, self).run(args)
+
     def validate_input(self, validation_definition):
+        import json
+        import requests
+
         logger = setup_logging()
         logger.info("validate_inputs: " + time.strftime("%d-%m-%Y %H:%M:%S"))
 
@@ -276,15 +320,16 @@ class OctopusDeploy(Script):
             raise ValueError("Invalid endpoint count: %s", ve.message)
 
     def encrypt_password(self, endpoint, api_key, session_key):
-        args = {'token':session_key}
+        import splunklib.client as client
+
+        args = {'token':session_key, 'output_mode':'json'}
         service = client.connect(**args)
         
         try:
             # If the credential already exists, delete it.
-            for storage_password in service.storage_passwords:
-                if storage_password.username == endpoint:
-                    service.storage_passwords.delete(username=storage_password.username)
-                    break
+            for storage_password in service.storage_passwords.find(username=endpoint):
+                service.storage_passwords.delete(username=storage_password.username)
+                break
 
             # Create the credential.
             service.storage_passwords.create(api_key, endpoint)
@@ -292,64 +337,117 @@ class OctopusDeploy(Script):
         except Exception as e:
             raise Exception, "An error occurred updating credentials. Please ensure your user account has admin_all_objects and/or list_storage_passwords capabilities. Details: %s" % str(e)
 
-    def mask_password(self, session_key, endpoint):
+    def mask_passwords(self, session_key, masks):
+        import splunklib.binding as binding
+        import splunklib.client as client
+
         try:
-            args = {'token':session_key}
+            # The state returned by update() is cached, so the refresh
+            # after each update doesn't need another round trip. The updates
+            # run concurrently and reuse the pooled connections.
+            args = {'token':session_key, 'output_mode':'json', 'state_cache_ttl':60,
+                    'handler':binding.pooling_handler(max_idle=4)}
             service = client.connect(**args)
-            kind, input_name = self.input_name.split("://")
-            item = service.inputs.__getitem__((input_name, kind))
-            
-            kwargs = {
-                "endpoint": endpoint,
-                "api_key": self.MASK
-            }
-            item.update(**kwargs).refresh()
-            
+
+            updates = []
+            for input_name, endpoint in masks:
+                kind, name = input_name.split("://")
+                item = service.inputs.__getitem__((name, kind))
+
+                kwargs = {
+                    "endpoint": endpoint,
+                    "api_key": self.MASK
+                }
+                updates.append((item, kwargs))
+            service.update_entities(updates, max_workers=4, refresh=True)
+
         except Exception as e:
             raise Exception("Error updating inputs.conf: %s" % str(e))
 
     def get_password(self, session_key, endpoint):
-        args = {'token':session_key}
+        import octopus_api
+        import splunklib.client as client
+
+        args = {'token':session_key, 'output_mode':'json'}
         service = client.connect(**args)
 
         # Retrieve the api_key from the storage/passwords endpoint 
-        for storage_password in service.storage_passwords:
-            if storage_password.username == endpoint:
-                return storage_password.content.clear_password
+        return octopus_api.get_api_key(service, endpoint)
+
+    def stored_password(self, session_key, endpoint):
+        # Returns the api_key stored for the endpoint, or None if there is
+        # none or it cannot be read
+        try:
+            return self.get_password(session_key, endpoint)
+        except Exception:
+            return None
 
     def stream_events(self, inputs, ew):
         # Splunk Enterprise calls the modular input,
         # streams XML describing the inputs to stdin,
         # and waits for XML on stdout describing events.
+        import functools
+        import json
+        import md5
+
         logger = setup_logging()
         logger.info("stream_events: " + time.strftime("%d-%m-%Y %H:%M:%S"))
 
-        for self.input_name, self.input_item in inputs.inputs.iteritems():
-            session_key = self._input_definition.metadata["session_key"]
-            endpoint = self.input_item['endpoint']
-            hostname = self.input_item['hostname']
-            verify_ssl = self.input_item['verify_ssl']
-            api_key = self.input_item['api_key']
-            use_checkpoint = self.input_item['use_checkpoint']
-            checkpoint = md5.new(self.input_name).hexdigest()
-
-            try:
-                # If the api_key is not masked, mask it.
-                if api_key != self.MASK:
-                    self.encrypt_password(endpoint, api_key, session_key)
-                    self.mask_password(session_key, endpoint)
-            except Exception as e:
-                logger.error("Error setting password: %s" % str(e))
-
-            data = getEntries(endpoint, hostname, verify_ssl,
-                              use_checkpoint, checkpoint, session_key)
-
-            for d in data:
-                event = Event()
-                event.stanza = input_name
-                event.data = json.dumps(d)
-
-                ew.write_event(event)
+        session_key = self._input_definition.metadata["session_key"]
+        # Stanzas whose api_key was already stored encrypted by an earlier
+        # run but is still in clear text in inputs.conf; masked together
+        # once all inputs ran.
+        masks = []
+
+        try:
+            for self.input_name, self.input_item in inputs.iter_inputs():
+                endpoint = self.input_item['endpoint']
+                hostname = self.input_item['hostname']
+                verify_ssl = self.input_item['verify_ssl']
+                api_key = self.input_item['api_key']
+                use_checkpoint = self.input_item['use_checkpoint']
+                checkpoint = md5.new(self.input_name).hexdigest()
+
+                try:
+                    # If the api_key is not masked, store it encrypted and
+                    # mask it right away, so it is in clear text in
+                    # inputs.conf no longer than it takes to do so.
+                    if api_key != self.MASK:
+                        if self.stored_password(session_key, endpoint) == api_key:
+                            masks.append((self.input_name, endpoint))
+                        else:
+                            self.encrypt_password(endpoint, api_key, session_key)
+                            self.mask_passwords(session_key, [(self.input_name, endpoint)])
+                except Exception as e:
+                    logger.error("Error setting password: %s" % str(e))
+
+                # Each page is written before the next one is fetched, so only
+                # one page of the feed is held in memory
+                checkpoint_id = None
+                for data, checkpoint_id in self.getEntries(endpoint, hostname, verify_ssl,
+                                                           use_checkpoint, checkpoint, session_key):
+                    for d in data:
+                        event = Event()
+                        event.stanza = self.input_name
+                        event.data = json.dumps(d)
+
+                        ew.write_event(event)
+
+                # Only commit the checkpoint once Splunk has the events, including
+                # any that were spilled to disk while the output was congested.
+                if checkpoint_id is not None:
+                    ew.call_when_written(
+                        functools.partial(save_checkpoint, checkpoint, _CHECKPOINT_DIR, checkpoint_id))
+
+                # How far the output fell behind while this input was fetched
+                if isinstance(ew, QueuedEventWriter):
+                    logger.info("event writer after %s: %s" % (self.input_name, ew.metrics()))
+        finally:
+            if masks:
+                try:
+                    self.mask_passwords(session_key, masks)
+                except Exception as e:
+                    logger.error("Error setting password: %s" % str(e))
 
 if __name__ == "__main__":
     sys.exit(OctopusDeploy().run(sys.argv))
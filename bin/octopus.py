@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import json
+import sys
+from collections import OrderedDict
+
+from splunklib.searchcommands import dispatch, GeneratingCommand, Configuration, Option, validators
+import octopus_api
+
+__author__ = 'Coen Meerbeek'
+
+
+@Configuration(pipelined=True)
+class OctopusCommand(GeneratingCommand):
+    """ Queries the Octopus Deploy API at search time.
+
+    ##Syntax
+
+    .. code-block::
+        octopus endpoint=<string> [state=<string>] [hostname=<url>] [verify_ssl=<bool>] [count=<int>] [prefetch=<int>]
+
+    ##Description
+
+    Returns the items of an Octopus Deploy API collection, one result per item. The hostname, SSL verification setting
+    and API key of the modular input that streams **endpoint** are used unless **hostname** or **verify_ssl** are given.
+    Results are sent to Splunk page by page, as the pages arrive, while the next pages are fetched in the background.
+
+    ##Example
+
+    .. code-block::
+        | octopus endpoint=tasks state=Executing
+
+    """
+    endpoint = Option(
+        doc='''
+        **Syntax:** **endpoint=***<string>*
+        **Description:** API collection to query, as configured on a modular input''',
+        require=True)
+
+    state = Option(
+        doc='''
+        **Syntax:** **state=***<string>*
+        **Description:** Comma separated list of task states to return, sent as the states query parameter''')
+
+    hostname = Option(
+        doc='''
+        **Syntax:** **hostname=***<url>*
+        **Description:** URI of the Octopus Deploy environment. Default: the hostname of the modular input''')
+
+    verify_ssl = Option(
+        doc='''
+        **Syntax:** **verify_ssl=***<bool>*
+        **Description:** Verify SSL certificates. Default: the setting of the modular input''',
+        validate=validators.Boolean())
+
+    count = Option(
+        doc='''
+        **Syntax:** **count=***<int>*
+        **Description:** Maximum number of results to return; 0 returns all of them. Default: 10000''',
+        default=10000, validate=validators.Integer(0))
+
+    prefetch = Option(
+        doc='''
+        **Syntax:** **prefetch=***<int>*
+        **Description:** Number of pages to fetch ahead of the results being returned; 0 fetches each page when
+        the previous one has been returned. Default: 2''',
+        default=2, validate=validators.Integer(0))
+
+    def generate(self):
+        settings = octopus_api.find_input(self.service, self.endpoint) or {}
+
+        hostname = self.hostname or settings.get('hostname')
+        if not hostname:
+            raise ValueError('No modular input streams endpoint {}; specify hostname'.format(self.endpoint))
+
+        verify_ssl = self.verify_ssl
+        if verify_ssl is None:
+            verify_ssl = int(settings.get('verify_ssl', 1)) == 1
+
+        api_key = octopus_api.get_api_key(self.service, self.endpoint)
+        if api_key is None:
+            raise ValueError('No API key is stored for endpoint {}'.format(self.endpoint))
+
+        params = {'states': self.state} if self.state else None
+        pages = octopus_api.iter_pages(hostname, self.endpoint, api_key, verify_ssl, params, self.prefetch)
+        remaining = self.count or None
+
+        try:
+            for json_response in pages:
+                for record in _page_records(json_response['Items']):
+                    yield record
+
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining == 0:
+                            return
+
+                # Hand each page to Splunk as soon as it is complete
+                self.flush()
+        finally:
+            pages.close()
+
+
+def _page_records(items):
+    """ Returns the records for the items of a page: _raw followed by the sorted union of the item fields
+
+    The record writer takes the field names of a chunk from its first record, and a page is sent as one chunk, so
+    every record of a page carries every field of the page; fields an item lacks are None.
+    """
+    fieldnames = sorted(set().union(*items) - {'_raw'})
+    records = []
+    for item in items:
+        record = OrderedDict()
+        record['_raw'] = json.dumps(item)
+        for fieldname in fieldnames:
+            record[fieldname] = item.get(fieldname)
+        records.append(record)
+    return records
+
+dispatch(OctopusCommand, sys.argv, sys.stdin, sys.stdout, __name__)
@@ -0,0 +1,187 @@
+import json
+import re
+import threading
+import time
+import Queue
+from collections import OrderedDict
+
+# Octopus Deploy API access shared by the modular input and the search
+# commands. requests is imported where it is used, for the same reason the
+# modular input imports it lazily.
+
+__author__ = 'Coen Meerbeek'
+_MI_KIND = 'TA-octopus_deploy'
+
+
+def api_url(hostname, path):
+    """
+    Return the URL of an API resource, e.g. api_url(hostname, 'tasks')
+    """
+    return "%s/api/%s" % (hostname, path)
+
+
+def get_api_key(service, endpoint):
+    """
+    Return the clear text API key stored for endpoint in storage/passwords,
+    or None if there is none
+    """
+    for storage_password in service.storage_passwords.find(username=endpoint):
+        return storage_password.content.clear_password
+
+    return None
+
+
+def find_input(service, endpoint):
+    """
+    Return the settings (hostname, verify_ssl, ...) of the first modular
+    input stanza that streams endpoint, or None if there is none
+    """
+    for item in service.inputs.list(_MI_KIND):
+        if item.content.get('endpoint') == endpoint:
+            return item.content
+
+    return None
+
+
+def get_page(url, api_key, verify_ssl, params=None, session=None):
+    """
+    Return the parsed JSON of one API page
+    """
+    import requests
+
+    response = (session or requests).get(
+        url=url,
+        headers={
+            "X-Octopus-ApiKey": api_key,
+        },
+        params=params,
+        verify=verify_ssl,
+    )
+    response.raise_for_status()
+
+    return json.loads(response.content)
+
+
+def iter_pages(hostname, endpoint, api_key, verify_ssl, params=None, prefetch=0):
+    """
+    Yield the parsed JSON of every page of an API collection, following the
+    Page.Next links
+
+    With prefetch > 0 the pages are fetched on a background thread that runs
+    up to prefetch pages ahead of the consumer. Closing the generator stops
+    the fetching.
+    """
+    import requests
+
+    session = requests.Session()
+
+    def pages():
+        url = api_url(hostname, endpoint)
+        page_params = params
+        while True:
+            json_response = get_page(url, api_key, verify_ssl, page_params, session)
+            yield json_response
+
+            # Try to get next page if available, the link carries the query
+            try:
+                url = hostname + \
+                    re.sub(r'.*/api', '/api', json_response['Links']['Page.Next'])
+                page_params = None
+            except Exception:
+                return
+
+    if prefetch <= 0:
+        for json_response in pages():
+            yield json_response
+        return
+
+    queue = Queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer is gone instead of blocking forever
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.5)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def fetch():
+        try:
+            for json_response in pages():
+                if not put((json_response, None)):
+                    return
+            put((None, None))
+        except Exception as e:
+            put((None, e))
+
+    fetcher = threading.Thread(target=fetch)
+    fetcher.daemon = True
+    fetcher.start()
+
+    try:
+        while True:
+            json_response, error = queue.get()
+            if error is not None:
+                raise error
+            if json_response is None:
+                return
+            yield json_response
+    finally:
+        stop.set()
+
+
+class ItemCache(object):
+    """
+    Least recently used cache of API items whose entries expire after a
+    time to live. Missing items are cached as None, so unknown IDs are not
+    asked for again until they expire.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return (True, item) for a live entry, else (False, None)
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[1] < time.time():
+                return False, None
+            self._entries[key] = entry
+            return True, entry[0]
+
+    def put(self, key, item, ttl=None):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (item, time.time() + (self.ttl if ttl is None else ttl))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def get_items(hostname, collection, ids, api_key, verify_ssl, batch_size=100, session=None):
+    """
+    Return a dict of the items of an API collection with the given IDs,
+    fetched with one ?ids=a,b,c request per batch_size IDs. IDs that do not
+    exist are left out.
+    """
+    url = api_url(hostname, collection)
+    ids = list(ids)
+    items = {}
+
+    for start in xrange(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        json_response = get_page(url, api_key, verify_ssl, {'ids': ','.join(batch), 'take': len(batch)}, session)
+        # Collections answer with a page of Items, some endpoints with a plain list
+        if isinstance(json_response, dict):
+            json_response = json_response['Items']
+        for item in json_response:
+            items[item['Id']] = item
+
+    return items
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+import sys
+
+from splunklib.searchcommands import dispatch, StreamingCommand, Configuration, Option, validators
+import octopus_api
+
+__author__ = 'Coen Meerbeek'
+
+# ID field, API collection and (item field, output field) pairs
+_LOOKUPS = (
+    ('ProjectId', 'projects', (('Name', 'ProjectName'), ('Slug', 'ProjectSlug'))),
+    ('EnvironmentId', 'environments', (('Name', 'EnvironmentName'),)),
+    ('ReleaseId', 'releases', (('Version', 'ReleaseVersion'), ('Assembled', 'ReleaseAssembled'))),
+)
+
+# Items resolved by this process, shared by every batch and invocation
+_CACHE = octopus_api.ItemCache(maxsize=10000)
+
+
+@Configuration(pipelined=True, distributed=False)
+class OctopusLookupCommand(StreamingCommand):
+    """ Adds live names and metadata from the Octopus Deploy API to results that carry Octopus IDs.
+
+    ##Syntax
+
+    .. code-block::
+        octopuslookup endpoint=<string> [hostname=<url>] [verify_ssl=<bool>] [batchsize=<int>] [ttl=<int>]
+
+    ##Description
+
+    Results with a ProjectId, EnvironmentId or ReleaseId field get ProjectName and ProjectSlug, EnvironmentName, or
+    ReleaseVersion and ReleaseAssembled fields. Results are handled in batches of **batchsize**: the distinct IDs of a
+    batch that are not cached are resolved with one request per collection, and the items are cached by the process
+    for **ttl** seconds. The hostname, SSL verification setting and API key of the modular input that streams
+    **endpoint** are used unless **hostname** or **verify_ssl** are given. The command runs on the search head, because
+    the modular input and its API key are read from the search head's configuration and storage/passwords.
+
+    ##Example
+
+    .. code-block::
+        sourcetype=octopus:deployments | octopuslookup endpoint=deployments | stats count by ProjectName
+
+    """
+    endpoint = Option(
+        doc='''
+        **Syntax:** **endpoint=***<string>*
+        **Description:** Endpoint of the modular input whose settings and API key are used''',
+        require=True)
+
+    hostname = Option(
+        doc='''
+        **Syntax:** **hostname=***<url>*
+        **Description:** URI of the Octopus Deploy environment. Default: the hostname of the modular input''')
+
+    verify_ssl = Option(
+        doc='''
+        **Syntax:** **verify_ssl=***<bool>*
+        **Description:** Verify SSL certificates. Default: the setting of the modular input''',
+        validate=validators.Boolean())
+
+    batchsize = Option(
+        doc='''
+        **Syntax:** **batchsize=***<int>*
+        **Description:** Number of results whose IDs are resolved together. Default: 1000''',
+        default=1000, validate=validators.Integer(1))
+
+    ttl = Option(
+        doc='''
+        **Syntax:** **ttl=***<int>*
+        **Description:** Number of seconds a resolved item is cached. Default: 300''',
+        default=300, validate=validators.Integer(0))
+
+    def __init__(self):
+        super(OctopusLookupCommand, self).__init__()
+        self._api = None
+
+    def stream(self, records):
+        batch = []
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batchsize:
+                for record in self._enrich(batch):
+                    yield record
+                batch = []
+
+        for record in self._enrich(batch):
+            yield record
+
+    def _connect(self):
+        if self._api is None:
+            settings = octopus_api.find_input(self.service, self.endpoint) or {}
+
+            hostname = self.hostname or settings.get('hostname')
+            if not hostname:
+                raise ValueError('No modular input streams endpoint {}; specify hostname'.format(self.endpoint))
+
+            verify_ssl = self.verify_ssl
+            if verify_ssl is None:
+                verify_ssl = int(settings.get('verify_ssl', 1)) == 1
+
+            api_key = octopus_api.get_api_key(self.service, self.endpoint)
+            if api_key is None:
+                raise ValueError('No API key is stored for endpoint {}'.format(self.endpoint))
+
+            import requests
+            self._api = hostname, api_key, verify_ssl, requests.Session()
+
+        return self._api
+
+    def _enrich(self, batch):
+        for id_field, collection, fields in _LOOKUPS:
+            ids = set(record.get(id_field) for record in batch)
+            ids.discard(None)
+            ids.discard('')
+
+            items = {}
+            if ids:
+                hostname, api_key, verify_ssl, session = self._connect()
+                missing = []
+                for item_id in ids:
+                    hit, item = _CACHE.get((hostname, collection, item_id))
+                    if hit:
+                        items[item_id] = item
+                    else:
+                        missing.append(item_id)
+
+                if missing:
+                    found = octopus_api.get_items(hostname, collection, missing, api_key, verify_ssl, session=session)
+                    for item_id in missing:
+                        item = found.get(item_id)
+                        # Cache misses too, so unknown IDs aren't asked for on every batch
+                        _CACHE.put((hostname, collection, item_id), item, self.ttl)
+                        items[item_id] = item
+
+            # Every record gets every output field: the record writer takes
+            # the field names of a chunk from its first record
+            for record in batch:
+                item = items.get(record.get(id_field))
+                for item_field, output_field in fields:
+                    record[output_field] = None if item is None else item.get(item_field)
+
+        return batch
+
+dispatch(OctopusLookupCommand, sys.argv, sys.stdin, sys.stdout, __name__)
@@ -31,7 +31,12 @@ import ssl
 import urllib
 import io
 import sys
+import threading
+import time
 import Cookie
+import heapq
+import itertools
+import Queue
 
 from base64 import b64encode
 from datetime import datetime
@@ -49,9 +54,13 @@ except ImportError, e:
 from .data import record
 
 __all__ = [
+    "AsyncContext",
     "AuthenticationError",
     "connect",
     "Context",
+    "Executor",
+    "Future",
+    "gather",
     "handler",
     "HTTPError"
 ]
@@ -182,9 +191,9 @@ class UrlEncoded(str):
         adding it.
         """
         if isinstance(other, UrlEncoded):
-            return UrlEncoded(str.__add__(self, other), skip_encode=True)
+            return str.__new__(UrlEncoded, str.__add__(self, other))
         else:
-            return UrlEncoded(str.__add__(self, urllib.quote(other)), skip_encode=True)
+            return str.__new__(UrlEncoded, str.__add__(self, urllib.quote(other)))
 
     def __radd__(self, other):
         """other + self
@@ -193,9 +202,9 @@ class UrlEncoded(str):
         adding it.
         """
         if isinstance(other, UrlEncoded):
-            return UrlEncoded(str.__radd__(self, other), skip_encode=True)
+            return str.__new__(UrlEncoded, str.__add__(other, self))
         else:
-            return UrlEncoded(str.__add__(urllib.quote(other), self), skip_encode=True)
+            return str.__new__(UrlEncoded, str.__add__(urllib.quote(other), self))
 
     def __mod__(self, fields):
         """Interpolation into ``UrlEncoded``s is disabled.
@@ -410,6 +419,36 @@ def namespace(sharing=None, owner=None, app=None, **kwargs):
     raise ValueError("Invalid value for argument: 'sharing'")
 
 
+class _LRUCache(object):
+    # A bounded mapping that evicts the least recently used quarter of its
+    # entries when full. Hits only stamp the entry, so they stay cheap; the
+    # lock is taken only to insert.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = {}   # key -> [value, last use]
+        self._clock = itertools.count()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry[1] = next(self._clock)
+        return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                count = max(1, self.maxsize // 4)
+                stale = heapq.nsmallest(count, self._entries.iteritems(), key=lambda item: item[1][1])
+                for k, _ in stale:
+                    del self._entries[k]
+            self._entries[key] = [value, next(self._clock)]
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class Context(object):
     """This class represents a context that encapsulates a splunkd connection.
 
@@ -446,6 +485,9 @@ class Context(object):
     :param password: The password for the Splunk account.
     :type password: ``string``
     :param handler: The HTTP request handler (optional).
+    :param path_cache_size: The number of absolute request paths remembered
+        by :meth:`_abspath` (the default is 512; 0 disables the cache).
+    :type path_cache_size: ``integer``
     :returns: A ``Context`` instance.
 
     **Example**::
@@ -474,6 +516,8 @@ class Context(object):
         self.password = kwargs.get("password", "")
         self.basic = kwargs.get("basic", False)
         self.autologin = kwargs.get("autologin", False)
+        path_cache_size = kwargs.get("path_cache_size", 512)
+        self._paths = _LRUCache(path_cache_size) if path_cache_size else None
 
         # Store any cookies in the self.http._cookies dict
         if kwargs.has_key("cookie") and kwargs['cookie'] not in [None, _NoAuthenticationToken]:
@@ -913,6 +957,24 @@ class Context(object):
         if path_segment.startswith('/'):
             return UrlEncoded(path_segment, skip_encode=skip_encode)
 
+        # Building and quoting the path dominates the cost of a request
+        # made from a tight loop, so remember the result. The key holds
+        # everything the path depends on, including the default namespace,
+        # which may be replaced or changed at any time.
+        if owner or app or sharing:
+            key = (path_segment, skip_encode, owner, app, sharing)
+        else:
+            ns = self.namespace
+            key = (path_segment, skip_encode, ns.get('owner'), ns.get('app'), None)
+        if self._paths is not None:
+            path = self._paths.get(key)
+            if path is None:
+                path = self._build_abspath(path_segment, skip_encode, owner, app, sharing)
+                self._paths.put(key, path)
+            return path
+        return self._build_abspath(path_segment, skip_encode, owner, app, sharing)
+
+    def _build_abspath(self, path_segment, skip_encode, owner, app, sharing):
         # path_segment is relative, so we need a namespace to build an
         # absolute path.
         if owner or app or sharing:
@@ -979,6 +1041,197 @@ def connect(**kwargs):
     c.login()
     return c
 
+
+class Future(object):
+    """The eventual result of a call submitted to an :class:`Executor`.
+
+    The interface is the subset of ``concurrent.futures.Future`` that
+    :class:`AsyncContext` needs, so an executor from the ``futures`` backport
+    can be used in place of :class:`Executor`.
+    """
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Returns the result of the call, waiting up to *timeout* seconds for
+        it, and raises the call's exception if it failed."""
+        self._wait(timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        """Returns the exception the call raised, or ``None``."""
+        self._wait(timeout)
+        return None if self._exc_info is None else self._exc_info[1]
+
+    def add_done_callback(self, fn):
+        """Calls *fn* with this future once it is done, immediately if it
+        already is."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception_info(self, exc_info):
+        self._exc_info = exc_info
+        self._finish()
+
+    def _wait(self, timeout):
+        if not self._done.wait(timeout):
+            raise socket.timeout("Timed out after %s seconds" % timeout)
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:
+                logging.exception("Future callback %r failed", fn)
+
+
+class Executor(object):
+    """Runs submitted calls on a bounded set of worker threads.
+
+    Workers are started as calls are submitted, up to *max_workers*; calls
+    beyond that wait in a queue, so any number of calls can be in flight
+    without a thread per call.
+    """
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedules ``fn(*args, **kwargs)`` and returns its :class:`Future`."""
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit calls after shutdown")
+            self._queue.put((future, fn, args, kwargs))
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def shutdown(self, wait=True):
+        """Stops the workers once the calls already submitted have run."""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+            for _ in threads:
+                self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                future.set_exception_info(sys.exc_info())
+            else:
+                future.set_result(result)
+
+
+def gather(futures, timeout=None):
+    """Waits for all *futures* and returns their results in order.
+
+    Raises the exception of the first future that failed, after all of them
+    have finished.
+    """
+    futures = list(futures)
+    for future in futures:
+        future.exception(timeout)
+    return [future.result() for future in futures]
+
+
+class AsyncContext(Context):
+    """A :class:`Context` whose requests can also be made without blocking.
+
+    ``get_async``, ``post_async``, ``delete_async``, ``request_async`` and
+    ``login_async`` take the same arguments as their blocking counterparts,
+    which they run on the context's executor, and return a :class:`Future`
+    for the response. Namespaces, cookies and autologin therefore behave
+    exactly as for :class:`Context`.
+
+    Unless another handler is given, requests go through a
+    :func:`pooling_handler` sized for the executor, so the workers reuse
+    their connections.
+
+    **Example**::
+
+        import splunklib.binding as binding
+        c = binding.AsyncContext(token=session_key, max_workers=16)
+        futures = [c.get_async("data/inputs/script/%s" % name) for name in names]
+        responses = binding.gather(futures)
+
+    :param max_workers: The maximum number of requests in flight at once
+        (the default is 8).
+    :type max_workers: ``integer``
+    :param executor: An object with a ``submit(fn, *args, **kwargs)`` method
+        returning a future, such as a ``concurrent.futures`` executor
+        (optional; by default an :class:`Executor` with *max_workers* workers).
+    """
+    def __init__(self, handler=None, max_workers=8, executor=None, **kwargs):
+        if handler is None:
+            handler = pooling_handler(max_idle=max_workers)
+        super(AsyncContext, self).__init__(handler=handler, **kwargs)
+        self.executor = Executor(max_workers) if executor is None else executor
+
+    def submit(self, fn, *args, **kwargs):
+        """Runs ``fn(*args, **kwargs)`` on the executor and returns its future."""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def get_async(self, path_segment, owner=None, app=None, sharing=None, **query):
+        return self.submit(self.get, path_segment, owner=owner, app=app, sharing=sharing, **query)
+
+    def post_async(self, path_segment, owner=None, app=None, sharing=None, headers=None, **query):
+        return self.submit(self.post, path_segment, owner=owner, app=app, sharing=sharing, headers=headers, **query)
+
+    def delete_async(self, path_segment, owner=None, app=None, sharing=None, **query):
+        return self.submit(self.delete, path_segment, owner=owner, app=app, sharing=sharing, **query)
+
+    def request_async(self, path_segment, method="GET", headers=None, body="",
+                      owner=None, app=None, sharing=None):
+        return self.submit(self.request, path_segment, method=method, headers=headers, body=body,
+                           owner=owner, app=app, sharing=sharing)
+
+    def login_async(self):
+        return self.submit(self.login)
+
+    def close(self):
+        """Stops the executor's workers and closes any pooled connections."""
+        shutdown = getattr(self.executor, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+        clear = getattr(self.http.handler, "clear", None)
+        if clear is not None:
+            clear()
+
 # Note: the error response schema supports multiple messages but we only
 # return the first, although we do return the body so that an exception
 # handler that wants to read multiple messages can do so.
@@ -1241,14 +1494,30 @@ class ResponseReader(io.RawIOBase):
     The ``ResponseReader`` class is intended to be a layer to unify the different
     types of HTTP libraries used with this SDK. This class also provides a
     preview of the stream and a few useful predicates.
+
+    If a ``release`` function is given, the connection is not closed but
+    handed to ``release(connection, reusable)`` once, as soon as the response
+    has been read completely or is closed. Closing, which also happens when
+    the reader is garbage collected, first reads up to ``drain_limit``
+    characters of what is left of the body; ``reusable`` is ``True`` if that
+    reached the end of the response.
     """
+    #: Maximum number of unread characters :meth:`close` reads to be able to
+    #: reuse a pooled connection
+    drain_limit = 256 * 1024
+
     # For testing, you can use a StringIO as the argument to
     # ``ResponseReader`` instead of an ``httplib.HTTPResponse``. It
     # will work equally well.
-    def __init__(self, response, connection=None):
+    def __init__(self, response, connection=None, release=None):
         self._response = response
         self._connection = connection
+        self._release = release
         self._buffer = ''
+        if release is not None and connection is not None and response.isclosed():
+            # Nothing to read (for example a 204 response).
+            self._connection = None
+            release(connection, True)
 
     def __str__(self):
         return self.read()
@@ -1273,10 +1542,27 @@ class ResponseReader(io.RawIOBase):
 
     def close(self):
         """Closes this response."""
-        if _connection:
-            _connection.close()
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            if self._release is not None:
+                self._release(connection, self._drain())
+            else:
+                connection.close()
         self._response.close()
 
+    def _drain(self):
+        # Reads the rest of a pooled response so its connection can be reused
+        remaining = self.drain_limit
+        try:
+            while remaining > 0 and not self._response.isclosed():
+                data = self._response.read(min(remaining, 16 * 1024))
+                if not data:
+                    break
+                remaining -= len(data)
+        except (httplib.HTTPException, socket.error):
+            return False
+        return self._response.isclosed()
+
     def read(self, size = None):
         """Reads a given number of characters from the response.
 
@@ -1290,6 +1576,10 @@ class ResponseReader(io.RawIOBase):
         if size is not None:
             size -= len(r)
         r = r + self._response.read(size)
+        if self._release is not None and self._connection is not None \
+                and self._response.isclosed():
+            connection, self._connection = self._connection, None
+            self._release(connection, True)
         return r
 
     def readable(self):
@@ -1310,18 +1600,9 @@ class ResponseReader(io.RawIOBase):
         return bytes_read
 
 
-def handler(key_file=None, cert_file=None, timeout=None):
-    """This class returns an instance of the default HTTP request handler using
-    the values you provide.
-
-    :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
-    :type key_file: ``string``
-    :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
-    :type cert_file: ``string``
-    :param `timeout`: The request time-out period, in seconds (optional).
-    :type timeout: ``integer`` or "None"
-    """
-
+def _connector(key_file=None, cert_file=None, timeout=None):
+    # Returns a function that opens a new httplib connection for
+    # (scheme, host, port).
     def connect(scheme, host, port):
         kwargs = {}
         if timeout is not None: kwargs['timeout'] = timeout
@@ -1337,18 +1618,40 @@ def handler(key_file=None, cert_file=None, timeout=None):
             return httplib.HTTPSConnection(host, port, **kwargs)
         raise ValueError("unsupported scheme: %s" % scheme)
 
+    return connect
+
+
+def _request_headers(host, message, connection_header):
+    body = message.get("body", "")
+    head = {
+        "Content-Length": str(len(body)),
+        "Host": host,
+        "User-Agent": "splunk-sdk-python/1.6.2",
+        "Accept": "*/*",
+        "Connection": connection_header,
+    } # defaults
+    for key, value in message["headers"]:
+        head[key] = value
+    return head
+
+
+def handler(key_file=None, cert_file=None, timeout=None):
+    """This class returns an instance of the default HTTP request handler using
+    the values you provide.
+
+    :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
+    :type key_file: ``string``
+    :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
+    :type cert_file: ``string``
+    :param `timeout`: The request time-out period, in seconds (optional).
+    :type timeout: ``integer`` or "None"
+    """
+    connect = _connector(key_file, cert_file, timeout)
+
     def request(url, message, **kwargs):
         scheme, host, port, path = _spliturl(url)
         body = message.get("body", "")
-        head = {
-            "Content-Length": str(len(body)),
-            "Host": host,
-            "User-Agent": "splunk-sdk-python/1.6.2",
-            "Accept": "*/*",
-            "Connection": "Close",
-        } # defaults
-        for key, value in message["headers"]:
-            head[key] = value
+        head = _request_headers(host, message, "Close")
         method = message.get("method", "GET")
 
         connection = connect(scheme, host, port)
@@ -1371,3 +1674,113 @@ def handler(key_file=None, cert_file=None, timeout=None):
         }
 
     return request
+
+
+class _ConnectionPool(object):
+    # Idle keep-alive connections per (scheme, host, port), most recently
+    # used last.
+    def __init__(self, connect, max_idle, idle_timeout):
+        self._connect = connect
+        self._max_idle = max_idle
+        self._idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Returns ``(connection, reused)`` for ``key``."""
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                connection, last_used = idle.pop()
+                if now - last_used <= self._idle_timeout:
+                    return connection, True
+                connection.close()
+        return self._connect(*key), False
+
+    def release(self, key, connection, reusable):
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self._max_idle:
+                    idle.append((connection, time.time()))
+                    return
+        connection.close()
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.itervalues():
+            for connection, _ in connections:
+                connection.close()
+
+
+def pooling_handler(key_file=None, cert_file=None, timeout=None, max_idle=8, idle_timeout=30):
+    """Returns an HTTP request handler that keeps connections alive and reuses
+    them across requests to the same (scheme, host, port).
+
+    A connection goes back to the pool once its response has been read
+    completely, or when the response body is closed or garbage collected
+    with at most ``ResponseReader.drain_limit`` characters left unread. A
+    response with more left, or one the server marked ``Connection: close``,
+    closes its connection instead. Connections idle for more than
+    ``idle_timeout`` seconds are discarded.
+
+    The server may close an idle connection at any time. A request that
+    fails on a reused connection is retried on a new one if it could not be
+    sent, or if it is a ``GET`` or ``HEAD`` request; any other request
+    may already have been processed, so its error is raised.
+
+    **Example**::
+
+        import splunklib.binding as binding
+        import splunklib.client as client
+        s = client.connect(handler=binding.pooling_handler(), token=session_key)
+
+    :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
+    :type key_file: ``string``
+    :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
+    :type cert_file: ``string``
+    :param `timeout`: The request time-out period, in seconds (optional).
+    :type timeout: ``integer`` or "None"
+    :param `max_idle`: The maximum number of idle connections kept per (scheme, host, port).
+    :type max_idle: ``integer``
+    :param `idle_timeout`: The number of seconds after which an idle connection is discarded.
+    :type idle_timeout: ``integer``
+    """
+    pool = _ConnectionPool(_connector(key_file, cert_file, timeout), max_idle, idle_timeout)
+
+    def request(url, message, **kwargs):
+        scheme, host, port, path = _spliturl(url)
+        key = (scheme, host, port)
+        body = message.get("body", "")
+        head = _request_headers(host, message, "Keep-Alive")
+        method = message.get("method", "GET")
+
+        while True:
+            connection, reused = pool.acquire(key)
+            sent = False
+            try:
+                connection.request(method, path, body, head)
+                sent = True
+                if timeout is not None:
+                    connection.sock.settimeout(timeout)
+                response = connection.getresponse()
+                break
+            except (httplib.HTTPException, socket.error):
+                connection.close()
+                if not reused or (sent and method not in ("GET", "HEAD")):
+                    raise
+
+        def release(connection, reusable):
+            pool.release(key, connection, reusable and not response.will_close)
+
+        return {
+            "status": response.status,
+            "reason": response.reason,
+            "headers": response.getheaders(),
+            "body": ResponseReader(response, connection, release),
+        }
+
+    request.clear = pool.clear
+    return request
@@ -62,16 +62,20 @@ import datetime
 import json
 import urllib
 import logging
-from time import sleep
+from time import sleep, time
 from datetime import datetime, timedelta
 import socket
 import contextlib
+import threading
+from collections import deque
 
-from .binding import Context, HTTPError, AuthenticationError, namespace, UrlEncoded, _encode, _make_cookie_header, _NoAuthenticationToken
+from .binding import AsyncContext, Context, HTTPError, AuthenticationError, namespace, UrlEncoded, _encode, _make_cookie_header, _NoAuthenticationToken
 from .data import record
 from . import data
 
 __all__ = [
+    "async_connect",
+    "AsyncService",
     "connect",
     "NotSupportedError",
     "OperationError",
@@ -149,6 +153,20 @@ class NotSupportedError(Exception):
     pass
 
 
+class BulkUpdateError(Exception):
+    """Raised by :meth:`Service.update_entities` when one or more of the
+    updates failed. ``errors`` is a list of ``(entity, exception)`` pairs in
+    the order the updates were given, and ``updated`` lists the entities that
+    were updated successfully."""
+    def __init__(self, errors, updated):
+        entity, error = errors[0]
+        message = "%d of %d updates failed; first failure on %s: %s" % \
+                  (len(errors), len(errors) + len(updated), entity.path, error)
+        super(BulkUpdateError, self).__init__(message)
+        self.errors = errors
+        self.updated = updated
+
+
 def _trailing(template, *targets):
     """Substring of *template* following all *targets*.
 
@@ -216,6 +234,84 @@ def _load_atom_entries(response):
         return entries if isinstance(entries, list) else [entries]
 
 
+# Iterate over the atom entries in the body of the given response, parsing
+# them as they are read rather than loading the whole feed first.
+def _iter_atom_entries(response):
+    if getattr(response.body, 'empty', False):
+        return
+    for elem in data.iterload(response.body, XNAME_ENTRY):
+        yield elem.entry
+
+
+# Does the given response carry a JSON body (output_mode=json)?
+def _is_json(response):
+    headers = response.headers
+    if isinstance(headers, dict):
+        headers = headers.items()
+    for key, value in headers:
+        if key.lower() == "content-type":
+            return "json" in value.lower()
+    return False
+
+
+# Load the list of JSON entries from the body of the given response
+def _load_json_entries(response):
+    body = response.body.read()
+    if not body.strip():
+        return []
+    return json.loads(body).get('entry', [])
+
+
+# Convert a JSON value to the form data.load produces for the same Atom
+# content, so state records look alike whichever output mode was used.
+def _json_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and value.is_integer():
+        # Atom has "1" where JSON may have 1.0
+        return str(int(value))
+    if isinstance(value, (int, long, float)):
+        return str(value)
+    if isinstance(value, list):
+        return [_json_value(item) for item in value]
+    if isinstance(value, dict):
+        return record((k, _json_value(v)) for k, v in value.iteritems())
+    return value
+
+
+# Parse the given JSON entry into a generic entity state record, the same
+# shape as _parse_atom_entry returns.
+def _parse_json_entry(entry):
+    links = record((k, v) for k, v in entry.get('links', {}).iteritems())
+
+    content = record((k, _json_value(v)) for k, v in entry.get('content', {}).iteritems()
+                     if k not in ['eai:acl', 'eai:attributes'])
+
+    fields = entry.get('fields', {})
+    fields = record({
+        'required': _json_value(fields.get('required', [])),
+        'optional': _json_value(fields.get('optional', [])),
+        'wildcard': _json_value(fields.get('wildcard', []))})
+
+    return record({
+        'title': entry.get('name'),
+        'links': links,
+        'access': _json_value(entry.get('acl')),
+        'fields': fields,
+        'content': content,
+        'updated': entry.get('updated')
+    })
+
+
+# Query arguments asking splunkd for entity state in the output mode the
+# service was created with. Endpoints with their own Atom loaders opt out.
+def _state_query(endpoint, query):
+    if getattr(endpoint.service, "output_mode", "xml") == "json" and endpoint.json_state:
+        query = dict(query)
+        query.setdefault('output_mode', "json")
+    return query
+
+
 # Load the sid from the body of the given response
 def _load_sid(response):
     return _load_atom(response).response.sid
@@ -275,6 +371,68 @@ def _parse_atom_metadata(content):
 
     return record({'access': access, 'fields': fields})
 
+# Normalize a request or entity path to the relative, unquoted form with a
+# trailing slash that entity paths have, for use as a cache key.
+def _cache_path(path):
+    path = urllib.unquote(path)
+    if 'servicesNS/' in path:
+        path = _trailing(path, 'servicesNS/', '/', '/')
+    elif 'services/' in path:
+        path = _trailing(path, 'services/')
+    path = path.lstrip('/')
+    return path if path.endswith('/') else path + '/'
+
+
+class _StateCache(object):
+    """Entity state records kept for *ttl* seconds.
+
+    States are stored by their entity's ``(path, owner, app)``. Lookups that
+    fetched a state by another key, such as a collection path plus a name in
+    the service's namespace, are remembered as aliases of that key. Any POST
+    or DELETE the service makes to an entity, or to a path below it, drops
+    the entity's state.
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._states = {}   # (path, owner, app) -> (state, expires)
+        self._aliases = {}  # lookup key -> (path, owner, app)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns ``(path, state)`` for *key*, or ``None`` if it is not
+        cached or has expired."""
+        with self._lock:
+            key = self._aliases.get(key, key)
+            item = self._states.get(key)
+            if item is None:
+                return None
+            state, expires = item
+            if expires < time():
+                del self._states[key]
+                return None
+            return key[0], state
+
+    def put(self, path, state, *aliases):
+        access = state.get('access') or {}
+        key = (_cache_path(path), access.get('owner'), access.get('app'))
+        with self._lock:
+            self._states[key] = (state, time() + self.ttl)
+            for alias in aliases:
+                if alias != key:
+                    self._aliases[alias] = key
+
+    def invalidate(self, path):
+        path = _cache_path(path)
+        with self._lock:
+            for key in [k for k in self._states if path.startswith(k[0])]:
+                del self._states[key]
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._aliases.clear()
+
+
 # kwargs: scheme, host, port, app, owner, username, password
 def connect(**kwargs):
     """This function connects and logs in to a Splunk instance.
@@ -322,6 +480,20 @@ def connect(**kwargs):
     return s
 
 
+def async_connect(**kwargs):
+    """This function connects and logs in to a Splunk instance, returning an
+    :class:`AsyncService`.
+
+    It takes the same arguments as :func:`connect`, plus the ``max_workers``
+    and ``executor`` arguments of :class:`splunklib.binding.AsyncContext`.
+
+    :return: An initialized :class:`AsyncService` connection.
+    """
+    s = AsyncService(**kwargs)
+    s.login()
+    return s
+
+
 # In preparation for adding Storm support, we added an
 # intermediary class between Service and Context. Storm's
 # API is not going to be the same as enterprise Splunk's
@@ -371,6 +543,18 @@ class Service(_BaseService):
     :param `password`: The password, which is used to authenticate the Splunk
                        instance.
     :type password: ``string``
+    :param `output_mode`: The format in which entity and collection state is
+                          requested (the default is "xml"). "json" is cheaper
+                          to parse for large collections; responses in Atom are
+                          still understood.
+    :type output_mode: "xml" or "json"
+    :param `state_cache_ttl`: The number of seconds entity state read from the
+                              server is reused by :meth:`Entity.refresh` and
+                              by lookups such as ``inputs[name, kind]``
+                              (optional; the default of ``None`` disables the
+                              cache). Any POST or DELETE this service makes to
+                              an entity invalidates its cached state.
+    :type state_cache_ttl: ``integer``
     :return: A :class:`Service` instance.
 
     **Example**::
@@ -388,6 +572,24 @@ class Service(_BaseService):
     def __init__(self, **kwargs):
         super(Service, self).__init__(**kwargs)
         self._splunk_version = None
+        self.output_mode = kwargs.get("output_mode", "xml")
+        ttl = kwargs.get("state_cache_ttl", None)
+        self.state_cache = None if ttl is None else _StateCache(ttl)
+        self._input_kinds = None
+
+    def delete(self, path_segment, owner=None, app=None, sharing=None, **query):
+        try:
+            return super(Service, self).delete(path_segment, owner=owner, app=app, sharing=sharing, **query)
+        finally:
+            if self.state_cache is not None:
+                self.state_cache.invalidate(path_segment)
+
+    def post(self, path_segment, owner=None, app=None, sharing=None, headers=None, **query):
+        try:
+            return super(Service, self).post(path_segment, owner=owner, app=app, sharing=sharing, headers=headers, **query)
+        finally:
+            if self.state_cache is not None:
+                self.state_cache.invalidate(path_segment)
 
     @property
     def apps(self):
@@ -661,6 +863,72 @@ class Service(_BaseService):
         """
         return KVStoreCollections(self)
 
+    def update_entities(self, updates, max_workers=4, refresh=False):
+        """Applies many entity updates concurrently.
+
+        Each update is an ``(entity, kwargs)`` pair and is applied with
+        ``entity.update(**kwargs)`` on one of *max_workers* threads. Every
+        update is attempted; failures are collected and reported together
+        once all of them have finished.
+
+        The requests are made with this service's handler, so create the
+        service with ``handler=binding.pooling_handler(max_idle=max_workers)``
+        to have the workers reuse their connections instead of opening one
+        per request.
+
+        **Example**::
+
+            import splunklib.client as client
+            s = client.connect(...)
+            s.update_entities((i, {'disabled': True}) for i in s.inputs.list('script'))
+
+        :param updates: The ``(entity, kwargs)`` pairs to apply.
+        :type updates: ``iterable``
+        :param max_workers: The maximum number of concurrent requests.
+        :type max_workers: ``integer``
+        :param refresh: Whether to refresh each entity after updating it.
+        :type refresh: ``boolean``
+
+        :return: The updated entities, in the order they were given.
+        :rtype: ``list``
+        :raises BulkUpdateError: Raised if any update failed.
+        """
+        updates = [(entity, dict(kwargs)) for entity, kwargs in updates]
+        errors = [None] * len(updates)
+        pending = enumerate(updates)
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                with lock:
+                    item = next(pending, None)
+                if item is None:
+                    return
+                index, (entity, kwargs) = item
+                try:
+                    entity.update(**kwargs)
+                    if refresh:
+                        entity.refresh()
+                except Exception as e:
+                    errors[index] = e
+
+        workers = min(max_workers, len(updates))
+        if workers <= 1:
+            work()
+        else:
+            threads = [threading.Thread(target=work) for _ in range(workers)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        updated = [entity for (entity, _), error in zip(updates, errors) if error is None]
+        failed = [(entity, error) for (entity, _), error in zip(updates, errors) if error is not None]
+        if failed:
+            raise BulkUpdateError(failed, updated)
+        return updated
+
     @property
     def users(self):
         """Returns the collection of users.
@@ -670,6 +938,58 @@ class Service(_BaseService):
         return Users(self)
 
 
+class AsyncService(Service, AsyncContext):
+    """A :class:`Service` that can also run operations without blocking.
+
+    Besides the request methods of :class:`splunklib.binding.AsyncContext`
+    (``get_async``, ``post_async`` and so on), it runs common collection and
+    entity operations on its executor and returns a
+    :class:`splunklib.binding.Future` for each. The collections and entities
+    themselves are the usual ones, bound to this service, so their blocking
+    methods remain available.
+
+    **Example**::
+
+        import splunklib.binding as binding
+        import splunklib.client as client
+        s = client.async_connect(token=session_key, max_workers=16)
+        inputs = s.inputs
+        futures = [s.fetch_async(inputs, (name, "script")) for name in names]
+        for item in binding.gather(futures):
+            s.update_async(item, disabled=True)
+
+    :param max_workers: The maximum number of operations in flight at once
+        (the default is 8).
+    :type max_workers: ``integer``
+    :param executor: An executor to use instead of the default
+        :class:`splunklib.binding.Executor` (optional).
+    """
+    def fetch_async(self, collection, key):
+        """Fetches ``collection[key]``."""
+        return self.submit(collection.__getitem__, key)
+
+    def list_async(self, collection, *args, **kwargs):
+        """Lists *collection*, as ``collection.list(*args, **kwargs)``."""
+        return self.submit(collection.list, *args, **kwargs)
+
+    def create_async(self, collection, *args, **kwargs):
+        """Creates an entity, as ``collection.create(*args, **kwargs)``."""
+        return self.submit(collection.create, *args, **kwargs)
+
+    def delete_entity_async(self, target, *args, **kwargs):
+        """Deletes an entity, as ``entity.delete()`` or
+        ``collection.delete(name, ...)``."""
+        return self.submit(target.delete, *args, **kwargs)
+
+    def refresh_async(self, entity):
+        """Refreshes *entity*."""
+        return self.submit(entity.refresh)
+
+    def update_async(self, entity, **kwargs):
+        """Updates *entity*, as ``entity.update(**kwargs)``."""
+        return self.submit(entity.update, **kwargs)
+
+
 class Endpoint(object):
     """This class represents individual Splunk resources in the Splunk REST API.
 
@@ -873,6 +1193,11 @@ class Entity(Endpoint):
     # optional fields. See above.
     defaults = {}
 
+    # Whether the state may be requested as JSON when the service's
+    # output_mode is "json". Subclasses that parse the Atom entry themselves
+    # set this to False.
+    json_state = True
+
     def __init__(self, service, path, **kwargs):
         Endpoint.__init__(self, service, path)
         self._state = None
@@ -934,11 +1259,20 @@ class Entity(Endpoint):
         elem = _load_atom(response, XNAME_ENTRY)
         if isinstance(elem, list):
             raise AmbiguousReferenceException("Fetch from server returned multiple entries for name %s." % self.name)
+        elif elem is None:
+            raise ValueError("Fetch from server returned no entry for %s." % self.path)
         else:
             return elem.entry
 
     # Load the entity state record from the given response
     def _load_state(self, response):
+        if _is_json(response):
+            entries = _load_json_entries(response)
+            if len(entries) > 1:
+                raise AmbiguousReferenceException("Fetch from server returned multiple entries for name %s." % self.name)
+            elif len(entries) == 0:
+                raise ValueError("Fetch from server returned no entry for %s." % self.path)
+            return _parse_json_entry(entries[0])
         entry = self._load_atom_entry(response)
         return _parse_atom_entry(entry)
 
@@ -1000,6 +1334,8 @@ class Entity(Endpoint):
         the :meth:`read` method of ``self``) to fetch an updated state,
         plus at most two additional round trips if
         the ``autologin`` field of :func:`connect` is set to ``True``.
+        If the service was created with a ``state_cache_ttl``, a state
+        cached within that time is used instead of the roundtrip.
 
         :param state: Entity-specific arguments (optional).
         :type state: ``dict``
@@ -1015,10 +1351,23 @@ class Entity(Endpoint):
         """
         if state is not None:
             self._state = state
-        else:
-            self._state = self.read(self.get())
+            return self
+        cache = getattr(self.service, 'state_cache', None)
+        if cache is not None:
+            key = self._cache_key()
+            cached = cache.get(key)
+            if cached is not None:
+                self._state = cached[1]
+                return self
+        self._state = self.read(self.get(**_state_query(self, {})))
+        if cache is not None:
+            cache.put(self.path, self._state, key)
         return self
 
+    def _cache_key(self):
+        owner, app, sharing = self._proper_namespace()
+        return (_cache_path(self.path), owner, app)
+
     @property
     def access(self):
         """Returns the access metadata for this entity.
@@ -1131,7 +1480,16 @@ class Entity(Endpoint):
         # there.
         if 'name' in kwargs:
             raise IllegalOperationException('Cannot update the name of an Entity via the REST API.')
-        self.post(**kwargs)
+        response = self.post(**kwargs)
+        cache = getattr(self.service, 'state_cache', None)
+        if cache is not None:
+            # splunkd answers an update with the updated entry, so a
+            # following refresh need not ask for it again.
+            try:
+                state = self.read(response)
+                cache.put(self.path, state)
+            except Exception:
+                pass
         return self
 
 
@@ -1139,6 +1497,11 @@ class ReadOnlyCollection(Endpoint):
     """This class represents a read-only collection of entities in the Splunk
     instance.
     """
+    # Whether entries may be requested as JSON when the service's
+    # output_mode is "json". Subclasses that parse the Atom feed themselves
+    # set this to False.
+    json_state = True
+
     def __init__(self, service, path, item=Entity):
         Endpoint.__init__(self, service, path)
         self.item = item # Item accessor
@@ -1214,17 +1577,25 @@ class ReadOnlyCollection(Endpoint):
                 # have to extract values out.
                 key, ns = key
                 key = UrlEncoded(key, encode_slash=True)
-                response = self.get(key, owner=ns.owner, app=ns.app)
+                lookup = (_path(self.path, key), ns.owner, ns.app)
+                cached = self._cached_item(lookup)
+                if cached is not None:
+                    return cached
+                response = self.get(key, owner=ns.owner, app=ns.app, **_state_query(self, {}))
             else:
                 key = UrlEncoded(key, encode_slash=True)
-                response = self.get(key)
+                lookup = (_path(self.path, key), None, None)
+                cached = self._cached_item(lookup)
+                if cached is not None:
+                    return cached
+                response = self.get(key, **_state_query(self, {}))
             entries = self._load_list(response)
             if len(entries) > 1:
                 raise AmbiguousReferenceException("Found multiple entities named '%s'; please specify a namespace." % key)
             elif len(entries) == 0:
                 raise KeyError(key)
             else:
-                return entries[0]
+                return self._cache_item(entries[0], lookup)
         except HTTPError as he:
             if he.status == 404: # No entity matching key and namespace.
                 raise KeyError(key)
@@ -1275,6 +1646,25 @@ class ReadOnlyCollection(Endpoint):
         """
         return len(self.list())
 
+    def _cached_item(self, lookup):
+        # Returns the entity cached for a (path, owner, app) lookup, if any.
+        cache = getattr(self.service, 'state_cache', None)
+        if cache is None:
+            return None
+        path, owner, app = lookup
+        cached = cache.get((_cache_path(path), owner, app))
+        if cached is None:
+            return None
+        return self.item(self.service, cached[0], state=cached[1])
+
+    def _cache_item(self, entity, lookup):
+        # Caches the state of an entity fetched by a (path, owner, app) lookup.
+        cache = getattr(self.service, 'state_cache', None)
+        if cache is not None:
+            path, owner, app = lookup
+            cache.put(entity.path, entity.state, (_cache_path(path), owner, app))
+        return entity
+
     def _entity_path(self, state):
         """Calculate the path to an entity to be returned.
 
@@ -1319,21 +1709,24 @@ class ReadOnlyCollection(Endpoint):
         that is, an XML document with a toplevel element ``<feed>``,
         and within that element one or more ``<entry>`` elements.
         """
+        return list(self._iter_list(response))
+
+    def _iter_list(self, response):
+        """Converts *response* to entities, yielding each one as soon as its
+        entry has been read from the body (see :meth:`_load_list`).
+        """
         # Some subclasses of Collection have to override this because
         # splunkd returns something that doesn't match
         # <feed><entry></entry><feed>.
-        entries = _load_atom_entries(response)
-        if entries is None: return []
-        entities = []
-        for entry in entries:
-            state = _parse_atom_entry(entry)
-            entity = self.item(
+        if _is_json(response):
+            states = (_parse_json_entry(entry) for entry in _load_json_entries(response))
+        else:
+            states = (_parse_atom_entry(entry) for entry in _iter_atom_entries(response))
+        for state in states:
+            yield self.item(
                 self.service,
                 self._entity_path(state),
                 state=state)
-            entities.append(entity)
-
-        return entities
 
     def itemmeta(self):
         """Returns metadata for members of the collection.
@@ -1374,7 +1767,7 @@ class ReadOnlyCollection(Endpoint):
         content = _load_atom(response, MATCH_ENTRY_CONTENT)
         return _parse_atom_metadata(content)
 
-    def iter(self, offset=0, count=None, pagesize=None, **kwargs):
+    def iter(self, offset=0, count=None, pagesize=None, prefetch=0, **kwargs):
         """Iterates over the collection.
 
         This method is equivalent to the :meth:`list` method, but
@@ -1387,6 +1780,11 @@ class ReadOnlyCollection(Endpoint):
         :type count: ``integer``
         :param pagesize: The number of entities to load (optional).
         :type pagesize: ``integer``
+        :param prefetch: The number of pages to request in the background
+            while the current page is consumed (optional; requires
+            *pagesize*). Entities are yielded in the same order. The last
+            few requests may turn out to be past the end of the collection.
+        :type prefetch: ``integer``
         :param kwargs: Additional arguments (optional):
 
             - "search" (``string``): The search query to filter responses.
@@ -1409,23 +1807,75 @@ class ReadOnlyCollection(Endpoint):
                 # Loads 10 saved searches at a time from the
                 # server.
                 ...
+            for saved_search in s.saved_searches.iter(pagesize=10, prefetch=2):
+                # Also fetches the next two pages while this one
+                # is consumed.
+                ...
         """
         assert pagesize is None or pagesize > 0
+        assert prefetch >= 0
         if count is None:
             count = self.null_count
+        kwargs = _state_query(self, kwargs)
+        if prefetch and pagesize is not None:
+            for item in self._iter_prefetched(offset, count, pagesize, prefetch, kwargs):
+                yield item
+            return
         fetched = 0
         while count == self.null_count or fetched < count:
             response = self.get(count=pagesize or count, offset=offset, **kwargs)
-            items = self._load_list(response)
-            N = len(items)
-            fetched += N
-            for item in items:
+            N = 0
+            for item in self._iter_list(response):
+                N += 1
                 yield item
+            fetched += N
             if pagesize is None or N < pagesize:
                 break
             offset += N
             logging.debug("pagesize=%d, fetched=%d, offset=%d, N=%d, kwargs=%s", pagesize, fetched, offset, N, kwargs)
 
+    def _iter_prefetched(self, offset, count, pagesize, prefetch, kwargs):
+        # Same paging as iter, but up to prefetch pages past the one being
+        # consumed are fetched and parsed on background threads.
+        def fetch(page_offset, result):
+            try:
+                response = self.get(count=pagesize, offset=page_offset, **kwargs)
+                result.append(list(self._iter_list(response)))
+            except BaseException as e:
+                result.append(e)
+
+        if count == self.null_count:
+            pages_left = None
+        else:
+            pages_left = (count + pagesize - 1) // pagesize
+        pending = deque()
+        next_offset = offset
+        fetched = 0
+        while True:
+            while len(pending) <= prefetch and pages_left != 0:
+                result = []
+                thread = threading.Thread(target=fetch, args=(next_offset, result))
+                thread.daemon = True
+                thread.start()
+                pending.append((thread, result))
+                next_offset += pagesize
+                if pages_left is not None:
+                    pages_left -= 1
+            if not pending:
+                break
+            thread, result = pending.popleft()
+            thread.join()
+            if isinstance(result[0], BaseException):
+                raise result[0]
+            items = result[0]
+            N = len(items)
+            fetched += N
+            for item in items:
+                yield item
+            if N < pagesize or (count != self.null_count and fetched >= count):
+                break
+            logging.debug("pagesize=%d, fetched=%d, prefetched=%d, N=%d, kwargs=%s", pagesize, fetched, len(pending), N, kwargs)
+
     # kwargs: count, offset, search, sort_dir, sort_key, sort_mode
     def list(self, count=None, **kwargs):
         """Retrieves a list of entities in this collection.
@@ -1856,6 +2306,46 @@ class StoragePasswords(Collection):
             name = name + ":"
         return Collection.delete(self, name)
 
+    def find(self, username=None, realm=None, pagesize=100, **kwargs):
+        """Finds the storage passwords with the given username and/or realm.
+
+        A single ``field=value`` term is passed to splunkd as the ``search``
+        argument, so that mostly candidate entries are transferred: the
+        username if it is given, otherwise the realm. The exact filter on
+        both is then applied to what comes back. All pages of candidates are
+        read, so a match is never cut off by a page limit. This makes one
+        roundtrip to the server per *pagesize* candidates, plus at most two
+        more if the ``autologin`` field of :func:`connect` is set to ``True``.
+
+        :param username: The username to match (optional).
+        :type username: ``string``
+        :param realm: The realm to match (optional). Use ``""`` to match
+            credentials without a realm.
+        :type realm: ``string``
+        :param pagesize: The number of candidates to fetch per request (optional).
+        :type pagesize: ``integer``
+        :param kwargs: Additional arguments passed to :meth:`iter` (optional).
+        :type kwargs: ``dict``
+        :return: A ``list`` of :class:`StoragePassword` objects.
+
+        **Example**::
+
+            import splunklib.client as client
+            s = client.connect(...)
+            for p in s.storage_passwords.find(username="octopus"):
+                print p.clear_password
+        """
+        for field, value in [("username", username), ("realm", realm)]:
+            # splunkd matches field=value loosely; values it would not parse
+            # as a single term are left to the exact filter below.
+            if value and not any(c in value for c in ' \t"*='):
+                kwargs['search'] = "%s=%s" % (field, value)
+                break
+
+        return [storage_password for storage_password in self.iter(pagesize=pagesize, **kwargs)
+                if (username is None or storage_password.username == username) and
+                   (realm is None or (storage_password.realm or "") == realm)]
+
 
 class AlertGroup(Entity):
     """This class represents a group of fired alerts for a saved search. Access
@@ -2181,6 +2671,10 @@ class Inputs(Collection):
             # Fetch a single kind
             key, kind = key
             key = UrlEncoded(key, encode_slash=True)
+            lookup = (_path(self.path, self.kindpath(kind) + "/" + key), None, None)
+            cached = self._cached_item(lookup)
+            if cached is not None:
+                return cached
             try:
                 response = self.get(self.kindpath(kind) + "/" + key)
                 entries = self._load_list(response)
@@ -2189,7 +2683,7 @@ class Inputs(Collection):
                 elif len(entries) == 0:
                     raise KeyError((key, kind))
                 else:
-                    return entries[0]
+                    return self._cache_item(entries[0], lookup)
             except HTTPError as he:
                 if he.status == 404: # No entity matching kind and key
                     raise KeyError((key, kind))
@@ -2397,10 +2891,26 @@ class Inputs(Collection):
     def kinds(self):
         """Returns the input kinds on this Splunk instance.
 
+        Discovering the kinds takes one request per input kind directory, so
+        the result is kept on the :class:`Service` and later calls make no
+        roundtrips. Call :meth:`refresh_kinds` after installing an app that
+        adds input kinds.
+
         :return: The list of input kinds.
         :rtype: ``list``
         """
-        return self._get_kind_list()
+        if self.service._input_kinds is None:
+            self.service._input_kinds = self._get_kind_list()
+        return list(self.service._input_kinds)
+
+    def refresh_kinds(self):
+        """Discards the input kinds cached on the :class:`Service`, so the next
+        use of :attr:`kinds` discovers them again.
+
+        :return: The :class:`Inputs` collection.
+        """
+        self.service._input_kinds = None
+        return self
 
     def kindpath(self, kind):
         """Returns a path to the resources for a given input kind.
@@ -2489,11 +2999,19 @@ class Inputs(Collection):
             - "sort_mode" (``string``): The collating sequence for sorting
               returned items: "auto", "alpha", "alpha_case", or "num".
 
+            - "bulk" (``boolean``): List all inputs with a single request to
+              ``data/inputs/all`` instead of one request per kind. The other
+              arguments are passed to splunkd unchanged, and each input's kind
+              is taken from its path. If a path does not name an input of a
+              known kind, the inputs are listed per kind instead.
+
         :type kwargs: ``dict``
 
         :return: A list of input kinds.
         :rtype: ``list``
         """
+        if kwargs.pop('bulk', False):
+            return self._list_all(kinds, **kwargs)
         if len(kinds) == 0:
             kinds = self.kinds
         if len(kinds) == 1:
@@ -2567,6 +3085,46 @@ class Inputs(Collection):
             entities = list(reversed(entities))
         return entities
 
+    def _list_all(self, kinds, **kwargs):
+        # One request to data/inputs/all; Input infers each kind from the path.
+        # If an entry's link does not name an input of a known kind, the
+        # inputs are listed per kind instead.
+        response = self.get('all', **dict(kwargs, count=kwargs.get('count', -1)))
+        entries = _load_atom_entries(response)
+        if entries is None:
+            return []
+        known_kinds = self.service._input_kinds
+        kindpaths = [self.kindpath(kind) for kind in kinds]
+        entities = []
+        for entry in entries:
+            state = _parse_atom_entry(entry)
+            path = urllib.unquote(state.links.get('alternate') or '')
+            kind = self._kind_of(path)
+            if kind is None or known_kinds is not None and kind not in known_kinds:
+                logging.debug("Inputs.list cannot resolve %s from data/inputs/all; listing per kind.", path)
+                return self.list(*kinds, **kwargs)
+            entity = Input(self.service, path, kind, state=state)
+            if not kindpaths or entity.kind in kindpaths:
+                entities.append(entity)
+        return entities
+
+    @staticmethod
+    def _kind_of(path):
+        # Returns the kind of the input at path, or None if path is not of
+        # the form .../data/inputs/<kind>/<name>
+        segments = path.split('/')
+        try:
+            i = segments.index('inputs') + 1
+        except ValueError:
+            return None
+        if segments[i - 2:i] != ['data', 'inputs'] or i == len(segments):
+            return None
+        kind = '/'.join(segments[i:i + 2]) if segments[i] == 'tcp' else segments[i]
+        name = segments[i + kind.count('/') + 1:]
+        if kind in ('', 'all') or not ''.join(name):
+            return None
+        return kind
+
     def __iter__(self, **kwargs):
         for item in self.iter(**kwargs):
             yield item
@@ -2615,6 +3173,8 @@ class Job(Entity):
         Entity.__init__(self, service, path, skip_refresh=True, **kwargs)
         self.sid = sid
 
+    json_state = False
+
     # The Job entry record is returned at the root of the response
     def _load_atom_entry(self, response):
         return _load_atom(response).entry
@@ -2742,6 +3302,11 @@ class Job(Entity):
         Results are not available until the job has finished. If called on
         an unfinished job, the result is an empty event set.
 
+        JSON and CSV results, requested with ``output_mode="json"`` or
+        ``output_mode="csv"``, are cheaper to parse. Pass the handle to
+        :class:`splunklib.results.JSONResultsReader` or
+        :class:`splunklib.results.CSVResultsReader` to read them.
+
         This method makes a single roundtrip
         to the server, plus at most two additional round trips if
         the ``autologin`` field of :func:`connect` is set to ``True``.
@@ -2885,25 +3450,22 @@ class Job(Entity):
 class Jobs(Collection):
     """This class represents a collection of search jobs. Retrieve this
     collection using :meth:`Service.jobs`."""
+    json_state = False
+
     def __init__(self, service):
         Collection.__init__(self, service, PATH_JOBS, item=Job)
         # The count value to say list all the contents of this
         # Collection is 0, not -1 as it is on most.
         self.null_count = 0
 
-    def _load_list(self, response):
+    def _iter_list(self, response):
         # Overridden because Job takes a sid instead of a path.
-        entries = _load_atom_entries(response)
-        if entries is None: return []
-        entities = []
-        for entry in entries:
+        for entry in _iter_atom_entries(response):
             state = _parse_atom_entry(entry)
-            entity = self.item(
+            yield self.item(
                 self.service,
                 entry['content']['sid'],
                 state=state)
-            entities.append(entity)
-        return entities
 
     def create(self, query, **kwargs):
         """ Creates a search using a search query and any additional parameters
@@ -2949,6 +3511,12 @@ class Jobs(Collection):
         them available later. As soon as results are ready, you will receive
         them.
 
+        With ``output_mode="json"`` the server writes one JSON object per line,
+        which :class:`splunklib.results.JSONResultsReader` parses as it
+        arrives; ``output_mode="csv"`` is read by
+        :class:`splunklib.results.CSVResultsReader`. Both are cheaper to parse
+        than XML.
+
         The ``export`` method makes a single roundtrip to the server (as opposed
         to two for :meth:`create` followed by :meth:`preview`), plus at most two
         more if the ``autologin`` field of :func:`connect` is set to ``True``.
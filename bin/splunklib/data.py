@@ -16,9 +16,12 @@
 format, which is the format used by most of the REST API.
 """
 
-from xml.etree.ElementTree import XML
+try:
+    from xml.etree.cElementTree import XML, iterparse
+except ImportError:
+    from xml.etree.ElementTree import XML, iterparse
 
-__all__ = ["load"]
+__all__ = ["load", "iterload"]
 
 # LNAME refers to element names without namespaces; XNAME is the same
 # name, but with an XML namespace.
@@ -51,9 +54,21 @@ def islist(name):
 def hasattrs(element):
     return len(element.attrib) > 0
 
+# Element names seen so far mapped to their interned local names. Feeds
+# repeat the same few tags in every entry, so this saves splitting them
+# again and keeps one copy of each name.
+_localnames = {}
+
 def localname(xname):
-    rcurly = xname.find('}')
-    return xname if rcurly == -1 else xname[rcurly+1:]
+    try:
+        return _localnames[xname]
+    except KeyError:
+        rcurly = xname.find('}')
+        name = xname if rcurly == -1 else xname[rcurly+1:]
+        if isinstance(name, str):
+            name = intern(name)
+        _localnames[xname] = name
+        return name
 
 def load(text, match=None):
     """This function reads a string that contains the XML of an Atom Feed, then 
@@ -84,6 +99,38 @@ def load(text, match=None):
     else:
         return [load_root(item, nametable) for item in items]
 
+def iterload(stream, match):
+    """This function incrementally reads an Atom Feed from a stream and yields
+    each element whose tag is *match*, loaded into a native Python structure
+    as :func:`load` would load it.
+
+    Elements are parsed as they arrive and discarded once they have been
+    yielded, so memory use does not grow with the size of the feed.
+
+    **Example**::
+
+        for entry in iterload(response.body, "{http://www.w3.org/2005/Atom}entry"):
+            print entry.entry.title
+
+    :param stream: A file-like object supporting ``read(size)``.
+    :param match: The tag name, including its namespace, to match.
+    :type match: ``string``
+    """
+    nametable = {
+        'namespaces': [],
+        'names': {}
+    }
+    parents = []
+    for event, element in iterparse(stream, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag == match:
+            yield load_root(element, nametable)
+            if parents:
+                parents[-1].remove(element)
+
 # Load the attributes of the given element.
 def load_attrs(element):
     if not hasattrs(element): return None
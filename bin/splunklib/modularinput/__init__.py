@@ -5,7 +5,7 @@ from splunklib.modularinput import *
 """
 from .argument import Argument
 from .event import Event
-from .event_writer import EventWriter
+from .event_writer import EventWriter, QueuedEventWriter, SpillingEventWriter
 from .input_definition import InputDefinition
 from .scheme import Scheme
 from .script import Script
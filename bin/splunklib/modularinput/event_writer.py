@@ -13,8 +13,12 @@
 # under the License.
 
 import sys
+import threading
+import time
+from Queue import Queue, Full
 
 from .event import ET
+from .spill_queue import SpillQueue
 
 try:
     from cStringIO import StringIO
@@ -79,6 +83,274 @@ class EventWriter(object):
         self._out.write(ET.tostring(document))
         self._out.flush()
 
+    def write_xml_string(self, document):
+        """Writes an already serialized XML document to the output stream.
+
+        :param document: ``string``, the XML document.
+        """
+        self._out.write(document)
+        self._out.flush()
+
+    def call_when_written(self, callback):
+        """Calls ``callback`` once every event written before it has reached
+        the output. Use this to commit checkpoints only for events that were
+        actually handed to Splunk.
+
+        Events are written synchronously here, so ``callback`` is called
+        immediately.
+
+        :param callback: A callable taking no arguments.
+        """
+        callback()
+
     def close(self):
         """Write the closing </stream> tag to make this XML well formed."""
-        self._out.write("</stream>")
\ No newline at end of file
+        self._out.write("</stream>")
+
+
+class QueuedEventWriter(EventWriter):
+    """``QueuedEventWriter`` is an ``EventWriter`` that hands events to a
+    dedicated writer thread through a bounded queue.
+
+    Producers serialize their events and return as soon as there is room in
+    the queue. When the output is slow the queue fills up, ``backpressure``
+    becomes ``True`` and ``write_event`` blocks, so producers can reduce their
+    concurrency instead of buffering without limit.
+
+    **Example**::
+
+        ew = QueuedEventWriter(maxsize=500)
+        ew.write_event(event)
+        if ew.backpressure:
+            # fetch less
+        ew.close()
+
+    """
+    _STOP = object()
+
+    def __init__(self, output = sys.stdout, error = sys.stderr, maxsize=1000, high_water=0.8):
+        """
+        :param output: Where to write the output; defaults to sys.stdout.
+        :param error: Where to write any errors; defaults to sys.stderr.
+        :param maxsize: Maximum number of serialized events held in the queue.
+        :param high_water: Fraction of ``maxsize`` from which ``backpressure`` is reported.
+        """
+        super(QueuedEventWriter, self).__init__(output, error)
+        self.maxsize = maxsize
+        self.high_water = max(1, int(maxsize * high_water))
+
+        self._queue = self._create_queue(maxsize)
+        self._lock = threading.Lock()
+        self._blocked_time = 0.0
+        self._blocked_count = 0
+        self._max_queue_depth = 0
+        self._events_written = 0
+        self._error = None
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._write_loop, name="QueuedEventWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        """The number of items waiting to be written."""
+        return self._queue.qsize()
+
+    @property
+    def backpressure(self):
+        """``True`` when the queue is filled up to the high-water mark."""
+        return self._queue.qsize() >= self.high_water
+
+    @property
+    def blocked_time(self):
+        """Total number of seconds producers spent waiting for room in the queue."""
+        return self._blocked_time
+
+    def metrics(self):
+        """Returns a ``dict`` with the queue depth, the maximum depth seen, the
+        number of times and total seconds producers were blocked, and the
+        number of events written so far.
+        """
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._max_queue_depth,
+            "blocked_count": self._blocked_count,
+            "blocked_time": self._blocked_time,
+            "events_written": self._events_written
+        }
+
+    def write_event(self, event, timeout=None):
+        """Queues an ``Event`` object to be written to Splunk.
+
+        Blocks while the queue is full.
+
+        :param event: An ``Event`` object.
+        :param timeout: Maximum number of seconds to wait for room in the
+            queue, or ``None`` to wait indefinitely.
+        :raises Queue.Full: if ``timeout`` expired before there was room.
+        """
+        buf = StringIO()
+        event.write_to(buf)
+        self._put(buf.getvalue(), timeout)
+
+    def write_xml_document(self, document):
+        """Queues a string representation of an ``ElementTree`` object to be
+        written after the events queued before it.
+
+        :param document: An ``ElementTree`` object.
+        """
+        self._put((ET.tostring(document),), None)
+
+    def write_xml_string(self, document):
+        """Queues an already serialized XML document to be written after the
+        events queued before it.
+
+        :param document: ``string``, the XML document.
+        """
+        self._put((document,), None)
+
+    def call_when_written(self, callback):
+        """Queues ``callback`` to be called by the writer thread once every
+        event queued before it has been written.
+
+        :param callback: A callable taking no arguments.
+        """
+        self._put(callback, None)
+
+    def close(self):
+        """Writes all queued events, stops the writer thread and writes the
+        closing </stream> tag.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise_error()
+        if self.header_written:
+            self._out.write("</stream>")
+            self._out.flush()
+
+    def _create_queue(self, maxsize):
+        return Queue(maxsize)
+
+    def _put(self, item, timeout):
+        self._raise_error()
+        if self._closed:
+            raise ValueError("Cannot write to a closed QueuedEventWriter.")
+        try:
+            self._queue.put_nowait(item)
+        except Full:
+            start = time.time()
+            try:
+                self._queue.put(item, True, timeout)
+            finally:
+                with self._lock:
+                    self._blocked_count += 1
+                    self._blocked_time += time.time() - start
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _write_loop(self):
+        out = self._out
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self._error is not None:
+                # Keep draining so producers do not block forever; the
+                # error is raised to them on their next write.
+                continue
+            if callable(item):
+                self._call(item)
+                continue
+            try:
+                if isinstance(item, tuple):
+                    out.write(item[0])
+                else:
+                    if not self.header_written:
+                        out.write("<stream>")
+                        self.header_written = True
+                    out.write(item)
+                    self._events_written += 1
+                if self._queue.empty():
+                    out.flush()
+            except Exception as e:
+                self._error = e
+
+    def _call(self, callback):
+        # Everything queued before the callback has to be on the output.
+        try:
+            self._out.flush()
+        except Exception as e:
+            self._error = e
+            return
+        try:
+            callback()
+        except Exception as e:
+            self.log(EventWriter.ERROR, "Callback after write failed: %s" % str(e))
+
+
+class SpillingEventWriter(QueuedEventWriter):
+    """``SpillingEventWriter`` is a ``QueuedEventWriter`` whose queue spills
+    to disk instead of blocking producers.
+
+    Up to ``maxsize`` events are held in memory; the overflow is appended to
+    segment files under ``spill_dir`` and written to Splunk in order once the
+    output catches up. ``backpressure`` is still reported from the high-water
+    mark on, so producers can slow down, but they are never blocked and no
+    event is dropped.
+
+    Use ``call_when_written`` to commit checkpoints: the callback runs only
+    after every event queued before it, spilled or not, has been written.
+
+    **Example**::
+
+        ew = SpillingEventWriter(spill_dir=checkpoint_dir)
+        for event in events:
+            ew.write_event(event)
+        ew.call_when_written(lambda: save_checkpoint(last_id))
+        ew.close()
+
+    """
+    def __init__(self, output = sys.stdout, error = sys.stderr, maxsize=1000, high_water=0.8,
+                 spill_dir=None, segment_size=16 * 1024 * 1024):
+        """
+        :param output: Where to write the output; defaults to sys.stdout.
+        :param error: Where to write any errors; defaults to sys.stderr.
+        :param maxsize: Number of serialized events held in memory before spilling.
+        :param high_water: Fraction of ``maxsize`` from which ``backpressure`` is reported.
+        :param spill_dir: Directory for the segment files; defaults to the
+            system temporary directory.
+        :param segment_size: Size in bytes of a segment file.
+        """
+        self._spill_dir = spill_dir
+        self._segment_size = segment_size
+        super(SpillingEventWriter, self).__init__(output, error, maxsize, high_water)
+
+    def metrics(self):
+        """Returns the ``QueuedEventWriter`` metrics plus the number of events
+        currently on disk and the total number of items and bytes spilled.
+        """
+        metrics = super(SpillingEventWriter, self).metrics()
+        metrics["spilled"] = self._queue.spilled
+        metrics["spilled_total"] = self._queue.spilled_total
+        metrics["spilled_bytes"] = self._queue.spilled_bytes
+        return metrics
+
+    def close(self):
+        """Writes all queued and spilled events, stops the writer thread,
+        writes the closing </stream> tag and removes the segment files.
+        """
+        try:
+            super(SpillingEventWriter, self).close()
+        finally:
+            self._queue.close()
+
+    def _create_queue(self, maxsize):
+        return SpillQueue(self._spill_dir, maxsize, self._segment_size)
@@ -12,12 +12,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from itertools import chain
+
 try:
     import xml.etree.cElementTree as ET
 except ImportError as ie:
     import xml.etree.ElementTree as ET
 
-from .utils import parse_xml_data
+from .utils import parse_xml_data, iterparse_input_definition
 
 class InputDefinition:
     """``InputDefinition`` encodes the XML defining inputs that Splunk passes to
@@ -31,6 +33,8 @@ class InputDefinition:
     def __init__ (self):
         self.metadata = {}
         self.inputs = {}
+        self._streamed = False
+        self._pending = None
 
     def __eq__(self, other):
         if not isinstance(other, InputDefinition):
@@ -56,4 +60,52 @@ class InputDefinition:
             else:
                 definition.metadata[node.tag] = node.text
 
-        return definition
\ No newline at end of file
+        return definition
+
+    @staticmethod
+    def iterparse(stream):
+        """Incrementally parse a stream containing XML into an ``InputDefinition``.
+
+        Only the metadata preceding the configuration is read up front; the
+        stanzas are left on the stream and parsed one at a time by
+        ``iter_inputs``, so processing can start before the whole configuration
+        has been read.
+
+        :param stream: stream containing XML to parse.
+        :return: definition: an ``InputDefinition`` object with empty ``inputs``.
+        """
+        definition = InputDefinition()
+        definition._streamed = True
+        definition._pending = iterparse_input_definition(stream)
+
+        for kind, key, value in definition._pending:
+            if kind == "stanza":
+                definition._pending = chain([(kind, key, value)], definition._pending)
+                break
+            definition.metadata[key] = value
+
+        return definition
+
+    def iter_inputs(self):
+        """Returns an iterator of ``(name, parameters)`` for every input stanza.
+
+        On a definition created by ``iterparse`` the stanzas are parsed from the
+        stream as they are requested and are not kept in ``inputs``; they can be
+        iterated only once, and a second call raises ``ValueError``. Otherwise
+        this iterates over ``inputs``.
+        """
+        if not self._streamed:
+            return self.inputs.iteritems()
+
+        if self._pending is None:
+            raise ValueError("The stanzas of a streamed input definition can be iterated only once")
+
+        events, self._pending = self._pending, None
+        return self._iter_stanzas(events)
+
+    def _iter_stanzas(self, events):
+        for kind, key, value in events:
+            if kind == "stanza":
+                yield key, value
+            else:
+                self.metadata[key] = value
@@ -14,9 +14,10 @@
 
 from abc import ABCMeta, abstractmethod
 from urlparse import urlsplit
+import errno
+import os
 import sys
 
-from ..client import Service
 from .event_writer import EventWriter
 from .input_definition import InputDefinition
 from .validation_definition import ValidationDefinition
@@ -39,6 +40,11 @@ class Script(object):
     """
     __metaclass__ = ABCMeta
 
+    #: When ``True`` the input definition is parsed incrementally with
+    #: ``InputDefinition.iterparse`` and ``stream_events`` should iterate over
+    #: ``inputs.iter_inputs()`` instead of ``inputs.inputs``.
+    streaming_input_definition = False
+
     def __init__(self):
         self._input_definition = None
         self._service = None
@@ -68,22 +74,35 @@ class Script(object):
                 # This script is running as an input. Input definitions will be
                 # passed on stdin as XML, and the script will write events on
                 # stdout and log entries on stderr.
-                self._input_definition = InputDefinition.parse(input_stream)
-                self.stream_events(self._input_definition, event_writer)
+                if self.streaming_input_definition:
+                    self._input_definition = InputDefinition.iterparse(input_stream)
+                else:
+                    self._input_definition = InputDefinition.parse(input_stream)
+                try:
+                    self.stream_events(self._input_definition, event_writer)
+                except:
+                    # Still write the events queued before the failure and
+                    # release the writer, but report the original error.
+                    error = sys.exc_info()
+                    try:
+                        event_writer.close()
+                    except Exception:
+                        pass
+                    raise error[0], error[1], error[2]
                 event_writer.close()
                 return 0
 
             elif str(args[1]).lower() == "--scheme":
                 # Splunk has requested XML specifying the scheme for this
                 # modular input Return it and exit.
-                scheme = self.get_scheme()
-                if scheme is None:
+                scheme_xml = self.get_scheme_xml()
+                if scheme_xml is None:
                     event_writer.log(
                         EventWriter.FATAL,
                         "Modular input script returned a null scheme.")
                     return 1
                 else:
-                    event_writer.write_xml_document(scheme.to_xml())
+                    event_writer.write_xml_string(scheme_xml)
                     return 0
 
             elif args[1].lower() == "--validate-arguments":
@@ -127,6 +146,10 @@ class Script(object):
         if self._input_definition is None:
             return None
 
+        # Imported here so --scheme and --validate-arguments runs do not pay
+        # for loading the SDK client.
+        from ..client import Service
+
         splunkd_uri = self._input_definition.metadata["server_uri"]
         session_key = self._input_definition.metadata["session_key"]
 
@@ -148,6 +171,79 @@ class Script(object):
         :return: a ``Scheme`` object representing the parameters for this modular input.
         """
 
+    def scheme_cache_path(self):
+        """Returns the path of a file in which the serialized scheme is cached
+        between ``--scheme`` runs.
+
+        Splunk asks for the scheme every time the Data Inputs page is loaded.
+        Override this to return a path that changes whenever the scheme does
+        (for example one containing the app version); the default of ``None``
+        disables the cache.
+
+        :return: ``string`` path of the cache file, or ``None``.
+        """
+        return None
+
+    def prune_scheme_cache(self, path):
+        """Removes scheme cache files other than *path*, such as the ones
+        written for earlier versions.
+
+        Called by ``get_scheme_xml`` after it has written the cache file at
+        *path*. The default does nothing.
+
+        :param path: ``string`` path of the current cache file.
+        """
+        pass
+
+    def get_scheme_xml(self):
+        """Returns the scheme serialized as an XML string.
+
+        The string is read from ``scheme_cache_path`` when that file exists.
+        Otherwise it is built from ``get_scheme`` and, if a cache path is set,
+        written there for the next run, creating its directory if need be,
+        after which ``prune_scheme_cache`` is called. Failing to read or write
+        the cache is not an error.
+
+        :return: ``string``, or ``None`` if ``get_scheme`` returned ``None``.
+        """
+        path = self.scheme_cache_path()
+
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except (IOError, OSError):
+                pass
+
+        scheme = self.get_scheme()
+        if scheme is None:
+            return None
+        scheme_xml = ET.tostring(scheme.to_xml())
+
+        if path is not None:
+            temp_path = "%s.%d.tmp" % (path, os.getpid())
+            try:
+                # Splunk may not have created the directory yet, as on a fresh install
+                directory = os.path.dirname(path)
+                if directory:
+                    try:
+                        os.makedirs(directory)
+                    except OSError as error:
+                        if error.errno != errno.EEXIST:
+                            raise
+                with open(temp_path, "wb") as f:
+                    f.write(scheme_xml)
+                os.rename(temp_path, path)
+            except (IOError, OSError):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            else:
+                self.prune_scheme_cache(path)
+
+        return scheme_xml
+
     def validate_input(self, definition):
         """Handles external validation for modular input kinds.
 
@@ -0,0 +1,239 @@
+# Copyright 2011-2015 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from collections import deque
+import errno
+import itertools
+import mmap
+import os
+from Queue import Empty
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+_HEADER = struct.Struct(">cI")
+
+_EVENT = "E"
+_DOCUMENT = "D"
+_REFERENCE = "R"
+
+
+class SpillQueue(object):
+    """A FIFO queue that keeps up to ``memory_size`` items in memory and
+    spills the overflow to append-only segment files on disk.
+
+    Once anything has been spilled, new items are appended to disk as well
+    until the spilled items have been read back, so items always come out in
+    the order they were put in. Segments are replayed through ``mmap`` and
+    deleted as soon as they have been read.
+
+    Items are ``str`` (an event) or a 1-tuple holding a ``str`` (an XML
+    document). Any other object, such as a callback, cannot be written to
+    disk; it stays in memory and only a reference to it is spilled.
+
+    The queue implements the subset of the ``Queue.Queue`` interface that
+    ``QueuedEventWriter`` uses. It never raises ``Queue.Full``.
+
+    The private spill directory is named after the process that owns it.
+    Creating a queue in ``directory`` removes the spill directories that
+    processes which are no longer running left there, for example when
+    they were killed before they could call ``close``.
+    """
+    def __init__(self, directory=None, memory_size=1000, segment_size=16 * 1024 * 1024):
+        """
+        :param directory: Directory in which a private spill directory is
+            created; defaults to the system temporary directory.
+        :param memory_size: Number of items held in memory before spilling.
+        :param segment_size: Size in bytes after which a new segment file is started.
+        """
+        if directory is not None:
+            if os.path.isdir(directory):
+                remove_stale_directories(directory)
+            else:
+                os.makedirs(directory)
+        self.directory = tempfile.mkdtemp(prefix="spill-%d-" % os.getpid(), dir=directory)
+        self.memory_size = memory_size
+        self.segment_size = segment_size
+
+        self._memory = deque()
+        self._not_empty = threading.Condition(threading.Lock())
+
+        self._segment_ids = itertools.count()
+        self._segments = deque()     # closed segment paths, oldest first
+        self._write_path = None
+        self._write_file = None
+        self._read_map = None
+        self._read_path = None
+        self._read_offset = 0
+
+        self._references = {}
+        self._reference_ids = itertools.count()
+
+        self._spilled = 0
+        self.spilled_total = 0
+        self.spilled_bytes = 0
+
+    @property
+    def spilled(self):
+        """The number of items currently held on disk."""
+        return self._spilled
+
+    def qsize(self):
+        return len(self._memory) + self._spilled
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def put(self, item, block=True, timeout=None):
+        with self._not_empty:
+            if self._spilled == 0 and len(self._memory) < self.memory_size:
+                self._memory.append(item)
+            else:
+                self._spill(item)
+            self._not_empty.notify()
+
+    def put_nowait(self, item):
+        self.put(item, False)
+
+    def get(self, block=True, timeout=None):
+        with self._not_empty:
+            if timeout is None:
+                while self.empty():
+                    self._not_empty.wait()
+            else:
+                end = time.time() + timeout
+                while self.empty():
+                    remaining = end - time.time()
+                    if remaining <= 0.0:
+                        raise Empty
+                    self._not_empty.wait(remaining)
+            if self._memory:
+                return self._memory.popleft()
+            return self._unspill()
+
+    def close(self):
+        """Closes and deletes all segment files. Items still on disk are lost."""
+        with self._not_empty:
+            if self._write_file is not None:
+                self._write_file.close()
+                self._write_file = None
+            if self._read_map is not None:
+                self._read_map.close()
+                self._read_map = None
+            self._memory.clear()
+            self._segments.clear()
+            self._references.clear()
+            self._spilled = 0
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _spill(self, item):
+        if isinstance(item, basestring):
+            kind, payload = _EVENT, item
+        elif isinstance(item, tuple):
+            kind, payload = _DOCUMENT, item[0]
+        else:
+            key = next(self._reference_ids)
+            self._references[key] = item
+            kind, payload = _REFERENCE, str(key)
+        if isinstance(payload, unicode):
+            payload = payload.encode("utf-8")
+
+        if self._write_file is None:
+            self._write_path = os.path.join(self.directory, "%08d.seg" % next(self._segment_ids))
+            self._write_file = open(self._write_path, "wb")
+        self._write_file.write(_HEADER.pack(kind, len(payload)))
+        self._write_file.write(payload)
+        if self._write_file.tell() >= self.segment_size:
+            self._rotate()
+
+        self._spilled += 1
+        self.spilled_total += 1
+        self.spilled_bytes += _HEADER.size + len(payload)
+
+    def _rotate(self):
+        self._write_file.close()
+        self._segments.append(self._write_path)
+        self._write_file = self._write_path = None
+
+    def _unspill(self):
+        if self._read_map is None:
+            if not self._segments:
+                # Everything left is in the segment being written.
+                self._rotate()
+            self._read_path = self._segments.popleft()
+            with open(self._read_path, "rb") as f:
+                self._read_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_offset = 0
+
+        offset = self._read_offset
+        kind, length = _HEADER.unpack_from(self._read_map, offset)
+        offset += _HEADER.size
+        payload = self._read_map[offset:offset + length]
+        self._read_offset = offset + length
+
+        if self._read_offset >= len(self._read_map):
+            self._read_map.close()
+            self._read_map = None
+            os.remove(self._read_path)
+
+        self._spilled -= 1
+        if kind == _REFERENCE:
+            return self._references.pop(int(payload))
+        elif kind == _DOCUMENT:
+            return (payload,)
+        return payload
+
+
+def remove_stale_directories(directory):
+    """Removes the spill directories in *directory* whose owning process is
+    no longer running, with the segments in them.
+
+    The events in those segments never reached Splunk. Inputs that commit
+    their checkpoints with ``call_when_written`` fetch them again.
+
+    :param directory: Directory in which ``SpillQueue`` objects were created.
+    """
+    for name in os.listdir(directory):
+        if not name.startswith("spill-"):
+            continue
+        pid = name.split("-")[1]
+        if pid.isdigit() and _is_running(int(pid)):
+            continue
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def _is_running(pid):
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        # os.kill would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
@@ -14,6 +14,11 @@
 
 # File for utility functions
 
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
 def xml_compare(expected, found):
     """Checks equality of two ``ElementTree`` objects.
 
@@ -59,14 +64,48 @@ def parse_parameters(param_node):
     else:
         raise ValueError("Invalid configuration scheme, %s tag unexpected." % param_node.tag)
 
+def parse_stanza(stanza_node):
+    parameters = {}
+    for param in stanza_node:
+        parameters[param.get("name")] = parse_parameters(param)
+    return parameters
+
 def parse_xml_data(parent_node, child_node_tag):
     data = {}
     for child in parent_node:
         if child.tag == child_node_tag:
             if child_node_tag == "stanza":
-                data[child.get("name")] = {}
-                for param in child:
-                    data[child.get("name")][param.get("name")] = parse_parameters(param)
+                data[child.get("name")] = parse_stanza(child)
         elif "item" == parent_node.tag:
             data[child.get("name")] = parse_parameters(child)
-    return data
\ No newline at end of file
+    return data
+
+def iterparse_input_definition(stream):
+    """Incrementally parses the input definition XML Splunk writes to a
+    modular input's stdin.
+
+    Yields ``("metadata", tag, text)`` for every top level node and
+    ``("stanza", name, parameters)`` for every stanza of the configuration as
+    soon as its closing tag has been read. Processed nodes are cleared, so
+    memory use does not grow with the number of stanzas.
+
+    :param stream: stream containing XML to parse.
+    """
+    depth = 0
+    root = configuration = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if depth == 0:
+                root = elem
+            elif depth == 1 and elem.tag == "configuration":
+                configuration = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            if elem.tag != "configuration":
+                yield "metadata", elem.tag, elem.text
+            root.clear()
+        elif depth == 2 and elem.tag == "stanza" and configuration is not None:
+            yield "stanza", elem.get("name"), parse_stanza(elem)
+            configuration.remove(elem)
@@ -12,8 +12,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-"""The **splunklib.results** module provides a streaming XML reader for Splunk
-search results.
+"""The **splunklib.results** module provides streaming XML, JSON and CSV
+readers for Splunk search results.
 
 Splunk search results can be returned in a variety of formats including XML,
 JSON, and CSV. To make it easier to stream search results in XML format, they
@@ -30,6 +30,9 @@ as follows:::
     for item in reader:
         print(item)
     print "Results are a preview: %s" % reader.is_preview
+
+Results requested with ``output_mode="json"`` or ``output_mode="csv"`` are
+read the same way with :class:`JSONResultsReader` or :class:`CSVResultsReader`.
 """
 
 try:
@@ -47,8 +50,14 @@ try:
 except:
     from StringIO import StringIO
 
+import csv
+import json
+from itertools import izip
+
 __all__ = [
     "ResultsReader",
+    "JSONResultsReader",
+    "CSVResultsReader",
     "Message"
 ]
 
@@ -95,15 +104,15 @@ class _ConcatenatedStream(object):
 
         If *n* is ``None``, return all available characters.
         """
-        response = ""
+        response = []
         while len(self.streams) > 0 and (n is None or n > 0):
             txt = self.streams[0].read(n)
-            response += txt
+            response.append(txt)
             if n is not None:
                 n -= len(txt)
-            if n > 0 or n is None:
+            if n is None or n > 0:
                 del self.streams[0]
-        return response
+        return "".join(response)
 
 class _XMLDTDFilter(object):
     """Lazily remove all XML DTDs from a stream.
@@ -112,42 +121,75 @@ class _XMLDTDFilter(object):
     removed in their entirety from the stream. No regular expressions
     are used, however, so everything still streams properly.
 
+    The stream is read in blocks. A declaration or a ``<`` that is split
+    across two blocks is carried over to the next one.
+
     **Example**::
 
         from StringIO import StringIO
         s = _XMLDTDFilter("<?xml abcd><element><?xml ...></element>")
         assert s.read() == "<element></element>"
     """
+    block_size = 64 * 1024
+
     def __init__(self, stream):
         self.stream = stream
+        self._buffer = ""           # filtered characters not yet returned
+        self._pending = ""          # a trailing "<" whose next character is unknown
+        self._in_declaration = False
+        self._eof = False
 
     def read(self, n=None):
         """Read at most *n* characters from this stream.
 
         If *n* is ``None``, return all available characters.
         """
-        response = ""
-        while n is None or n > 0:
-            c = self.stream.read(1)
-            if c == "":
-                break
-            elif c == "<":
-                c += self.stream.read(1)
-                if c == "<?":
-                    while True:
-                        q = self.stream.read(1)
-                        if q == ">":
-                            break
-                else:
-                    response += c
-                    if n is not None:
-                        n -= len(c)
+        response = [self._buffer]
+        size = len(self._buffer)
+        self._buffer = ""
+        while not self._eof and (n is None or size < n):
+            block = self.stream.read(self.block_size if n is None else max(n - size, 1))
+            if block == "":
+                # A "<" at the very end of the stream is kept as is
+                self._eof = True
+                block, self._pending = self._pending, ""
             else:
-                response += c
-                if n is not None:
-                    n -= 1
+                block = self._filter(self._pending + block)
+            response.append(block)
+            size += len(block)
+        response = "".join(response)
+        if n is not None and len(response) > n:
+            response, self._buffer = response[:n], response[n:]
         return response
 
+    def _filter(self, block):
+        pieces = []
+        start = 0
+        if self._in_declaration:
+            start = block.find(">")
+            if start < 0:
+                return ""
+            start += 1
+            self._in_declaration = False
+        while True:
+            i = block.find("<?", start)
+            if i < 0:
+                break
+            pieces.append(block[start:i])
+            start = block.find(">", i + 2)
+            if start < 0:
+                self._in_declaration = True
+                self._pending = ""
+                return "".join(pieces)
+            start += 1
+        if block.endswith("<"):
+            pieces.append(block[start:-1])
+            self._pending = "<"
+        else:
+            pieces.append(block[start:])
+            self._pending = ""
+        return "".join(pieces)
+
 class ResultsReader(object):
     """This class returns dictionaries and Splunk messages from an XML results
     stream.
@@ -208,32 +250,26 @@ class ResultsReader(object):
         """Parse results and messages out of *stream*."""
         result = None
         values = None
+        root = parent = None
+        # Field names repeat in every result; each is encoded and interned once
+        field_names = {}
         try:
             for event, elem in et.iterparse(stream, events=('start', 'end')):
-                if elem.tag == 'results' and event == 'start':
-                    # The wrapper element is a <results preview="0|1">. We
-                    # don't care about it except to tell is whether these
-                    # are preview results, or the final results from the
-                    # search.
-                    is_preview = elem.attrib['preview'] == '1'
-                    self.is_preview = is_preview
-                if elem.tag == 'result':
-                    if event == 'start':
-                        result = OrderedDict()
-                    elif event == 'end':
-                        yield result
-                        result = None
+                tag = elem.tag
+                if event == 'end':
+                    if tag == 'v' or tag == 'text':
+                        values.append(_text(elem))
                         elem.clear()
 
-                elif elem.tag == 'field' and result is not None:
-                    # We need the 'result is not None' check because
-                    # 'field' is also the element name in the <meta>
-                    # header that gives field order, which is not what we
-                    # want at all.
-                    if event == 'start':
-                        values = []
-                    elif event == 'end':
-                        field_name = elem.attrib['k'].encode('utf8')
+                    elif tag == 'field' and result is not None:
+                        # We need the 'result is not None' check because
+                        # 'field' is also the element name in the <meta>
+                        # header that gives field order, which is not what we
+                        # want at all.
+                        key = elem.attrib['k']
+                        field_name = field_names.get(key)
+                        if field_name is None:
+                            field_name = field_names[key] = intern(key.encode('utf8'))
                         if len(values) == 1:
                             result[field_name] = values[0]
                         else:
@@ -245,36 +281,38 @@ class ResultsReader(object):
                         # streaming.
                         elem.clear()
 
-                elif elem.tag in ('text', 'v') and event == 'end':
-                    try:
-                        text = "".join(elem.itertext())
-                    except AttributeError:
-                        # Assume we're running in Python < 2.7, before itertext() was added
-                        # So we'll define it here
-
-                        def __itertext(self):
-                          tag = self.tag
-                          if not isinstance(tag, basestring) and tag is not None:
-                              return
-                          if self.text:
-                              yield self.text
-                          for e in self:
-                              for s in __itertext(e):
-                                  yield s
-                              if e.tail:
-                                  yield e.tail
-
-                        text = "".join(__itertext(elem))
-                    values.append(text.encode('utf8'))
-                    elem.clear()
-
-                elif elem.tag == 'msg':
-                    if event == 'start':
-                        msg_type = elem.attrib['type']
-                    elif event == 'end':
+                    elif tag == 'result':
+                        yield result
+                        result = None
+                        # The emptied <result> elements would still pile up
+                        # in their <results> element
+                        if parent is not None:
+                            parent.clear()
+
+                    elif tag == 'msg':
                         text = elem.text if elem.text is not None else ""
-                        yield Message(msg_type, text.encode('utf8'))
+                        yield Message(elem.attrib['type'], text.encode('utf8'))
                         elem.clear()
+
+                    elif tag == 'results' and root is not None:
+                        root.clear()
+
+                elif tag == 'field':
+                    values = []
+
+                elif tag == 'result':
+                    result = OrderedDict()
+
+                elif tag == 'results':
+                    # The wrapper element is a <results preview="0|1">. We
+                    # don't care about it except to tell is whether these
+                    # are preview results, or the final results from the
+                    # search.
+                    self.is_preview = elem.attrib['preview'] == '1'
+                    parent = elem
+
+                elif root is None:
+                    root = elem
         except SyntaxError as pe:
             # This is here to handle the same incorrect return from
             # splunk that is described in __init__.
@@ -284,5 +322,179 @@ class ResultsReader(object):
                 raise
 
 
+class JSONResultsReader(object):
+    """This class returns dictionaries and Splunk messages from a JSON results
+    stream, as requested with ``output_mode="json"``.
+
+    ``JSONResultsReader`` yields the same items as :class:`ResultsReader`: a
+    ``dict`` for each result, with multivalue fields as lists, and a
+    :class:`Message` object for each Splunk message. The ``is_preview``
+    field tells whether the most recent results are a preview.
+
+    The ``search/jobs/export`` endpoint writes one JSON object per line,
+    which is decoded as soon as the line has been read. Other endpoints,
+    such as ``search/jobs/{search_id}/results``, write a single object that
+    holds all of the results; it is decoded once it has been read
+    completely.
 
+    :param `stream`: The stream to read from (any object that supports
+        ``.read()``).
 
+    **Example**::
+
+        import results
+        response = service.jobs.export("search * | head 5", output_mode="json")
+        reader = results.JSONResultsReader(response)
+        for result in reader:
+            if isinstance(result, dict):
+                print "Result: %s" % result
+            elif isinstance(result, results.Message):
+                print "Message: %s" % result
+        print "is_preview = %s " % reader.is_preview
+    """
+    def __init__(self, stream):
+        self.is_preview = None
+        self._gen = self._parse_results(stream)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return self._gen.next()
+
+    def _parse_results(self, stream):
+        """Parse results and messages out of *stream*."""
+        decode = json.JSONDecoder(object_pairs_hook=_EncodedPairs()).decode
+        for line in _iterlines(stream):
+            if line.isspace():
+                continue
+            document = decode(line)
+            if 'preview' in document:
+                self.is_preview = document['preview']
+            for message in document.get('messages') or ():
+                yield Message(message.get('type'), message.get('text', ""))
+            if 'result' in document:
+                yield document['result']
+            for result in document.get('results') or ():
+                yield result
+
+class CSVResultsReader(object):
+    """This class returns dictionaries from a CSV results stream, as
+    requested with ``output_mode="csv"``.
+
+    The first row of the stream gives the field names. Each row that
+    follows is returned as a ``dict`` as soon as it has been read. Values
+    are returned the way splunkd writes them, so a multivalue field is a
+    single string. A CSV stream carries neither Splunk messages nor a
+    preview flag, so ``is_preview`` is always ``None``.
+
+    :param `stream`: The stream to read from (any object that supports
+        ``.read()``).
+
+    **Example**::
+
+        import results
+        response = service.jobs.export("search * | head 5", output_mode="csv")
+        for result in results.CSVResultsReader(response):
+            print "Result: %s" % result
+    """
+    def __init__(self, stream):
+        self.is_preview = None
+        self._gen = self._parse_results(stream)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return self._gen.next()
+
+    def _parse_results(self, stream):
+        """Parse results out of *stream*."""
+        reader = csv.reader(_iterlines(stream))
+        for row in reader:
+            if row:
+                fieldnames = [intern(name) for name in row]
+                break
+        else:
+            return
+        for row in reader:
+            if row:  # a blank line, such as one at the end of the stream, is not a result
+                yield OrderedDict(izip(fieldnames, row))
+
+
+class _EncodedPairs(object):
+    # An object_pairs_hook that returns JSON objects as OrderedDicts of UTF-8
+    # encoded strings, like ResultsReader does. Keys are interned once.
+
+    def __init__(self):
+        self._keys = {}
+
+    def __call__(self, pairs):
+        keys = self._keys
+        item = OrderedDict()
+        for key, value in pairs:
+            name = keys.get(key)
+            if name is None:
+                name = keys[key] = intern(key.encode('utf8'))
+            if isinstance(value, unicode):
+                value = value.encode('utf8')
+            elif isinstance(value, list):
+                value = [v.encode('utf8') if isinstance(v, unicode) else v for v in value]
+            item[name] = value
+        return item
+
+
+def _iterlines(stream, block_size=64 * 1024):
+    # Yields the lines of *stream*, each with its line end, reading blocks of
+    # *block_size* characters. A line that spans blocks is joined once.
+    pending = []
+    while True:
+        block = stream.read(block_size)
+        if block == "":
+            break
+        start = 0
+        end = block.find("\n")
+        while end >= 0:
+            end += 1
+            if pending:
+                pending.append(block[start:end])
+                yield "".join(pending)
+                pending = []
+            else:
+                yield block[start:end]
+            start = end
+            end = block.find("\n", start)
+        if start < len(block):
+            pending.append(block[start:])
+    if pending:
+        yield "".join(pending)
+
+
+def _text(elem):
+    if len(elem) == 0:
+        text = elem.text or ""
+    else:
+        text = "".join(_itertext(elem))
+    if isinstance(text, unicode):
+        text = text.encode('utf8')
+    return text
+
+def _itertext(elem):
+    try:
+        return elem.itertext()
+    except AttributeError:
+        # Assume we're running in Python < 2.7, before itertext() was added
+        # So we'll define it here
+        return _itertext_py26(elem)
+
+def _itertext_py26(elem):
+    tag = elem.tag
+    if not isinstance(tag, basestring) and tag is not None:
+        return
+    if elem.text:
+        yield elem.text
+    for e in elem:
+        for s in _itertext_py26(e):
+            yield s
+        if e.tail:
+            yield e.tail
@@ -153,3 +153,4 @@ from .reporting_command import ReportingCommand
 
 from .external_search_command import execute, ExternalSearchCommand
 from .search_command import dispatch, SearchMetric
+from .internals import RecordBatch
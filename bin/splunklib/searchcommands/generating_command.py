@@ -193,7 +193,10 @@ class GeneratingCommand(SearchCommand):
         :return: `None`.
 
         """
-        self._record_writer.write_records(self.generate())
+        if self._configuration.columnar:
+            self._record_writer.write_batches(self.generate())
+        else:
+            self._record_writer.write_records(self.generate())
         self.finish()
 
     # endregion
@@ -22,9 +22,11 @@ try:
 except ImportError:
     from ..ordereddict import OrderedDict
 from cStringIO import StringIO
-from itertools import chain, imap
+from itertools import chain, imap, islice, izip, repeat
 from json import JSONDecoder, JSONEncoder
 from json.encoder import encode_basestring_ascii as json_encode_string
+from Queue import Queue
+from threading import Thread
 from urllib import unquote
 
 import csv
@@ -33,6 +35,12 @@ import os
 import re
 import sys
 
+try:
+    import numpy
+except ImportError:
+    # Columns are converted to lists rather than arrays
+    numpy = None
+
 from . import environment
 
 csv.field_size_limit(10485760)  # The default value is 128KB; upping to 10MB. See SPL-12117 for background on this issue
@@ -51,6 +59,39 @@ if sys.platform == 'win32':
         setmode(fileno, os.O_BINARY)
 
 
+class ChunkBuffer(object):
+    """ A reusable buffer for the bodies of chunks read from splunkd.
+
+    Where the input file supports :code:`readinto`, a body is read straight into the buffer and returned as a
+    :class:`memoryview` of it, so reading a chunk copies its body once and allocates nothing. The view is valid until
+    the next body is read. Other files are read as usual.
+
+    """
+    def __init__(self, size=65536):
+        self._buffer = bytearray(size)
+
+    def read(self, ifile, length):
+        readinto = getattr(ifile, 'readinto', None)
+
+        if readinto is None:
+            return ifile.read(length)
+
+        if len(self._buffer) < length:
+            # A new buffer, rather than resizing this one: a view of it may still be around
+            self._buffer = bytearray(max(length, 2 * len(self._buffer)))
+
+        view = memoryview(self._buffer)
+        offset = 0
+
+        while offset < length:
+            count = readinto(view[offset:length])
+            if not count:
+                break
+            offset += count
+
+        return view[:offset]
+
+
 class CommandLineParser(object):
     """ Parses the arguments to a search command.
 
@@ -276,6 +317,10 @@ class ConfigurationSettingsType(type):
             type=bool,
             constraint=None,
             supporting_protocols=[1]),
+        'columnar': specification(
+            type=bool,
+            constraint=None,
+            supporting_protocols=[]),  # local to the command: never sent to splunkd
         'distributed': specification(
             type=bool,
             constraint=None,
@@ -300,6 +345,14 @@ class ConfigurationSettingsType(type):
             type=bool,
             constraint=None,
             supporting_protocols=[1]),
+        'pipelined': specification(
+            type=bool,
+            constraint=None,
+            supporting_protocols=[]),  # local to the command: never sent to splunkd
+        'processes': specification(
+            type=int,
+            constraint=lambda value: 0 <= value <= sys.maxint,
+            supporting_protocols=[]),  # local to the command: never sent to splunkd
         'required_fields': specification(
             type=(list, set, tuple),
             constraint=None,
@@ -425,6 +478,105 @@ class ObjectView(object):
         return str(self.__dict__)
 
 
+class RecordBatch(object):
+    """ A batch of records held as columns: one list or array of values per field.
+
+    Commands configured with :code:`columnar=True` receive the records of each chunk as a :class:`RecordBatch` and may
+    yield batches, records, or both. A column may be any sequence of the batch's length, including a NumPy array.
+    Values decoded from splunkd are strings, or lists of strings for multi-value fields. Use :meth:`numeric` for the
+    values of a column as numbers.
+
+    """
+    def __init__(self, columns=()):
+        self._columns = OrderedDict()
+        self._length = 0
+        for fieldname, column in columns.iteritems() if isinstance(columns, dict) else columns:
+            self[fieldname] = column
+
+    def __contains__(self, fieldname):
+        return fieldname in self._columns
+
+    def __getitem__(self, fieldname):
+        return self._columns[fieldname]
+
+    def __setitem__(self, fieldname, column):
+        columns = self._columns
+        length = len(column)
+        if length != self._length and (len(columns) > 1 or len(columns) == 1 and fieldname not in columns):
+            raise ValueError('Expected a column of length {}, not {}={}'.format(self._length, fieldname, length))
+        columns[fieldname] = column
+        self._length = length
+
+    def __delitem__(self, fieldname):
+        del self._columns[fieldname]
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return 'RecordBatch(' + repr(self._columns.items()) + ')'
+
+    @property
+    def fieldnames(self):
+        return self._columns.keys()
+
+    def get(self, fieldname, default=None):
+        return self._columns.get(fieldname, default)
+
+    def iteritems(self):
+        return self._columns.iteritems()
+
+    def numeric(self, fieldname, dtype=float):
+        """ Returns the values of a column as numbers.
+
+        Values that are missing or cannot be converted are NaN.
+
+        :param fieldname: Name of the column.
+        :type fieldname: basestring
+
+        :param dtype: NumPy data type of the array returned, if NumPy is installed.
+
+        :return: A NumPy array, if NumPy is installed; otherwise a list of :class:`float` values.
+
+        """
+        column = self._columns[fieldname]
+
+        if numpy is not None:
+            try:
+                return numpy.asarray(column, dtype=dtype)
+            except (TypeError, ValueError):
+                return numpy.fromiter(imap(_to_float, column), dtype=float, count=len(column)).astype(dtype)
+
+        return map(_to_float, column)
+
+    def records(self):
+        """ Yields the records of this batch, one :class:`OrderedDict` per row. """
+        fieldnames = self._columns.keys()
+        for values in izip(*self._columns.values()):
+            yield OrderedDict(izip(fieldnames, values))
+
+    def slice(self, start, stop):
+        """ Returns a new batch of the records from :code:`start` up to :code:`stop`. """
+        return RecordBatch((fieldname, column[start:stop]) for fieldname, column in self._columns.iteritems())
+
+    @classmethod
+    def from_records(cls, records):
+        """ Returns a batch of records. Fields missing from a record are :const:`None` in its row. """
+        records = records if isinstance(records, list) else list(records)
+        fieldnames = OrderedDict()
+        for record in records:
+            for fieldname in record:
+                fieldnames[fieldname] = None
+        return cls((fieldname, [record.get(fieldname) for record in records]) for fieldname in fieldnames)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
 class Recorder(object):
 
     def __init__(self, path, f):
@@ -446,6 +598,13 @@ class Recorder(object):
         self._recording.flush()
         return value
 
+    def readinto(self, b):
+        count = self._file.readinto(b)
+        if count:
+            self._recording.write(memoryview(b)[:count].tobytes())
+            self._recording.flush()
+        return count
+
     def readline(self, size=None):
         value = self._file.readline() if size is None else self._file.readline(size)
         if len(value) > 0:
@@ -463,6 +622,70 @@ class Recorder(object):
         self._recording.flush()
 
 
+def _encode_json(value):
+    return str(''.join(RecordWriter._iterencode_json(value, 0)))
+
+
+def _encode_scalar(value):
+    # The field text for a value that is not a list, or for the only item of a list
+    value_t = type(value)
+    if value_t is bytes:
+        return value
+    if value_t is unicode:
+        return value.encode('utf-8', errors='backslashreplace')
+    if value_t is bool:
+        return str(value.real)
+    if value_t is int or value_t is long or value_t is float or value_t is complex:
+        return str(value)
+    if issubclass(value_t, dict):
+        return _encode_json(value)
+    return repr(value).encode('utf-8', errors='backslashreplace')
+
+
+def _encode_item(value):
+    # The text of an item of a multi-value field, which may itself be a list
+    if issubclass(type(value), (dict, list, tuple)):
+        return _encode_json(value)
+    return _encode_scalar(value)
+
+
+def _encode_list(value):
+    # The field text and multi-value text for a list, built in linear time
+    count = len(value)
+    if count == 0:
+        return None, None
+    if count == 1:
+        item = value[0]
+        return (item if type(item) is bytes else _encode_scalar(item)), None
+    items = []
+    append = items.append
+    for item in value:
+        item_t = type(item)
+        if item_t is bytes:
+            append(item)
+        elif item is None:
+            append(b'')
+        elif item_t is unicode:
+            append(item.encode('utf-8', errors='backslashreplace'))
+        elif item_t is int or item_t is float or item_t is long:
+            append(str(item))
+        else:
+            append(_encode_item(item))
+    sv = b'\n'.join(items)
+    if b'$' in sv:
+        items = [item.replace(b'$', b'$$') for item in items]
+    return sv, b'$' + b'$;$'.join(items) + b'$'
+
+
+def _encode_field(value):
+    # The field text and multi-value text for a value of any type
+    if value is None:
+        return None, None
+    if issubclass(type(value), (list, tuple)):
+        return _encode_list(value)
+    return _encode_scalar(value), None
+
+
 class RecordWriter(object):
 
     def __init__(self, ofile, maxresultrows=None):
@@ -470,6 +693,7 @@ class RecordWriter(object):
 
         self._ofile = ofile
         self._fieldnames = None
+        self._encode_row = None
         self._buffer = StringIO()
 
         self._writer = csv.writer(self._buffer, dialect=CsvDialect)
@@ -519,6 +743,19 @@ class RecordWriter(object):
         for record in records:
             write_record(record)
 
+    def write_batch(self, batch):
+        self._ensure_validity()
+        self._write_batch(batch)
+
+    def write_batches(self, batches):
+        """ Writes a sequence of :class:`RecordBatch` objects and records. """
+        self._ensure_validity()
+        for batch in batches:
+            if isinstance(batch, RecordBatch):
+                self._write_batch(batch)
+            else:
+                self._write_record(batch)
+
     def _clear(self):
         self._buffer.reset()
         self._buffer.truncate()
@@ -531,98 +768,122 @@ class RecordWriter(object):
             assert self._record_count == 0 and len(self._inspector) == 0
             raise RuntimeError('I/O operation on closed record writer')
 
-    def _write_record(self, record):
+    def _write_batch(self, batch):
 
+        count = len(batch)
         fieldnames = self._fieldnames
 
-        if fieldnames is None:
-            self._fieldnames = fieldnames = record.keys()
-            value_list = imap(lambda fn: unicode(fn).encode('utf-8'), fieldnames)
-            value_list = imap(lambda fn: (fn, b'__mv_' + fn), value_list)
-            self._writerow(list(chain.from_iterable(value_list)))
-
-        get_value = record.get
-        values = []
-
-        for fieldname in fieldnames:
-            value = get_value(fieldname, None)
-
-            if value is None:
-                values += (None, None)
-                continue
-
-            value_t = type(value)
-
-            if issubclass(value_t, (list, tuple)):
-
-                if len(value) == 0:
-                    values += (None, None)
-                    continue
-
-                if len(value) > 1:
-                    value_list = value
-                    sv = b''
-                    mv = b'$'
-
-                    for value in value_list:
-
-                        if value is None:
-                            sv += b'\n'
-                            mv += b'$;$'
-                            continue
-
-                        value_t = type(value)
-
-                        if value_t is not bytes:
-
-                            if value_t is bool:
-                                value = str(value.real)
-                            elif value_t is unicode:
-                                value = value.encode('utf-8', errors='backslashreplace')
-                            elif value_t is int or value_t is long or value_t is float or value_t is complex:
-                                value = str(value)
-                            elif issubclass(value_t, (dict, list, tuple)):
-                                value = str(''.join(RecordWriter._iterencode_json(value, 0)))
-                            else:
-                                value = repr(value).encode('utf-8', errors='backslashreplace')
-
-                        sv += value + b'\n'
-                        mv += value.replace(b'$', b'$$') + b'$;$'
-
-                    values += (sv[:-1], mv[:-2])
-                    continue
-
-                value = value[0]
-                value_t = type(value)
+        if count == 0:
+            return
 
-            if value_t is bool:
-                values += (str(value.real), None)
-                continue
+        if fieldnames is None:
+            fieldnames = batch.fieldnames
+            self._write_fieldnames(fieldnames)
 
-            if value_t is bytes:
-                values += (value, None)
-                continue
+        # Rows are encoded from the columns of the fields of this output chunk. NumPy arrays and other sequences with a
+        # tolist method are converted first, so that their values are encoded like those of lists.
 
-            if value_t is unicode:
-                values += (value.encode('utf-8', errors='backslashreplace'), None)
-                continue
+        columns = []
 
-            if value_t is int or value_t is long or value_t is float or value_t is complex:
-                values += (str(value), None)
-                continue
+        for fieldname in fieldnames:
+            column = batch.get(fieldname)
+            if column is None:
+                column = repeat(None, count)
+            elif hasattr(column, 'tolist'):
+                column = column.tolist()
+            columns.append(column)
+
+        encode_row = RecordWriter._get_row_encoder(fieldnames, indexed=True)
+        rows = izip(*columns)
+
+        while count > 0:
+            if self._fieldnames is None:
+                self._write_fieldnames(fieldnames)
+            n = min(count, self._maxresultrows - self._record_count)
+            self._writer.writerows(imap(encode_row, islice(rows, n)))
+            self._record_count += n
+            count -= n
+            if self._record_count >= self._maxresultrows:
+                self.flush(partial=True)
+
+    def _write_fieldnames(self, fieldnames):
+        self._fieldnames = fieldnames
+        value_list = imap(lambda fn: unicode(fn).encode('utf-8'), fieldnames)
+        value_list = imap(lambda fn: (fn, b'__mv_' + fn), value_list)
+        self._writerow(list(chain.from_iterable(value_list)))
+        self._encode_row = RecordWriter._get_row_encoder(fieldnames)
 
-            if issubclass(value_t, dict):
-                values += (str(''.join(RecordWriter._iterencode_json(value, 0))), None)
-                continue
+    def _write_record(self, record):
 
-            values += (repr(value).encode('utf-8', errors='backslashreplace'), None)
+        if self._fieldnames is None:
+            self._write_fieldnames(record.keys())
 
-        self._writerow(values)
+        self._writerow(self._encode_row(record))
         self._record_count += 1
 
         if self._record_count >= self._maxresultrows:
             self.flush(partial=True)
 
+    @staticmethod
+    def _get_row_encoder(fieldnames, indexed=False):
+        key = tuple(fieldnames), indexed
+        encode_row = RecordWriter._row_encoders.get(key)
+        if encode_row is None:
+            if len(RecordWriter._row_encoders) >= 64:
+                RecordWriter._row_encoders.clear()
+            encode_row = RecordWriter._row_encoders[key] = RecordWriter._compile_row_encoder(key[0], indexed)
+        return encode_row
+
+    @staticmethod
+    def _compile_row_encoder(fieldnames, indexed=False):
+        # Generates a function that returns the CSV row for a record with these fieldnames, unrolled over the fields.
+        # An indexed encoder takes a row of values in fieldname order, such as a row of the columns of a RecordBatch,
+        # and reads value i as row[i] instead.
+        #
+        #   def encode_row(record):
+        #       get = record.get
+        #       value = get(f0)
+        #       value_t = type(value)
+        #       if value_t is bytes:
+        #           v0 = value; m0 = None
+        #       elif value is None:
+        #           v0 = m0 = None
+        #       ...                                 # inline unicode, int, float, long, list, and dict cases
+        #       else:
+        #           v0, m0 = encode_field(value)
+        #       ...
+        #       return [v0, m0, ...]
+        #
+        # Field names are bound as globals of the generated function, never pasted into its source.
+        lines = ['def encode_row(record):', '    get = record.get'] if not indexed else ['def encode_row(record):']
+        for i in xrange(len(fieldnames)):
+            lines += [
+                ('    value = get(f{0})' if not indexed else '    value = record[{0}]').format(i),
+                '    value_t = type(value)',
+                '    if value_t is bytes:',
+                '        v{0} = value; m{0} = None'.format(i),
+                '    elif value is None:',
+                '        v{0} = m{0} = None'.format(i),
+                '    elif value_t is unicode:',
+                '        v{0} = value.encode("utf-8", "backslashreplace"); m{0} = None'.format(i),
+                '    elif value_t is int or value_t is float or value_t is long:',
+                '        v{0} = str(value); m{0} = None'.format(i),
+                '    elif value_t is list:',
+                '        v{0}, m{0} = encode_list(value)'.format(i),
+                '    elif value_t is dict:',
+                '        v{0} = encode_json(value); m{0} = None'.format(i),
+                '    else:',
+                '        v{0}, m{0} = encode_field(value)'.format(i)]
+        lines.append('    return [' + ', '.join('v{0}, m{0}'.format(i) for i in xrange(len(fieldnames))) + ']')
+        # The names must be str, not unicode, for the generated code to find them at full speed
+        namespace = {b'bytes': bytes, b'encode_field': _encode_field, b'encode_list': _encode_list,
+                     b'encode_json': _encode_json}
+        namespace.update((b'f' + bytes(i), fieldname) for i, fieldname in enumerate(fieldnames))
+        exec compile('\n'.join(lines), '<RecordWriter row encoder>', 'exec') in namespace
+        return namespace['encode_row']
+
+    _row_encoders = {}
+
     try:
         # noinspection PyUnresolvedReferences
         from _json import make_encoder
@@ -784,3 +1045,123 @@ class RecordWriterV2(RecordWriter):
         write(body)
         self._ofile.flush()
         self._flushed = False
+
+
+class PipelinedRecordWriterV2(RecordWriterV2):
+    """ A :class:`RecordWriterV2` that encodes and writes its output on a writer thread.
+
+    Records are handed to the writer thread in batches of :code:`batch_size` as they are written, so encoding and pipe
+    I/O overlap with the production of the records that follow. Batches, flushes, and the messages and metrics of each
+    chunk reach the writer thread in order, so output chunks are the same as those of a :class:`RecordWriterV2`. Records
+    must not be changed once they have been written. A flush with :code:`finished=True` waits for the writer thread to
+    write everything. An error raised on the writer thread is raised by the next call to :meth:`flush`.
+
+    """
+    def __init__(self, ofile, maxresultrows=None, batch_size=1000, depth=8):
+        RecordWriterV2.__init__(self, ofile, maxresultrows)
+        self._writer = RecordWriterV2(ofile, sys.maxint)  # flushed by this instance, not by the size of its buffer
+        self._batch = []
+        self._batch_size = batch_size
+        self._error = None
+        self._queue = Queue(depth)
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def ofile(self):
+        return self._ofile
+
+    @ofile.setter
+    def ofile(self, value):
+        self._ofile = self._writer.ofile = value
+
+    def flush(self, finished=None, partial=None):
+
+        RecordWriter.flush(self, finished, partial)  # validates arguments and the state of this instance
+
+        if self._batch:
+            self._queue.put((self._writer.write_records, self._batch))
+            self._batch = []
+
+        inspector = OrderedDict(self._inspector)
+        self._queue.put((self._flush, (inspector, self._flushed, finished, partial)))
+
+        if self._flushed is False:
+            self._total_record_count += self._record_count
+            self._chunk_count += 1
+
+        RecordWriterV2._clear(self)
+        self._finished = finished is True
+
+        if self._finished:
+            self._queue.put(None)
+            self._thread.join()
+
+        self._raise_error()
+
+    def write_metadata(self, configuration):
+        self._ensure_validity()
+        self._raise_error()
+
+        # Nothing else is written before the metadata, so there is nothing to wait for on the writer thread
+        writer = self._writer
+        writer._inspector.update(self._inspector)
+        writer.write_metadata(configuration)
+        self._clear()
+
+    def _flush(self, args):
+        inspector, flushed, finished, partial = args
+        writer = self._writer
+        writer._inspector.update(inspector)
+        writer.is_flushed = flushed
+        writer.flush(finished=finished, partial=partial)
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error[0], error[1], error[2]
+
+    def _run(self):
+        queue = self._queue
+        while True:
+            job = queue.get()
+            if job is None:
+                return
+            if self._error is None:
+                method, argument = job
+                # noinspection PyBroadException
+                try:
+                    method(argument)
+                except:
+                    self._error = sys.exc_info()
+
+    def _write_batch(self, batch):
+
+        count = len(batch)
+        start = 0
+
+        if self._batch:
+            self._queue.put((self._writer.write_records, self._batch))
+            self._batch = []
+
+        while start < count:
+            n = min(count - start, self._maxresultrows - self._record_count)
+            self._queue.put((self._writer.write_batch, batch if n == count else batch.slice(start, start + n)))
+            self._record_count += n
+            start += n
+            if self._record_count >= self._maxresultrows:
+                self.flush(partial=True)
+
+    def _write_record(self, record):
+
+        batch = self._batch
+        batch.append(record)
+        self._record_count += 1
+
+        if len(batch) >= self._batch_size:
+            self._queue.put((self._writer.write_records, batch))
+            self._batch = []
+
+        if self._record_count >= self._maxresultrows:
+            self.flush(partial=True)
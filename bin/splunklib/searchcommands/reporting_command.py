@@ -17,8 +17,9 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from itertools import chain
+from json import dumps, loads
 
-from .internals import ConfigurationSettingsType, json_encode_string
+from .internals import ConfigurationSettingsType, RecordBatch, json_encode_string
 from .decorators import ConfigurationSetting, Option
 from .streaming_command import StreamingCommand
 from .search_command import SearchCommand
@@ -37,6 +38,34 @@ class ReportingCommand(SearchCommand):
     yields a reporting data structure. You may implement a :meth:`map` method as a generator function that iterates
     over a set of event records and yields :class:`dict` or :class:`list(dict)` instances.
 
+    Alternatively, implement a combinable aggregate with :meth:`init`, :meth:`update`, :meth:`merge`, and
+    :meth:`finalize` instead of :meth:`map` and :meth:`reduce`. The map phase then folds the records of each chunk into
+    a fresh state with :meth:`update` and sends the state on as a single record with a JSON-encoded :code:`_partial`
+    field. The reduce phase merges those partial states, and any records that did not pass through the map phase, into
+    one state and yields the records :meth:`finalize` returns for it. States must survive a round trip through JSON.
+
+    .. code-block:: python
+        :linenos:
+
+        @Configuration()
+        class DurationStatsCommand(ReportingCommand):
+            def init(self):
+                return {}
+            def update(self, state, record):
+                stats = state.setdefault(record['ProjectName'], [0, 0.0])
+                stats[0] += 1
+                stats[1] += float(record['Duration'])
+                return state
+            def merge(self, state, partial):
+                for name, (count, total) in partial.iteritems():
+                    stats = state.setdefault(name, [0, 0.0])
+                    stats[0] += count
+                    stats[1] += total
+                return state
+            def finalize(self, state):
+                for name, (count, total) in sorted(state.iteritems()):
+                    yield {'ProjectName': name, 'count': count, 'mean': total / count}
+
     ReportingCommand configuration
     ==============================
 
@@ -68,6 +97,24 @@ class ReportingCommand(SearchCommand):
 
     # region Methods
 
+    def finalize(self, state):
+        """ Override this method to produce a reporting data structure from the state of a combinable aggregate.
+
+        :return: An iterable of records.
+
+        You must override this method, if you override :meth:`update`.
+
+        """
+        raise NotImplementedError('finalize(self, state)')
+
+    def init(self):
+        """ Override this method to return the state of an empty combinable aggregate.
+
+        You must override this method, if you override :meth:`update`.
+
+        """
+        raise NotImplementedError('init(self)')
+
     def map(self, records):
         """ Override this method to compute partial results.
 
@@ -79,6 +126,18 @@ class ReportingCommand(SearchCommand):
         """
         return NotImplemented
 
+    def merge(self, state, partial):
+        """ Override this method to combine the state of a combinable aggregate with a partial state.
+
+        :param partial: A state computed by the map phase, decoded from JSON.
+
+        :return: The combined state, which may be :code:`state` itself.
+
+        You must override this method, if you override :meth:`update`.
+
+        """
+        raise NotImplementedError('merge(self, state, partial)')
+
     def prepare(self):
 
         phase = self.phase
@@ -103,8 +162,74 @@ class ReportingCommand(SearchCommand):
         """
         raise NotImplementedError('reduce(self, records)')
 
+    def update(self, state, record):
+        """ Override this method to add a record to the state of a combinable aggregate.
+
+        Override this method, with :meth:`init`, :meth:`merge`, and :meth:`finalize`, instead of :meth:`reduce`. A
+        command configured with :code:`columnar=True` is given a :class:`RecordBatch` instead of a record.
+
+        :return: The updated state, which may be :code:`state` itself.
+
+        """
+        raise NotImplementedError('update(self, state, record)')
+
     def _execute(self, ifile, process):
-        SearchCommand._execute(self, ifile, getattr(self, self.phase))
+
+        if type(self).update == ReportingCommand.update:
+            SearchCommand._execute(self, ifile, getattr(self, self.phase))
+            return
+
+        if self.phase == 'map':
+            partials = self._map_partials(self._record_chunks(ifile))
+        else:
+            partials = self._reduce_partials(self._records(ifile))
+
+        self._record_writer.write_batches(partials)
+        self.finish()
+
+    def _map_partials(self, chunks):
+
+        # One partial state per chunk, sent on with the output for that chunk
+
+        init, update = self.init, self.update
+
+        for records in chunks:
+            state = init()
+            count = 0
+            for record in records:
+                state = update(state, record)
+                count += 1
+            if count > 0:
+                yield {_partial: dumps(state, separators=(',', ':'))}
+
+    def _reduce_partials(self, records):
+
+        init, update, merge = self.init, self.update, self.merge
+        state = init()
+
+        # A row carries a partial state, if it passed through the map phase, or an empty _partial field, if it did not
+        # and came in the same chunk as rows that did
+
+        for record in records:
+            if isinstance(record, RecordBatch):
+                partials = record.get(_partial)
+                if partials is None:
+                    state = update(state, record)
+                    continue
+                start = 0
+                for index, partial in enumerate(partials):
+                    if partial:
+                        if start < index:
+                            state = update(state, record.slice(start, index))
+                        state = merge(state, loads(partial))
+                        start = index + 1
+                if start < len(record):
+                    state = update(state, record.slice(start, len(record)))
+            else:
+                partial = record.get(_partial)
+                state = merge(state, loads(partial)) if partial else update(state, record)
+
+        return self.finalize(state)
 
     # endregion
 
@@ -245,7 +370,20 @@ class ReportingCommand(SearchCommand):
             if not issubclass(command, ReportingCommand):
                 raise TypeError('{} is not a ReportingCommand'.format( command))
 
-            if command.reduce == ReportingCommand.reduce:
+            if command.update != ReportingCommand.update:
+                for name in 'init', 'merge', 'finalize':
+                    if getattr(command, name) == getattr(ReportingCommand, name):
+                        raise AttributeError('No ReportingCommand.{} override'.format(name))
+                if command.map == ReportingCommand.map:
+                    # Give the map phase a method to be configured by; ReportingCommand._execute does the work per chunk
+                    def map(self, records):
+                        return self._map_partials((records,))
+                    # The map phase reads records the way the reduce phase does and runs on the indexers
+                    map._settings = dict(
+                        (name, getattr(cls, '_' + name)) for name in ('columnar', 'pipelined') if hasattr(cls, '_' + name))
+                    map._settings['distributed'] = True
+                    command.map = map
+            elif command.reduce == ReportingCommand.reduce:
                 raise AttributeError('No ReportingCommand.reduce override')
 
             if command.map == ReportingCommand.map:
@@ -278,3 +416,6 @@ class ReportingCommand(SearchCommand):
 
     pass
     # endregion
+
+
+_partial = '_partial'  # Field that carries the partial state of a combinable aggregate from the map phase
@@ -24,8 +24,9 @@ try:
 except ImportError:
     from ..ordereddict import OrderedDict
 from copy import deepcopy
+from functools import partial
 from cStringIO import StringIO
-from itertools import chain, ifilter, imap, islice, izip
+from itertools import chain, ifilter, imap, islice, izip, izip_longest
 from logging import _levelNames, getLevelName, getLogger
 try:
     from shutil import make_archive
@@ -37,6 +38,8 @@ from urllib import unquote
 from urlparse import urlsplit
 from warnings import warn
 from xml.etree import ElementTree
+from Queue import Queue
+from threading import Thread
 
 import os
 import sys
@@ -48,6 +51,7 @@ import traceback
 # Relative imports
 
 from . internals import (
+    ChunkBuffer,
     CommandLineParser,
     CsvDialect,
     InputHeader,
@@ -55,12 +59,15 @@ from . internals import (
     MetadataDecoder,
     MetadataEncoder,
     ObjectView,
+    PipelinedRecordWriterV2,
+    RecordBatch,
     Recorder,
     RecordWriterV1,
     RecordWriterV2,
     json_encode_string)
 
 from . import Boolean, Option, environment
+from .decorators import ConfigurationSetting
 from ..client import Service
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -113,6 +120,7 @@ class SearchCommand(object):
 
         self._default_logging_level = self._logger.level
         self._record_writer = None
+        self._record_chunks = None
         self._records = None
 
     def __str__(self):
@@ -588,7 +596,12 @@ class SearchCommand(object):
                 debug('Executing')
 
                 ifile = self._prepare_protocol_v1(argv, ifile, ofile)
-                self._records = self._records_protocol_v1
+                if self._configuration.columnar:
+                    self._records = self._record_batches_protocol_v1
+                    self._record_chunks = self._record_batch_chunks_protocol_v1
+                else:
+                    self._records = self._records_protocol_v1
+                    self._record_chunks = self._record_chunks_protocol_v1
                 self._metadata.action = 'execute'
                 self._execute(ifile, None)
 
@@ -682,7 +695,13 @@ class SearchCommand(object):
         # Write search command configuration for consumption by splunkd
         # noinspection PyBroadException
         try:
-            self._record_writer = RecordWriterV2(ofile, getattr(self._metadata.searchinfo, 'maxresultrows', None))
+            maxresultrows = getattr(self._metadata.searchinfo, 'maxresultrows', None)
+
+            if self._configuration.pipelined:
+                self._record_writer = PipelinedRecordWriterV2(ofile, maxresultrows)
+            else:
+                self._record_writer = RecordWriterV2(ofile, maxresultrows)
+
             self.fieldnames = []
             self.options.reset()
 
@@ -764,6 +783,16 @@ class SearchCommand(object):
         # noinspection PyBroadException
         try:
             debug('Executing under protocol_version=2')
+            if self._configuration.pipelined:
+                record_chunks = self._record_chunks_protocol_v2_pipelined
+            else:
+                record_chunks = self._record_chunks_protocol_v2
+
+            if self._configuration.columnar:
+                self._record_chunks = partial(record_chunks, decode=self._decode_batch_v2)
+            else:
+                self._record_chunks = partial(record_chunks, decode=self._decode_records_v2)
+
             self._records = self._records_protocol_v2
             self._metadata.action = 'execute'
             self._execute(ifile, None)
@@ -834,11 +863,14 @@ class SearchCommand(object):
         :rtype: NoneType
 
         """
-        self._record_writer.write_records(process(self._records(ifile)))
+        if self._configuration.columnar:
+            self._record_writer.write_batches(process(self._records(ifile)))
+        else:
+            self._record_writer.write_records(process(self._records(ifile)))
         self.finish()
 
     @staticmethod
-    def _read_chunk(ifile):
+    def _read_chunk(ifile, buffer=None):
 
         # noinspection PyBroadException
         try:
@@ -874,7 +906,7 @@ class SearchCommand(object):
         #     return metadata, ''
 
         try:
-            body = ifile.read(body_length)
+            body = ifile.read(body_length) if buffer is None else buffer.read(ifile, body_length)
         except Exception as error:
             raise RuntimeError('Failed to read body of length {}: {}'.format(body_length, error))
 
@@ -908,10 +940,30 @@ class SearchCommand(object):
                     record[fieldname] = value
             yield record
 
+    def _record_chunks_protocol_v1(self, ifile):
+        yield self._records_protocol_v1(ifile)
+
+    def _record_batches_protocol_v1(self, ifile):
+        batch = self._decode_batch(csv.reader(ifile, dialect=CsvDialect))
+        if batch is not None:
+            yield batch
+
+    def _record_batch_chunks_protocol_v1(self, ifile):
+        yield self._record_batches_protocol_v1(ifile)
+
     def _records_protocol_v2(self, ifile):
+        return chain.from_iterable(self._record_chunks(ifile))
+
+    def _record_chunks_protocol_v2(self, ifile, decode):
+
+        # Yields an iterator over the records of each chunk. The output for a chunk is flushed when the iterator for the
+        # next one is asked for. Chunk bodies are read into one buffer and parsed from there, so the records of a chunk
+        # must be read before the next chunk is asked for.
+
+        buffer = ChunkBuffer()
 
         while True:
-            result = self._read_chunk(ifile)
+            result = self._read_chunk(ifile, buffer)
 
             if not result:
                 return
@@ -926,34 +978,164 @@ class SearchCommand(object):
             self._record_writer.is_flushed = False
 
             if len(body) > 0:
-                reader = csv.reader(StringIO(body), dialect=CsvDialect)
+                records = decode(body)
 
-                try:
-                    fieldnames = reader.next()
-                except StopIteration:
+                if records is None:
                     return
 
-                mv_fieldnames = dict([(name, name[len('__mv_'):]) for name in fieldnames if name.startswith('__mv_')])
-
-                if len(mv_fieldnames) == 0:
-                    for values in reader:
-                        yield OrderedDict(izip(fieldnames, values))
-                else:
-                    for values in reader:
-                        record = OrderedDict()
-                        for fieldname, value in izip(fieldnames, values):
-                            if fieldname.startswith('__mv_'):
-                                if len(value) > 0:
-                                    record[mv_fieldnames[fieldname]] = self._decode_list(value)
-                            elif fieldname not in record:
-                                record[fieldname] = value
-                        yield record
+                yield records
 
             if finished:
                 return
 
             self.flush()
 
+    def _record_chunks_protocol_v2_pipelined(self, ifile, decode, batch_size=1000):
+
+        # Chunks are read and decoded on a reader thread while the records before them are processed. Records are passed
+        # on in batches through a short queue, so the reader runs ahead by a few batches, not by whole chunks; holding
+        # whole chunks of records makes garbage collection slower than the time pipelining saves. The last batch of a
+        # chunk carries its value of finished, the others carry None.
+
+        batches = Queue(4)
+
+        def read_chunks():
+            buffer = ChunkBuffer()
+            # noinspection PyBroadException
+            try:
+                while True:
+                    result = self._read_chunk(ifile, buffer)
+
+                    if not result:
+                        batches.put((None, True, None))
+                        return
+
+                    metadata, body = result
+                    action = getattr(metadata, 'action', None)
+
+                    if action != 'execute':
+                        raise RuntimeError('Expected execute action, not {}'.format(action))
+
+                    finished = getattr(metadata, 'finished', False)
+                    records = decode(body) if len(body) > 0 else ()
+
+                    if records is None:
+                        batches.put((None, True, None))
+                        return
+
+                    records = iter(records)
+
+                    while True:
+                        batch = list(islice(records, batch_size))
+                        if len(batch) < batch_size:
+                            batches.put((batch, finished, None))
+                            break
+                        batches.put((batch, None, None))
+
+                    if finished:
+                        return
+            except:
+                batches.put((None, None, sys.exc_info()))
+
+        reader = Thread(target=read_chunks)
+        reader.daemon = True
+        reader.start()
+
+        state = [None]  # the value of finished for the last chunk read; True at the end of the input
+
+        def chunk_records():
+            while True:
+                batch, finished, error = batches.get()
+
+                if error is not None:
+                    raise error[0], error[1], error[2]
+
+                if batch is None:
+                    state[0] = True
+                    return
+
+                for record in batch:
+                    yield record
+
+                if finished is not None:
+                    state[0] = finished
+                    return
+
+        while True:
+            self._record_writer.is_flushed = False
+            state[0] = None
+            yield chunk_records()
+
+            if state[0] is not False:
+                return
+
+            self.flush()
+
+    def _decode_batch(self, reader):
+
+        # Decodes CSV rows into columns without creating a record per row. Multi-value fields come out as a column of
+        # lists for the rows that have one and strings for the others, like the values of records.
+
+        try:
+            fieldnames = reader.next()
+        except StopIteration:
+            return None
+
+        rows = list(reader)
+        columns = izip_longest(*rows) if len(rows) > 0 else ([] for fieldname in fieldnames)  # short rows get None
+        batch = OrderedDict()
+        mv_columns = []
+
+        for fieldname, column in izip(fieldnames, columns):
+            if fieldname.startswith('__mv_'):
+                mv_columns.append((fieldname[len('__mv_'):], column))
+            elif fieldname not in batch:
+                batch[fieldname] = list(column)
+
+        decode_list = self._decode_list
+
+        for fieldname, mv_column in mv_columns:
+            column = batch.get(fieldname)
+            if column is None:
+                batch[fieldname] = [decode_list(mv) if len(mv) > 0 else None for mv in mv_column]
+            else:
+                for i, mv in enumerate(mv_column):
+                    if len(mv) > 0:
+                        column[i] = decode_list(mv)
+
+        return RecordBatch(batch)
+
+    def _decode_batch_v2(self, body):
+        batch = self._decode_batch(csv.reader(StringIO(body), dialect=CsvDialect))
+        return None if batch is None else (batch,)
+
+    def _decode_records_v2(self, body):
+
+        reader = csv.reader(StringIO(body), dialect=CsvDialect)
+
+        try:
+            fieldnames = reader.next()
+        except StopIteration:
+            return None
+
+        mv_fieldnames = dict([(name, name[len('__mv_'):]) for name in fieldnames if name.startswith('__mv_')])
+
+        if len(mv_fieldnames) == 0:
+            return (OrderedDict(izip(fieldnames, values)) for values in reader)
+
+        return self._decode_mv_records(reader, fieldnames, mv_fieldnames)
+
+    def _decode_mv_records(self, reader, fieldnames, mv_fieldnames):
+        for values in reader:
+            record = OrderedDict()
+            for fieldname, value in izip(fieldnames, values):
+                if fieldname.startswith('__mv_'):
+                    if len(value) > 0:
+                        record[mv_fieldnames[fieldname]] = self._decode_list(value)
+                elif fieldname not in record:
+                    record[fieldname] = value
+            yield record
+
     def _report_unexpected_error(self):
 
         error_type, error, tb = sys.exc_info()
@@ -980,6 +1162,36 @@ class SearchCommand(object):
         def __init__(self, command):
             self.command = command
 
+        # region Local properties
+
+        columnar = ConfigurationSetting(doc='''
+            :const:`True`, if records should be passed to and from the command as batches of columns.
+
+            The records of each chunk reach the command as one :class:`RecordBatch`, which holds a list of values per
+            field instead of a dictionary per record. The command may yield batches, records, or both. This setting is
+            not sent to splunkd.
+
+            Default: :const:`False`
+
+            Supported by: SCP 1, SCP 2
+
+            ''')
+
+        pipelined = ConfigurationSetting(doc='''
+            :const:`True`, if chunks should be read, processed, and written by three threads under SCP 2.
+
+            The next chunk is read and decoded on a reader thread and output is encoded and written on a writer thread,
+            while the records of the current chunk are processed. Output is the same as without pipelining, but records
+            must not be changed once they have been yielded. This setting is not sent to splunkd.
+
+            Default: :const:`False`
+
+            Supported by: SCP 2
+
+            ''')
+
+        # endregion
+
         def __repr__(self):
             """ Converts the value of this instance to its string representation.
 
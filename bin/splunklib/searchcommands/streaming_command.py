@@ -16,7 +16,13 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+try:
+    from collections import OrderedDict  # must be python 2.7
+except ImportError:
+    from ..ordereddict import OrderedDict
+from cPickle import dumps, HIGHEST_PROTOCOL, PicklingError
 from itertools import ifilter, imap
+from multiprocessing import cpu_count, Pool
 
 from .decorators import ConfigurationSetting
 from .search_command import SearchCommand
@@ -39,19 +45,86 @@ class StreamingCommand(SearchCommand):
     You can configure your command for operation under Search Command Protocol (SCP) version 1 or 2. SCP 2 requires
     Splunk 6.3 or later.
 
+    Parallel record mapping
+    =======================
+
+    A command that transforms each record on its own may set :attr:`map_record` to a function of one record instead of
+    overriding :meth:`stream`. Configure :code:`processes` to apply the function to the records of each chunk on a pool
+    of worker processes. Records are sent to the workers and back in order, so the output is the same as that of a
+    single process. The function must be picklable: define it at module level, not in the command class.
+
+    .. code-block:: python
+        :linenos:
+
+        def parse_payload(record):
+            record.update(json.loads(record['payload']))
+            return record
+
+        @Configuration(processes=4)
+        class ParsePayloadCommand(StreamingCommand):
+            map_record = staticmethod(parse_payload)
+
     """
+    # region Properties
+
+    map_record = None  # A picklable function that returns the record it is given, a new record, or None to drop it
+
+    # endregion
+
     # region Methods
 
     def stream(self, records):
         """ Generator function that processes and yields event records to the Splunk stream pipeline.
 
-        You must override this method.
+        You must override this method or set :attr:`map_record`.
 
         """
-        raise NotImplementedError('StreamingCommand.stream(self, records)')
+        map_record = self.map_record
+
+        if map_record is None:
+            raise NotImplementedError('StreamingCommand.stream(self, records)')
+
+        for record in imap(map_record, records):
+            if record is not None:
+                yield record
 
     def _execute(self, ifile, process):
-        SearchCommand._execute(self, ifile, self.stream)
+
+        processes = self._configuration.processes
+
+        if self.map_record is None or processes is None or processes == 1:
+            SearchCommand._execute(self, ifile, self.stream)
+            return
+
+        try:
+            dumps(self.map_record, HIGHEST_PROTOCOL)
+        except (PicklingError, TypeError) as error:
+            raise ValueError('{}.map_record cannot be sent to worker processes: {}'.format(type(self).__name__, error))
+
+        pool = Pool(processes or cpu_count(), _initialize_worker, (self.map_record,))
+
+        try:
+            self._record_writer.write_records(self._map_record_chunks(pool, self._record_chunks(ifile)))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        self.finish()
+
+    def _map_record_chunks(self, pool, chunks):
+
+        # Each chunk is split into a few tasks per worker; imap returns their results in order as they complete. Records
+        # travel as lists of items: pickling an OrderedDict costs several times as much as pickling its items.
+
+        processes = self._configuration.processes or cpu_count()
+
+        for records in chunks:
+            records = [record.items() for record in records]
+            chunksize = max(1, len(records) // (4 * processes))
+
+            for items in pool.imap(_map_items, records, chunksize):
+                if items is not None:
+                    yield OrderedDict(items)
 
     # endregion
 
@@ -59,6 +132,22 @@ class StreamingCommand(SearchCommand):
         """ Represents the configuration settings that apply to a :class:`StreamingCommand`.
 
         """
+        # region Local properties
+
+        processes = ConfigurationSetting(doc='''
+            Number of worker processes that apply :attr:`StreamingCommand.map_record` to records, or 0 for one per CPU.
+
+            Each chunk of records is split across the processes and reassembled in order. This setting is not sent to
+            splunkd and has no effect on commands that do not set :attr:`StreamingCommand.map_record`.
+
+            Default: :const:`None`, which applies :attr:`StreamingCommand.map_record` in the command process.
+
+            Supported by: SCP 1, SCP 2
+
+            ''')
+
+        # endregion
+
         # region SCP v1/v2 properties
 
         required_fields = ConfigurationSetting(doc='''
@@ -168,8 +257,10 @@ class StreamingCommand(SearchCommand):
             """ Verifies :code:`command` class structure.
 
             """
-            if command.stream == StreamingCommand.stream:
-                raise AttributeError('No StreamingCommand.stream override')
+            if command.stream == StreamingCommand.stream and command.map_record is None:
+                raise AttributeError('No StreamingCommand.stream override or StreamingCommand.map_record function')
+            if command.map_record is not None and getattr(cls, '_columnar', None):
+                raise AttributeError('StreamingCommand.map_record cannot be used with columnar=True')
             return
 
         def iteritems(self):
@@ -180,9 +271,26 @@ class StreamingCommand(SearchCommand):
                     iteritems = ifilter(lambda (name, value): name != 'clear_required_fields', iteritems)
             else:
                 iteritems = ifilter(lambda (name, value): name != 'distributed', iteritems)
-                if self.distributed:
+                if not self.distributed:
                     iteritems = imap(
                         lambda (name, value): (name, 'stateful') if name == 'type' else (name, value), iteritems)
             return iteritems
 
         # endregion
+
+
+# region Worker process functions
+
+_map_record = None
+
+
+def _initialize_worker(map_record):
+    global _map_record
+    _map_record = map_record
+
+
+def _map_items(items):
+    record = _map_record(OrderedDict(items))
+    return None if record is None else record.items()
+
+# endregion
@@ -0,0 +1,9 @@
+# The app's Python code lives in bin/, which Splunk puts on sys.path; the
+# tests do the same. Run them with Python 2.7 from the top of the repository:
+#
+#     python -m unittest discover -s tests -t .
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin"))
@@ -0,0 +1,50 @@
+"""Microbenchmark of ``Context._abspath`` with and without the per-Context
+path cache (``path_cache_size=0`` disables it), and of ``UrlEncoded`` string
+concatenation.
+
+Run it with Python 2.7 from the top of the repository::
+
+    python tests/benchmarks/bench_abspath.py [number]
+
+To measure another copy of the app, point ``BENCH_BIN`` at its ``bin``
+directory; without a path cache both ``_abspath`` columns are the same.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.environ.get("BENCH_BIN") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bin"))
+
+from splunklib import binding
+
+_CASES = [
+    ("relative path, default namespace", "context._abspath('storage/passwords')"),
+    ("relative path, explicit namespace", "context._abspath('storage/passwords', owner='nobody', app='search')"),
+    ("absolute path", "context._abspath('/services/server/info')"),
+]
+
+
+def per_call(statement, setup, number):
+    return min(timeit.repeat(statement, setup, repeat=5, number=number)) / number * 1e6
+
+
+def main(number):
+    print "%s: microseconds per call, best of 5 x %d" % (
+        os.path.dirname(os.path.dirname(binding.__file__)), number)
+    print "  %-36s %10s %10s" % ("_abspath", "uncached", "cached")
+    for name, statement in _CASES:
+        timings = []
+        for size in (0, 512):
+            setup = ("from splunklib import binding\n"
+                     "context = binding.Context(owner='admin', app='search', path_cache_size=%d)" % size)
+            timings.append(per_call(statement, setup, number))
+        print "  %-36s %10.2f %10.2f" % (name, timings[0], timings[1])
+
+    setup = "from splunklib.binding import UrlEncoded\nu = UrlEncoded('storage/passwords')"
+    print "  %-36s %10.2f" % ("UrlEncoded + str", per_call("u + '/octopus'", setup, number))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,125 @@
+"""Compares loading a collection's Atom feed in one piece with
+``_load_atom_entries`` against streaming its entries with
+``_iter_atom_entries``, which ``ReadOnlyCollection`` uses.
+
+Run it with Python 2.7 from the top of the repository::
+
+    python tests/benchmarks/bench_collection_load.py [entries] [runs]
+
+The feed is a synthetic storage/passwords listing. Both paths must produce
+the same entity states. To measure another copy of the app, such as a
+checkout from before the change, point ``BENCH_BIN`` at its ``bin``
+directory; rows for code that copy does not have are skipped.
+"""
+
+import os
+import sys
+import time
+from StringIO import StringIO
+
+sys.path.insert(0, os.environ.get("BENCH_BIN") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bin"))
+
+from splunklib import client
+from splunklib.binding import ResponseReader
+from splunklib.data import record
+
+_ENTRY = """  <entry>
+    <title>octopus:deployments-%(i)d:</title>
+    <id>https://localhost:8089/servicesNS/nobody/TA-octopus_deploy/storage/passwords/octopus%%3Adeployments-%(i)d%%3A</id>
+    <updated>2016-01-01T00:00:00+00:00</updated>
+    <link href="/servicesNS/nobody/TA-octopus_deploy/storage/passwords/octopus%%3Adeployments-%(i)d%%3A" rel="alternate"/>
+    <author><name>nobody</name></author>
+    <link href="/servicesNS/nobody/TA-octopus_deploy/storage/passwords/octopus%%3Adeployments-%(i)d%%3A" rel="list"/>
+    <link href="/servicesNS/nobody/TA-octopus_deploy/storage/passwords/octopus%%3Adeployments-%(i)d%%3A" rel="edit"/>
+    <content type="text/xml">
+      <s:dict>
+        <s:key name="clear_password">API-%(i)020d</s:key>
+        <s:key name="eai:acl">
+          <s:dict>
+            <s:key name="app">TA-octopus_deploy</s:key>
+            <s:key name="can_change_perms">1</s:key>
+            <s:key name="can_list">1</s:key>
+            <s:key name="can_share_app">1</s:key>
+            <s:key name="can_write">1</s:key>
+            <s:key name="modifiable">1</s:key>
+            <s:key name="owner">nobody</s:key>
+            <s:key name="perms">
+              <s:dict>
+                <s:key name="read"><s:list><s:item>*</s:item></s:list></s:key>
+                <s:key name="write"><s:list><s:item>admin</s:item></s:list></s:key>
+              </s:dict>
+            </s:key>
+            <s:key name="sharing">app</s:key>
+          </s:dict>
+        </s:key>
+        <s:key name="encr_password">$1$%(i)020d</s:key>
+        <s:key name="password">********</s:key>
+        <s:key name="realm">octopus</s:key>
+        <s:key name="username">deployments-%(i)d</s:key>
+      </s:dict>
+    </content>
+  </entry>
+"""
+
+
+def feed(entries):
+    return ("""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+  <title>passwords</title>
+  <id>https://localhost:8089/servicesNS/nobody/TA-octopus_deploy/storage/passwords</id>
+  <updated>2016-01-01T00:00:00+00:00</updated>
+  <opensearch:totalResults>%d</opensearch:totalResults>
+""" % entries) + "".join(_ENTRY % {"i": i} for i in xrange(entries)) + "</feed>\n"
+
+
+def response(body):
+    return record({"status": 200, "reason": "OK", "headers": [("content-type", "text/xml; charset=utf-8")],
+                   "body": ResponseReader(StringIO(body))})
+
+
+def load_states(body):
+    return [client._parse_atom_entry(entry) for entry in client._load_atom_entries(response(body))]
+
+
+def iter_states(body):
+    return [client._parse_atom_entry(entry) for entry in client._iter_atom_entries(response(body))]
+
+
+def first_entity(body):
+    collection = client.Collection(client.Service(), "storage/passwords")
+    return next(iter(collection._iter_list(response(body))))
+
+
+def load_entities(body):
+    collection = client.Collection(client.Service(), "storage/passwords")
+    return collection._load_list(response(body))
+
+
+def best(function, body, runs):
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        function(body)
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main(entries, runs):
+    body = feed(entries)
+    streaming = hasattr(client, "_iter_atom_entries")
+    if streaming:
+        assert load_states(body) == iter_states(body)
+
+    print "%s: %d entries, %.1f MB, best of %d runs" % (
+        os.path.dirname(os.path.dirname(client.__file__)), entries, len(body) / 1e6, runs)
+    print "  _load_atom_entries + _parse_atom_entry   %7.3f s" % best(load_states, body, runs)
+    if streaming:
+        print "  _iter_atom_entries + _parse_atom_entry   %7.3f s" % best(iter_states, body, runs)
+    print "  Collection._load_list (entities)         %7.3f s" % best(load_entities, body, runs)
+    if streaming:
+        print "  first entity from Collection._iter_list  %7.3f s" % best(first_entity, body, runs)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
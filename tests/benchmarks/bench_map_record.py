@@ -0,0 +1,106 @@
+"""Compares a ``StreamingCommand`` that sets ``map_record`` run in-process
+with the same command spread over a process pool by ``processes``.
+
+Run it with Python 2.7 from the top of the repository::
+
+    python tests/benchmarks/bench_map_record.py [records] [processes]
+
+The input is three SCP 2 chunks of records whose payload is JSON-decoded
+and searched with a regular expression by ``map_record``, which drops one
+record in seven. Wall and CPU time are printed for the command process;
+CPU time spent by pool workers is printed separately. Both runs must write
+the same output. Scaling can only be seen on a machine with more than one
+core.
+"""
+
+import json
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from cStringIO import StringIO
+from csv import writer as csv_writer
+from hashlib import md5
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bin"))
+
+from splunklib.searchcommands import Configuration, StreamingCommand
+
+_step = re.compile(r"Step (\d+) of (\d+): (\w+)")
+
+
+def parse_payload(record):
+    payload = json.loads(record["payload"])
+    for _ in range(20):
+        steps = _step.findall(payload["log"])
+    record["steps"] = len(steps)
+    record["last"] = steps[-1][2]
+    record["user"] = payload["user"]
+    return record if payload["n"] % 7 else None
+
+
+def _chunk(metadata, body=""):
+    metadata = json.dumps(metadata)
+    return "chunked 1.0,%d,%d\n%s%s" % (len(metadata), len(body), metadata, body)
+
+
+def make_input(count, dispatch_dir):
+    searchinfo = {
+        "args": [], "raw_args": [], "dispatch_dir": dispatch_dir, "earliest_time": "0", "latest_time": "0",
+        "search": "x", "app": "search", "splunkd_uri": None, "maxresultrows": 50000, "sid": "1",
+        "splunk_version": "6.5"}
+    log = " ".join("Step %d of 9: step%d" % (k, k) for k in range(9))
+    chunks = [_chunk({"action": "getinfo", "preview": False, "searchinfo": searchinfo})]
+    for c in range(3):
+        body = StringIO()
+        rows = csv_writer(body)
+        rows.writerow(["_raw", "payload"])
+        for i in range(count):
+            rows.writerow(["d%d_%d" % (c, i), json.dumps({"n": i, "user": "u%d" % (i % 13), "log": log})])
+        chunks.append(_chunk({"action": "execute", "finished": c == 2}, body.getvalue()))
+    return "".join(chunks)
+
+
+def run(command_class, data):
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    ofile = StringIO()
+    start = time.time()
+    command_class().process(["bench_map_record.py"], StringIO(data), ofile)
+    elapsed = time.time() - start
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (self_after.ru_utime + self_after.ru_stime) - (self_before.ru_utime + self_before.ru_stime)
+    workers = ((children_after.ru_utime + children_after.ru_stime) -
+               (children_before.ru_utime + children_before.ru_stime))
+    return elapsed, cpu, workers, md5(ofile.getvalue()).hexdigest()
+
+
+def main(count, processes):
+    dispatch_dir = tempfile.mkdtemp()
+    try:
+        data = make_input(count, dispatch_dir)
+        commands = [
+            ("in-process", Configuration()(
+                type("SerialCommand", (StreamingCommand,), {"map_record": staticmethod(parse_payload)}))),
+            ("processes=%d" % processes, Configuration(processes=processes)(
+                type("PoolCommand", (StreamingCommand,), {"map_record": staticmethod(parse_payload)}))),
+        ]
+        print "3 chunks x %d records, %d CPUs" % (count, os.sysconf("SC_NPROCESSORS_ONLN"))
+        print "  %-14s %8s %8s %8s" % ("", "wall s", "cpu s", "pool s")
+        digests = set()
+        for name, command_class in commands:
+            elapsed, cpu, workers, digest = run(command_class, data)
+            digests.add(digest)
+            print "  %-14s %8.2f %8.2f %8.2f" % (name, elapsed, cpu, workers)
+        assert len(digests) == 1, "in-process and pooled output differ"
+    finally:
+        shutil.rmtree(dispatch_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 2)
@@ -0,0 +1,65 @@
+"""Microbenchmark of ``RecordWriterV2.write_records``, the per-record cost of
+encoding search command output rows.
+
+Run it with Python 2.7 from the top of the repository::
+
+    python tests/benchmarks/bench_record_writer.py [records]
+
+Each case writes the same record over and over, so every row goes through
+the encoder of one field list. The md5 of the buffered rows is printed
+with each case, so the output of two copies can be compared. To measure
+another copy of the app, such as a checkout from before the change, point
+``BENCH_BIN`` at its ``bin`` directory.
+"""
+
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.environ.get("BENCH_BIN") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bin"))
+
+from splunklib.searchcommands.internals import RecordWriterV2
+
+_CASES = [
+    ("scalar str (5 fields)", OrderedDict(
+        (name, "value of " + name) for name in ("_raw", "host", "source", "sourcetype", "Id"))),
+    ("scalar mixed (7 types)", OrderedDict([
+        ("_raw", "text"), ("name", u"Octop\xfcs"), ("count", 42), ("duration", 1.5), ("total", 1L << 40),
+        ("missing", None), ("flag", True)])),
+    ("multivalue (4 fields)", OrderedDict([
+        ("_raw", "text"), ("tags", ["a", "b", "c"]), ("ids", [1, 2, 3, 4]), ("names", [u"x", u"y"])])),
+    ("long multivalue (2 x 1000)", OrderedDict([
+        ("_raw", "text"), ("ids", ["Tasks-%d" % i for i in range(1000)]), ("numbers", range(1000))])),
+    ("json (2 dicts)", OrderedDict([
+        ("_raw", "text"), ("links", {"Self": "/api/tasks/1", "Web": "/app#/tasks/1"}), ("state", {"a": [1, 2]})])),
+    ("single-item lists (3 fields)", OrderedDict([
+        ("_raw", "text"), ("tag", ["a"]), ("id", [1]), ("name", [u"x"])])),
+]
+
+
+def run(record, count):
+    # Returns the seconds write_records takes for count records and the digest of the rows it buffers
+    writer = RecordWriterV2(open(os.devnull, "wb"), maxresultrows=count + 1)
+    records = [record] * count
+    start = time.time()
+    writer.write_records(records)
+    elapsed = time.time() - start
+    return elapsed, hashlib.md5(writer._buffer.getvalue()).hexdigest()
+
+
+def main(count):
+    print "%s: microseconds per record, best of 3 x %d records" % (
+        os.path.dirname(os.path.dirname(os.path.dirname(sys.modules[RecordWriterV2.__module__].__file__))), count)
+    for name, record in _CASES:
+        n = count if "long" not in name else max(count // 20, 1)
+        runs = [run(record, n) for _ in range(3)]
+        digests = set(digest for _, digest in runs)
+        assert len(digests) == 1, name
+        print "  %-30s %10.2f  %s" % (name, min(elapsed for elapsed, _ in runs) / n * 1e6, digests.pop())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
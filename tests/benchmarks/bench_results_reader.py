@@ -0,0 +1,87 @@
+"""Times ``results.ResultsReader`` over a synthetic search export.
+
+Run it with Python 2.7 from the top of the repository::
+
+    python tests/benchmarks/bench_results_reader.py [results] [documents]
+
+The export is written to a temporary file first: 18 fields per result, a
+multi-value field in every seventh result, and the results split over
+``documents`` <results> documents, all but the last marked as preview, the
+way an export streams them. The number of items read, the md5 of their
+reprs, the time taken and the peak RSS of the process are printed. To
+measure another copy of the app, such as a checkout from before the change,
+point ``BENCH_BIN`` at its ``bin`` directory; the md5 must be the same.
+"""
+
+import hashlib
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.environ.get("BENCH_BIN") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bin"))
+
+from splunklib import results
+
+_FIELDS = [
+    "_bkt", "_cd", "_indextime", "_raw", "_serial", "_si", "_sourcetype", "_time", "host", "index", "linecount",
+    "source", "sourcetype", "splunk_server", "ProjectId", "EnvironmentId", "ReleaseId", "State"]
+
+
+def make_export(ofile, count, documents):
+    random.seed(1)
+    per_document = count // documents
+    for d in range(documents):
+        ofile.write("<?xml version='1.0' encoding='UTF-8'?>\n<results preview='%d'>\n<meta>\n<fieldOrder>\n" % (
+            1 if d < documents - 1 else 0))
+        for field in _FIELDS:
+            ofile.write("<field>%s</field>\n" % field)
+        ofile.write("</fieldOrder>\n</meta>\n")
+        if d == 0:
+            ofile.write("<messages>\n<msg type='DEBUG'>base lispy: [ AND index::octopus ]</msg>\n</messages>\n")
+        for i in range(per_document):
+            ofile.write("\t<result offset='%d'>\n" % i)
+            for field in _FIELDS:
+                if field == "_raw":
+                    raw = '{"Id": "Deployments-%d", "ProjectId": "Projects-%d", "Name": "Deploy \\u00e9 &amp; %s"}' % (
+                        i, i % 50, "x" * random.randint(50, 400))
+                    ofile.write("\t\t<field k='_raw'><v xml:space='preserve' trunc='0'>%s</v></field>\n" % raw)
+                elif field == "State" and i % 7 == 0:
+                    ofile.write(
+                        "\t\t<field k='State'>\n\t\t\t<value><text>Success</text></value>\n"
+                        "\t\t\t<value><text>Queued \xc3\xa9</text></value>\n\t\t</field>\n")
+                else:
+                    ofile.write("\t\t<field k='%s'>\n\t\t\t<value><text>%s-%d</text></value>\n\t\t</field>\n" % (
+                        field, field, random.randint(0, 100000)))
+            ofile.write("\t</result>\n")
+        ofile.write("</results>\n")
+
+
+def main(count, documents):
+    with tempfile.NamedTemporaryFile(suffix=".xml") as export:
+        make_export(export, count, documents)
+        export.flush()
+        size = export.tell()
+
+        digest = hashlib.md5()
+        items = 0
+        start = time.time()
+        with open(export.name, "rb") as f:
+            reader = results.ResultsReader(f)
+            for item in reader:
+                items += 1
+                digest.update(repr(item))
+                digest.update(repr(type(item)))
+        elapsed = time.time() - start
+
+    print "%s: %d results in %d documents, %.1f MB" % (
+        os.path.dirname(os.path.dirname(results.__file__)), count, documents, size / 1e6)
+    print "  %d items, md5 %s, %.2f s, peak RSS %d MB" % (
+        items, digest.hexdigest(), elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
@@ -0,0 +1,89 @@
+"""Times ``TA-octopus_deploy.py --scheme``, which Splunk runs every time the
+Data Inputs page is loaded, and lists the heavy modules that run loads.
+
+Run it with Python 2.7 from the top of the repository::
+
+    python tests/benchmarks/bench_scheme_startup.py [runs]
+
+For comparison it also times a bare interpreter and an interpreter that
+imports the modules the --scheme path no longer loads. The cached row is
+only timed once the scheme has been cached in the checkpoint directory.
+"""
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bin")
+SCRIPT = os.path.join(BIN, "TA-octopus_deploy.py")
+HEAVY = ["requests", "splunk", "splunklib.binding", "splunklib.client", "md5", "json"]
+
+# Runs the script in-process as Splunk would, then writes the names of the
+# HEAVY modules it loaded to stderr
+_PROBE = """
+import sys
+sys.argv = [%r, "--scheme"]
+try:
+    execfile(sys.argv[0], {"__name__": "__main__", "__file__": sys.argv[0]})
+except SystemExit:
+    pass
+sys.stderr.write(" ".join(name for name in %r if name in sys.modules))
+"""
+
+
+def best(command, env, runs, setup=None):
+    times = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.time()
+        subprocess.check_call(command, env=env, stdout=open(os.devnull, "w"))
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main(runs):
+    splunk_home = tempfile.mkdtemp(prefix="bench-splunk-home-")
+    try:
+        env = dict(os.environ, SPLUNK_HOME=splunk_home, PYTHONPATH=BIN)
+        checkpoint_dir = os.path.join(splunk_home, "var", "lib", "splunk", "modinputs", "TA-octopus_deploy")
+
+        def clear_cache():
+            # Splunk creates the checkpoint directory; leave it empty
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+            os.makedirs(checkpoint_dir)
+
+        def cached_scheme():
+            return glob.glob(os.path.join(checkpoint_dir, "scheme-*.xml"))
+
+        print "best of %d runs, wall time" % runs
+        print "  python -c pass                        %6.1f ms" % (
+            1000 * best([sys.executable, "-c", "pass"], env, runs))
+        print "  import splunklib.client, requests     %6.1f ms" % (
+            1000 * best(
+                [sys.executable, "-c", "import splunklib.client\ntry: import requests\nexcept ImportError: pass"],
+                env, runs))
+        print "  --scheme, no cached scheme            %6.1f ms" % (
+            1000 * best([sys.executable, SCRIPT, "--scheme"], env, runs, clear_cache))
+
+        # The last uncached run has written the cache; fail rather than time
+        # the uncached path twice
+        if not cached_scheme():
+            sys.exit("--scheme did not cache the scheme in %s" % checkpoint_dir)
+        print "  --scheme, cached scheme               %6.1f ms" % (
+            1000 * best([sys.executable, SCRIPT, "--scheme"], env, runs))
+
+        probe = subprocess.Popen([sys.executable, "-c", _PROBE % (SCRIPT, HEAVY)], env=env,
+                                 stdout=open(os.devnull, "w"), stderr=subprocess.PIPE)
+        loaded = probe.communicate()[1].split()
+        print "heavy modules loaded by --scheme: %s" % (" ".join(loaded) or "none")
+    finally:
+        shutil.rmtree(splunk_home, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,57 @@
+# Runs search commands through the chunked protocol (SCP 2) the way splunkd does,
+# with a getinfo chunk followed by execute chunks, and splits what they write
+# back into chunks.
+
+import json
+import os
+import re
+from StringIO import StringIO
+
+_header = re.compile(r"chunked 1\.0,(\d+),(\d+)\n")
+
+
+def chunk(metadata, body=""):
+    metadata = json.dumps(metadata)
+    return "chunked 1.0,{},{}\n{}{}".format(len(metadata), len(body), metadata, body)
+
+
+def command_input(args=(), bodies=()):
+    # Returns the input splunkd sends a command invoked with args, which then
+    # receives one execute chunk per body
+    searchinfo = {
+        "args": list(args), "raw_args": list(args), "dispatch_dir": os.path.dirname(os.path.abspath(__file__)),
+        "earliest_time": "0", "latest_time": "0", "search": "x", "app": "search", "splunkd_uri": None,
+        "maxresultrows": 10000, "sid": "1", "splunk_version": "6.5"}
+    chunks = [chunk({"action": "getinfo", "preview": False, "searchinfo": searchinfo})]
+    bodies = list(bodies) or [""]
+    for index, body in enumerate(bodies):
+        chunks.append(chunk({"action": "execute", "finished": index == len(bodies) - 1}, body))
+    return "".join(chunks)
+
+
+def process(command, args=(), bodies=()):
+    # Returns the output of a command as written, byte for byte
+    ofile = StringIO()
+    command.process(["command.py"], StringIO(command_input(args, bodies)), ofile)
+    return ofile.getvalue()
+
+
+def output_chunks(output):
+    # Returns the (metadata, body) pairs of the chunks a command wrote. The
+    # getinfo response is followed by a newline, which splunkd skips.
+    chunks = []
+    position = 0
+    while position < len(output):
+        if output[position] == "\n":
+            position += 1
+            continue
+        match = _header.match(output, position)
+        if match is None:
+            raise ValueError("Expected a chunk header at {}: {!r}".format(position, output[position:position + 40]))
+        metadata_length, body_length = int(match.group(1)), int(match.group(2))
+        position = match.end()
+        metadata = json.loads(output[position:position + metadata_length])
+        position += metadata_length
+        chunks.append((metadata, output[position:position + body_length]))
+        position += body_length
+    return chunks
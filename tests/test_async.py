@@ -0,0 +1,186 @@
+import socket
+import threading
+import time
+import traceback
+import unittest
+import urlparse
+from StringIO import StringIO
+
+from splunklib import binding, client
+from splunklib.binding import ResponseReader
+
+_ENTRY = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">
+  <title>octopus</title>
+  <entry>
+    <title>%(name)s</title>
+    <link href="/servicesNS/nobody/search/data/inputs/octopus/%(name)s" rel="alternate"/>
+    <content type="text/xml">
+      <s:dict>
+        <s:key name="eai:acl">
+          <s:dict>
+            <s:key name="app">search</s:key>
+            <s:key name="owner">nobody</s:key>
+            <s:key name="sharing">app</s:key>
+          </s:dict>
+        </s:key>
+        <s:key name="interval">%(interval)s</s:key>
+      </s:dict>
+    </content>
+  </entry>
+</feed>
+"""
+
+_ERROR = """<?xml version="1.0" encoding="UTF-8"?>
+<response><messages><msg type="ERROR">Cannot write to %s</msg></messages></response>
+"""
+
+
+class _Handler(object):
+    # Logs in, serves octopus inputs named input-<n>, the later ones sooner,
+    # and fails POSTs to input-bad
+
+    def __init__(self):
+        self.tokens = []
+
+    def __call__(self, url, message, **kwargs):
+        path = urlparse.urlsplit(url).path
+        self.tokens.append(dict(message.get("headers", [])).get("Authorization"))
+        if path.endswith("/auth/login"):
+            return self._response("<response><sessionKey>key</sessionKey></response>")
+        name = path.rstrip("/").rpartition("/")[2]
+        if message["method"] == "POST" and name == "input-bad":
+            return self._response(_ERROR % name, 500)
+        number = name.partition("-")[2]
+        if number.isdigit():
+            time.sleep((8 - int(number)) * 0.01)
+        return self._response(_ENTRY % {"name": name, "interval": number})
+
+    @staticmethod
+    def _response(body, status=200):
+        return {"status": status, "reason": "OK" if status == 200 else "Error",
+                "headers": [("content-type", "text/xml")], "body": ResponseReader(StringIO(body))}
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+class TestFuturesAndExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = binding.Executor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_gather_returns_results_in_submission_order(self):
+        # Each call, on a worker of its own, waits for the one submitted after it, so they finish in reverse order
+        events = [threading.Event() for _ in range(4)]
+        finished = []
+
+        def call(index):
+            if index + 1 < len(events):
+                events[index + 1].wait(5)
+            finished.append(index)
+            events[index].set()
+            return index * 10
+
+        futures = [self.executor.submit(call, i) for i in range(4)]
+        self.assertEqual([0, 10, 20, 30], binding.gather(futures, timeout=5))
+        self.assertEqual([3, 2, 1, 0], finished)
+
+    def test_result_reraises_the_exception_of_the_call(self):
+        future = self.executor.submit(_fail, "no octopus")
+        with self.assertRaises(ValueError) as context:
+            future.result(5)
+        self.assertEqual("no octopus", str(context.exception))
+        self.assertIs(context.exception, future.exception())
+
+        # The traceback is the one of the failed call
+        try:
+            future.result()
+        except ValueError:
+            self.assertIn("_fail", traceback.format_exc())
+        else:
+            self.fail("Expected ValueError")
+
+    def test_gather_raises_the_first_failure_after_all_have_finished(self):
+        release = threading.Event()
+        late = self.executor.submit(release.wait, 5)
+        futures = [self.executor.submit(lambda: 1), self.executor.submit(_fail, "first"),
+                   self.executor.submit(_fail, "second"), late]
+        threading.Timer(0.05, release.set).start()
+        with self.assertRaises(ValueError) as context:
+            binding.gather(futures, timeout=5)
+        self.assertEqual("first", str(context.exception))
+        self.assertTrue(all(future.done() for future in futures))
+
+    def test_result_timeout(self):
+        release = threading.Event()
+        future = self.executor.submit(release.wait, 5)
+        self.assertRaises(socket.timeout, future.result, 0.01)
+        release.set()
+        self.assertTrue(future.result(5))
+
+    def test_done_callbacks(self):
+        called = []
+        future = binding.Future()
+        future.add_done_callback(called.append)
+        self.assertEqual([], called)
+        future.set_result(1)
+        future.add_done_callback(called.append)
+        self.assertEqual([future, future], called)
+
+    def test_workers_are_bounded(self):
+        release = threading.Event()
+        futures = [self.executor.submit(release.wait, 5) for _ in range(10)]
+        self.assertEqual(4, len(self.executor._threads))
+        release.set()
+        self.assertEqual([True] * 10, binding.gather(futures, timeout=5))
+
+    def test_shutdown_runs_the_calls_already_submitted(self):
+        results = []
+        for i in range(10):
+            self.executor.submit(lambda i=i: time.sleep(0.001) or results.append(i))
+        self.executor.shutdown()
+        self.assertEqual(range(10), sorted(results))
+        self.assertFalse(any(thread.is_alive() for thread in self.executor._threads))
+        self.assertRaises(RuntimeError, self.executor.submit, lambda: None)
+
+
+class TestAsyncService(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = _Handler()
+        self.service = client.async_connect(
+            handler=self.handler, username="admin", password="changeme", owner="nobody", app="search",
+            max_workers=4)
+        self.addCleanup(self.service.close)
+
+    def test_async_connect_logs_in(self):
+        self.assertIsInstance(self.service, client.AsyncService)
+        self.assertEqual("Splunk key", self.service.token)
+
+    def test_gather_entities(self):
+        futures = [self.service.submit(client.Entity, self.service, "data/inputs/octopus/input-%d" % i)
+                   for i in range(8)]
+        entities = binding.gather(futures, timeout=5)
+        self.assertEqual([str(i) for i in range(8)], [entity.content.interval for entity in entities])
+        self.assertTrue(all(token == "Splunk key" for token in self.handler.tokens[1:]))
+
+        futures = [self.service.refresh_async(entity) for entity in reversed(entities)]
+        self.assertEqual(list(reversed(entities)), binding.gather(futures, timeout=5))
+
+    def test_failed_update_is_raised_by_result(self):
+        entity = client.Entity(self.service, "data/inputs/octopus/input-bad")
+        future = self.service.update_async(entity, interval=60)
+        with self.assertRaises(binding.HTTPError) as context:
+            future.result(5)
+        self.assertEqual(500, context.exception.status)
+
+    def test_close_shuts_the_executor_down(self):
+        self.service.close()
+        self.assertRaises(RuntimeError, self.service.get_async, "data/inputs/octopus/input-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
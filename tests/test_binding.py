@@ -0,0 +1,138 @@
+import socket
+import threading
+import unittest
+
+from splunklib import binding
+
+
+class _Server(object):
+    # A minimal HTTP/1.1 server on localhost that counts the connections it
+    # accepts. With close_after_response it closes each connection after one
+    # response without saying so, as a server dropping idle connections does.
+
+    def __init__(self, body="x" * 1000, close_after_response=False):
+        self.body = body
+        self.close_after_response = close_after_response
+        self.connections = 0
+        self.requests = []
+        self._socket = socket.socket()
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(8)
+        self.port = self._socket.getsockname()[1]
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def url(self, path="/"):
+        return "http://127.0.0.1:%d%s" % (self.port, path)
+
+    def close(self):
+        self._socket.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+        reader = connection.makefile("rb")
+        try:
+            while True:
+                request_line = reader.readline()
+                if not request_line:
+                    return
+                length = 0
+                while True:
+                    line = reader.readline()
+                    if line in ("\r\n", "\n", ""):
+                        break
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                reader.read(length)
+                self.requests.append(request_line.split()[0])
+                connection.sendall("HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(self.body), self.body))
+                if self.close_after_response:
+                    return
+        except socket.error:
+            # The client dropped the connection
+            pass
+        finally:
+            reader.close()
+            connection.close()
+
+
+def _message(method):
+    return {"method": method, "headers": [], "body": "a=b" if method == "POST" else ""}
+
+
+class TestPoolingHandler(unittest.TestCase):
+
+    def test_unread_responses_release_their_connection(self):
+        server = _Server()
+        self.addCleanup(server.close)
+        request = binding.pooling_handler()
+        self.addCleanup(request.clear)
+
+        for _ in range(5):
+            # The body is never read
+            request(server.url(), _message("POST"))
+        response = request(server.url(), _message("GET"))
+        self.assertEqual(server.body, response["body"].read())
+
+        self.assertEqual(1, server.connections)
+
+    def test_partly_read_response_is_drained_on_close(self):
+        server = _Server()
+        self.addCleanup(server.close)
+        request = binding.pooling_handler()
+        self.addCleanup(request.clear)
+
+        body = request(server.url(), _message("GET"))["body"]
+        self.assertEqual("x" * 10, body.read(10))
+        body.close()
+        request(server.url(), _message("GET"))["body"].read()
+
+        self.assertEqual(1, server.connections)
+
+    def test_long_response_closes_its_connection(self):
+        server = _Server(body="x" * (binding.ResponseReader.drain_limit + 1000))
+        self.addCleanup(server.close)
+        request = binding.pooling_handler()
+        self.addCleanup(request.clear)
+
+        request(server.url(), _message("GET"))["body"].close()
+        request(server.url(), _message("GET"))["body"].close()
+
+        self.assertEqual(2, server.connections)
+
+    def test_get_is_retried_on_a_stale_connection(self):
+        server = _Server(close_after_response=True)
+        self.addCleanup(server.close)
+        request = binding.pooling_handler()
+        self.addCleanup(request.clear)
+
+        request(server.url(), _message("GET"))["body"].read()
+        self.assertEqual(server.body, request(server.url(), _message("GET"))["body"].read())
+        self.assertEqual(2, server.connections)
+
+    def test_post_is_not_retried_on_a_stale_connection(self):
+        server = _Server(close_after_response=True)
+        self.addCleanup(server.close)
+        request = binding.pooling_handler()
+        self.addCleanup(request.clear)
+
+        request(server.url(), _message("POST"))["body"].read()
+        self.assertRaises((binding.httplib.HTTPException, socket.error), request, server.url(), _message("POST"))
+        self.assertEqual(["POST"], server.requests)
+        self.assertEqual(1, server.connections)
+
+
+if __name__ == "__main__":
+    unittest.main()
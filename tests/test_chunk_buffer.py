@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+from splunklib.searchcommands import Configuration, StreamingCommand
+from splunklib.searchcommands.internals import ChunkBuffer
+
+from tests import scp2
+
+
+class _Trickle(object):
+    # A file whose readinto returns at most size bytes at a time, as a pipe may
+
+    def __init__(self, data, size):
+        self.data = data
+        self.size = size
+        self.position = 0
+
+    def readinto(self, view):
+        data = self.data[self.position:self.position + min(self.size, len(view))]
+        view[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+@Configuration()
+class PassCommand(StreamingCommand):
+
+    def stream(self, records):
+        return records
+
+
+def _body(count):
+    return "n,text\r\n" + "".join("%d,%s\r\n" % (i, "x" * (i % 50)) for i in range(count))
+
+
+class TestChunkBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_short_reads_are_joined(self):
+        view = ChunkBuffer(16).read(_Trickle("abcdefghij" * 5, 7), 45)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual("abcdefghij" * 4 + "abcde", view.tobytes())
+
+    def test_end_of_file(self):
+        self.assertEqual("abc", ChunkBuffer(16).read(_Trickle("abc", 2), 10).tobytes())
+
+    def test_buffer_grows_and_keeps_earlier_views(self):
+        buffer = ChunkBuffer(4)
+        first = buffer.read(_Trickle("abc", 8), 3)
+        second = buffer.read(_Trickle("0123456789", 8), 10)
+        self.assertEqual("abc", first.tobytes())
+        self.assertEqual("0123456789", second.tobytes())
+
+    def test_file_without_readinto(self):
+        self.assertEqual("abc", ChunkBuffer().read(StringIO("abcdef"), 3))
+
+    def test_chunks_read_from_a_file(self):
+        # Bodies both smaller and larger than the buffer, an empty one between them, read through readinto
+        bodies = [_body(10), _body(2000), "", _body(7000), _body(3)]
+        self.assertGreater(len(bodies[3]), 65536)
+
+        path = os.path.join(self.directory, "input")
+        with open(path, "wb") as f:
+            f.write(scp2.command_input(bodies=bodies))
+
+        ofile = StringIO()
+        with open(path, "rb") as ifile:
+            PassCommand().process(["command.py"], ifile, ofile)
+
+        self.assertEqual(scp2.process(PassCommand(), bodies=bodies), ofile.getvalue())
+        chunks = scp2.output_chunks(ofile.getvalue())
+        self.assertEqual([10, 2000, 0, 7000, 3], [max(body.count("\r\n") - 1, 0) for _, body in chunks[1:]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import unittest
+import urlparse
+from StringIO import StringIO
+
+from splunklib import client
+from splunklib.binding import ResponseReader
+
+_PATH = "/servicesNS/nobody/search/data/inputs/octopus/deployments"
+
+_ATOM = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">
+  <title>octopus</title>
+  <entry>
+    <title>deployments</title>
+    <id>https://localhost:8089%(path)s</id>
+    <updated>2016-01-01T00:00:00+00:00</updated>
+    <link href="%(path)s" rel="alternate"/>
+    <link href="%(path)s" rel="list"/>
+    <link href="%(path)s/_reload" rel="_reload"/>
+    <content type="text/xml">
+      <s:dict>
+        <s:key name="disabled">0</s:key>
+        <s:key name="eai:acl">
+          <s:dict>
+            <s:key name="app">search</s:key>
+            <s:key name="can_write">1</s:key>
+            <s:key name="owner">nobody</s:key>
+            <s:key name="perms">
+              <s:dict>
+                <s:key name="read"><s:list><s:item>*</s:item></s:list></s:key>
+                <s:key name="write"><s:list><s:item>admin</s:item><s:item>power</s:item></s:list></s:key>
+              </s:dict>
+            </s:key>
+            <s:key name="sharing">app</s:key>
+          </s:dict>
+        </s:key>
+        <s:key name="eai:attributes">
+          <s:dict>
+            <s:key name="optionalFields"><s:list><s:item>interval</s:item><s:item>ratio</s:item></s:list></s:key>
+            <s:key name="requiredFields"><s:list><s:item>endpoint</s:item></s:list></s:key>
+            <s:key name="wildcardFields"><s:list/></s:key>
+          </s:dict>
+        </s:key>
+        <s:key name="endpoint">deployments</s:key>
+        <s:key name="host">octopus</s:key>
+        <s:key name="interval">60</s:key>
+        <s:key name="ratio">0.5</s:key>
+        <s:key name="retries">3</s:key>
+      </s:dict>
+    </content>
+  </entry>
+</feed>
+""" % {"path": _PATH}
+
+_JSON = json.dumps({"entry": [{
+    "name": "deployments",
+    "id": "https://localhost:8089" + _PATH,
+    "updated": "2016-01-01T00:00:00+00:00",
+    "links": {"alternate": _PATH, "list": _PATH, "_reload": _PATH + "/_reload"},
+    "acl": {"app": "search", "can_write": True, "owner": "nobody",
+            "perms": {"read": ["*"], "write": ["admin", "power"]}, "sharing": "app"},
+    "fields": {"required": ["endpoint"], "optional": ["interval", "ratio"], "wildcard": []},
+    "content": {"disabled": False, "endpoint": "deployments", "host": "octopus", "interval": 60.0, "ratio": 0.5,
+                "retries": 3, "eai:acl": None}}]})
+
+_EMPTY_ATOM = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>octopus</title></feed>
+"""
+
+
+class _Handler(object):
+    # Answers with the Atom or the JSON body, depending on the output mode asked for
+
+    def __init__(self, atom, json):
+        self.atom = atom
+        self.json = json
+
+    def __call__(self, url, message, **kwargs):
+        query = urlparse.parse_qs(urlparse.urlsplit(url).query)
+        if query.get("output_mode") == ["json"]:
+            content_type, body = "application/json", self.json
+        else:
+            content_type, body = "text/xml", self.atom
+        return {"status": 200, "reason": "OK", "headers": [("content-type", content_type)],
+                "body": ResponseReader(StringIO(body))}
+
+
+def _entity(output_mode, atom=_ATOM, json=_JSON):
+    service = client.Service(
+        handler=_Handler(atom, json), token="token", owner="nobody", app="search", output_mode=output_mode)
+    return client.Entity(service, "data/inputs/octopus/deployments")
+
+
+class TestEntityState(unittest.TestCase):
+
+    def test_atom_and_json_states_are_the_same(self):
+        atom = _entity("xml").state
+        json_state = _entity("json").state
+        self.assertEqual("60", atom.content.interval)
+        self.assertEqual(atom, json_state)
+
+    def test_no_entry(self):
+        for output_mode in "xml", "json":
+            with self.assertRaises(ValueError) as context:
+                _entity(output_mode, atom=_EMPTY_ATOM, json='{"entry": []}')
+            self.assertIn("returned no entry for", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
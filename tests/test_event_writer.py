@@ -0,0 +1,187 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from Queue import Full
+from StringIO import StringIO
+
+from splunklib.modularinput import Event, QueuedEventWriter, Scheme, Script
+from splunklib.modularinput.event_writer import SpillingEventWriter
+from splunklib.modularinput.spill_queue import SpillQueue
+
+_INPUT_DEFINITION = """<input>
+  <server_host>tiny</server_host>
+  <server_uri>https://127.0.0.1:8089</server_uri>
+  <checkpoint_dir>/tmp</checkpoint_dir>
+  <session_key>123102983109283019283</session_key>
+  <configuration>
+    <stanza name="foobar://aaa"><param name="param1">value1</param></stanza>
+  </configuration>
+</input>
+"""
+
+
+class FailingScript(Script):
+
+    def get_scheme(self):
+        return Scheme("failing")
+
+    def stream_events(self, inputs, ew):
+        for i in range(50):
+            event = Event()
+            event.stanza = "foobar://aaa"
+            event.data = "event %d" % i
+            ew.write_event(event)
+        raise RuntimeError("fetch failed")
+
+
+def _event(i):
+    event = Event()
+    event.stanza = "foobar://aaa"
+    event.data = "event %d" % i
+    return event
+
+
+class _GatedOutput(object):
+    # An output whose writes wait until it is opened, as stdout does while
+    # splunkd is not reading, and that records what was flushed
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.written = []
+        self.flushed = ""
+
+    def write(self, data):
+        self.gate.wait()
+        self.written.append(data)
+
+    def flush(self):
+        self.flushed = "".join(self.written)
+
+
+class _FailingOutput(object):
+
+    def write(self, data):
+        raise IOError("Broken pipe")
+
+    def flush(self):
+        pass
+
+
+class TestQueuedEventWriter(unittest.TestCase):
+
+    def _wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition():
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+
+    def test_write_event_blocks_when_the_queue_is_full(self):
+        output = _GatedOutput()
+        writer = QueuedEventWriter(output, StringIO(), maxsize=2)
+        self.addCleanup(output.gate.set)
+
+        # The writer thread waits on the output with the first event and the
+        # queue holds two more, so the producer has to wait for room
+        producer = threading.Thread(target=lambda: [writer.write_event(_event(i)) for i in range(4)])
+        producer.start()
+        self._wait_for(lambda: writer.queue_depth == 2)
+        time.sleep(0.1)
+        self.assertTrue(producer.is_alive())
+        self.assertTrue(writer.backpressure)
+
+        output.gate.set()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        writer.close()
+
+        self.assertEqual(4, "".join(output.written).count("<event"))
+        metrics = writer.metrics()
+        self.assertGreaterEqual(metrics["blocked_count"], 1)
+        self.assertGreater(metrics["blocked_time"], 0.05)
+        self.assertEqual(4, metrics["events_written"])
+
+    def test_write_event_timeout(self):
+        output = _GatedOutput()
+        writer = QueuedEventWriter(output, StringIO(), maxsize=1)
+        self.addCleanup(output.gate.set)
+
+        writer.write_event(_event(0))
+        self._wait_for(lambda: writer.queue_depth == 0)
+        writer.write_event(_event(1))
+        start = time.time()
+        self.assertRaises(Full, writer.write_event, _event(2), timeout=0.1)
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+        output.gate.set()
+        writer.close()
+        self.assertEqual(2, "".join(output.written).count("<event"))
+
+    def test_output_error_is_raised_by_close(self):
+        writer = QueuedEventWriter(_FailingOutput(), StringIO())
+        writer.write_event(_event(0))
+        with self.assertRaises(IOError):
+            writer.close()
+        self.assertRaises(IOError, writer.write_event, _event(1))
+
+    def test_callbacks_run_in_order_after_their_events_are_flushed(self):
+        output = _GatedOutput()
+        output.gate.set()
+        writer = QueuedEventWriter(output, StringIO())
+        calls = []
+
+        for i in range(3):
+            for j in range(5):
+                writer.write_event(_event(i * 5 + j))
+            writer.call_when_written(lambda i=i: calls.append((i, output.flushed.count("<event"))))
+        writer.close()
+
+        self.assertEqual([(0, 5), (1, 10), (2, 15)], calls)
+
+
+class TestSpillingEventWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spill_dir)
+
+    def test_events_are_written_when_stream_events_fails(self):
+        out, err = StringIO(), StringIO()
+        # A queue of 10 spills most of the events to disk
+        writer = SpillingEventWriter(out, err, maxsize=10, spill_dir=self.spill_dir)
+
+        self.assertEqual(1, FailingScript().run_script(["script"], writer, StringIO(_INPUT_DEFINITION)))
+
+        output = out.getvalue()
+        self.assertTrue(output.startswith("<stream>"))
+        self.assertTrue(output.endswith("</stream>"))
+        self.assertEqual(50, output.count("<event"))
+        self.assertIn("fetch failed", err.getvalue())
+        self.assertEqual([], os.listdir(self.spill_dir))
+
+    def test_stale_directories_are_removed(self):
+        # A process that has exited
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        stale = os.path.join(self.spill_dir, "spill-%d-abc" % process.pid)
+        os.mkdir(stale)
+        with open(os.path.join(stale, "00000000.seg"), "wb") as f:
+            f.write("x")
+        live = os.path.join(self.spill_dir, "spill-%d-def" % os.getppid())
+        os.mkdir(live)
+
+        queue = SpillQueue(self.spill_dir)
+        try:
+            self.assertFalse(os.path.exists(stale))
+            self.assertTrue(os.path.isdir(live))
+            self.assertTrue(os.path.basename(queue.directory).startswith("spill-%d-" % os.getpid()))
+        finally:
+            queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from StringIO import StringIO
+
+from splunklib.modularinput.input_definition import InputDefinition
+
+_INPUT_DEFINITION = """<?xml version="1.0" encoding="utf-8"?>
+<input>
+  <server_host>tiny</server_host>
+  <server_uri>https://127.0.0.1:8089</server_uri>
+  <checkpoint_dir>/opt/splunk/var/lib/splunk/modinputs</checkpoint_dir>
+  <session_key>123102983109283019283</session_key>
+  <configuration>
+    <stanza name="foobar://aaa">
+      <param name="param1">value1</param>
+      <param name="param2">value2</param>
+    </stanza>
+    <stanza name="foobar://bbb">
+      <param_list name="multiValue">
+        <value>value1</value>
+        <value>value2</value>
+      </param_list>
+    </stanza>
+  </configuration>
+</input>
+"""
+
+
+class TestInputDefinition(unittest.TestCase):
+
+    def test_iterparse_matches_parse(self):
+        expected = InputDefinition.parse(StringIO(_INPUT_DEFINITION))
+
+        definition = InputDefinition.iterparse(StringIO(_INPUT_DEFINITION))
+        self.assertEqual(expected.metadata, definition.metadata)
+        self.assertEqual(expected.inputs, dict(definition.iter_inputs()))
+
+    def test_iterparse_iterates_once(self):
+        definition = InputDefinition.iterparse(StringIO(_INPUT_DEFINITION))
+        self.assertEqual(2, len(list(definition.iter_inputs())))
+        self.assertRaises(ValueError, definition.iter_inputs)
+
+    def test_parse_iterates_again(self):
+        definition = InputDefinition.parse(StringIO(_INPUT_DEFINITION))
+        self.assertEqual(list(definition.iter_inputs()), list(definition.iter_inputs()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import re
+import unittest
+import urllib
+import urlparse
+from StringIO import StringIO
+
+from splunklib import client
+from splunklib.binding import ResponseReader
+
+# A data/inputs/all listing with a modular, a monitor, a splunktcp and a
+# script input, modelled on a splunkd 6.4 listing
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "inputs_all.xml")) as f:
+    _INPUTS_ALL = f.read()
+
+_HEAD, _, _ = _INPUTS_ALL.partition("  <entry>")
+_ENTRIES = re.findall(r"  <entry>.*?</entry>\n", _INPUTS_ALL, re.DOTALL)
+
+_KIND = """  <entry>
+    <title>%(title)s</title>
+    <link href="/servicesNS/nobody/search/data/inputs/%(path)s" rel="alternate"/>
+    <link href="/servicesNS/nobody/search/data/inputs/%(path)s" rel="list"/>%(create)s
+    <content type="text/xml"><s:dict/></content>
+  </entry>
+"""
+
+# The kinds of data/inputs: (path, whether inputs can be created there)
+_KINDS = [("all", False), ("monitor", True), ("octopus", True), ("script", True), ("tcp", False),
+          ("tcp/cooked", True), ("tcp/raw", True), ("tcp/ssl", False)]
+
+
+def _kind_feed(directory):
+    entries = []
+    for path, create in _KINDS:
+        if path.rpartition("/")[0] == directory:
+            entries.append(_KIND % {
+                "title": path.rpartition("/")[2], "path": path,
+                "create": '\n    <link href="/services/data/inputs/%s/_new" rel="create"/>' % path if create else ""})
+    return _HEAD + "".join(entries) + "</feed>\n"
+
+
+class _Handler(object):
+    # Serves data/inputs/all from the fixture, the kinds of data/inputs and,
+    # per kind, the fixture entries whose links are of that kind
+
+    def __init__(self, inputs_all=_INPUTS_ALL):
+        self.inputs_all = inputs_all
+        self.paths = []
+
+    def __call__(self, url, message, **kwargs):
+        path = urllib.unquote(urlparse.urlsplit(url).path)
+        path = path[path.index("/data/inputs") + len("/data/inputs"):].strip("/")
+        self.paths.append(path)
+        if path == "all":
+            body = self.inputs_all
+        elif path in ("", "tcp"):
+            body = _kind_feed(path)
+        else:
+            entries = [e for e in _ENTRIES if "/data/inputs/%s/" % path in urllib.unquote(e)]
+            body = _HEAD + "".join(entries) + "</feed>\n"
+        return {"status": 200, "reason": "OK", "headers": [("content-type", "text/xml")],
+                "body": ResponseReader(StringIO(body))}
+
+
+_EXPECTED = [
+    ("octopus", "deployments"),
+    ("monitor", "/var/log/octopus"),
+    ("tcp/cooked", "9997"),
+    ("script", "$SPLUNK_HOME/etc/apps/TA-octopus_deploy/bin/octopus_health.py")]
+
+
+class TestInputsBulkList(unittest.TestCase):
+
+    def _inputs(self, handler):
+        return client.Service(handler=handler, token="token", owner="nobody", app="search").inputs
+
+    def test_bulk_list(self):
+        handler = _Handler()
+        inputs = self._inputs(handler).list(bulk=True)
+        self.assertEqual(_EXPECTED, [(i.kind, i.name) for i in inputs])
+        self.assertEqual(["all"], handler.paths)
+        self.assertEqual("https://octopus.example.com", inputs[0].content.hostname)
+        self.assertEqual("/servicesNS/nobody/TA-octopus_deploy/data/inputs/octopus/deployments/", inputs[0].path)
+
+    def test_bulk_list_of_kinds(self):
+        inputs = self._inputs(_Handler()).list("splunktcp", "octopus", bulk=True)
+        self.assertEqual([("octopus", "deployments"), ("tcp/cooked", "9997")], [(i.kind, i.name) for i in inputs])
+
+    def test_bulk_list_matches_the_per_kind_list(self):
+        bulk = self._inputs(_Handler()).list(bulk=True)
+        per_kind = self._inputs(_Handler()).list()
+        self.assertEqual(sorted((i.kind, i.path) for i in per_kind), sorted((i.kind, i.path) for i in bulk))
+
+    def test_unresolved_link_falls_back_to_the_per_kind_list(self):
+        handler = _Handler(_INPUTS_ALL.replace(
+            'data/inputs/tcp/cooked/9997" rel="alternate"', 'data/inputs/all/splunktcp%3A9997" rel="alternate"'))
+        inputs = self._inputs(handler).list(bulk=True)
+        self.assertEqual(sorted(_EXPECTED), sorted((i.kind, i.name) for i in inputs))
+        self.assertEqual("all", handler.paths[0])
+        self.assertIn("tcp/cooked", handler.paths)
+
+    def test_unknown_kind_falls_back_to_the_per_kind_list(self):
+        service = client.Service(handler=_Handler(), token="token", owner="nobody", app="search")
+        service._input_kinds = ["monitor", "script", "tcp/cooked", "tcp/raw"]
+        inputs = service.inputs.list(bulk=True)
+        self.assertNotIn("octopus", [i.kind for i in inputs])
+        self.assertEqual(3, len(inputs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import csv
+import imp
+import json
+import os
+import unittest
+from StringIO import StringIO
+
+from splunklib.searchcommands.internals import RecordWriterV2
+
+octopus = imp.load_source("octopus_command", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin", "octopus.py"))
+
+_PAGES = [
+    {"Items": [
+        {"Id": "Tasks-1", "State": "Success"},
+        {"Id": "Tasks-2", "State": "Failed", "ErrorMessage": "Timed out"},
+        {"Id": "Tasks-3", "Duration": "5 seconds"}]},
+    {"Items": [
+        {"Id": "Tasks-4", "Name": "Deploy"}]},
+]
+
+
+class TestOctopusCommand(unittest.TestCase):
+
+    def setUp(self):
+        def iter_pages(*args):
+            for page in _PAGES:
+                yield page
+
+        stubs = {
+            "find_input": lambda service, endpoint: {"hostname": "https://octopus", "verify_ssl": "1"},
+            "get_api_key": lambda service, endpoint: "API-KEY",
+            "iter_pages": iter_pages}
+        for name, stub in stubs.iteritems():
+            self.addCleanup(setattr, octopus.octopus_api, name, getattr(octopus.octopus_api, name))
+            setattr(octopus.octopus_api, name, stub)
+
+    def _generate(self):
+        # Returns the records of each page, as they would be flushed
+        command = octopus.OctopusCommand()
+        command.endpoint = "tasks"
+        pages = [[]]
+        command.flush = lambda: pages.append([])
+        for record in command.generate():
+            pages[-1].append(record)
+        return [page for page in pages if page]
+
+    def test_records_of_a_page_share_their_fields(self):
+        pages = self._generate()
+
+        self.assertEqual(2, len(pages))
+        self.assertEqual(
+            [["_raw", "Duration", "ErrorMessage", "Id", "State"]] * 3,
+            [list(record) for record in pages[0]])
+        self.assertEqual([["_raw", "Id", "Name"]], [list(record) for record in pages[1]])
+
+        first = pages[0][0]
+        self.assertEqual({"Id": "Tasks-1", "State": "Success"}, json.loads(first["_raw"]))
+        self.assertEqual([None, None, "Tasks-1", "Success"], first.values()[1:])
+
+    def test_no_field_is_dropped_from_a_chunk(self):
+        ofile = StringIO()
+        writer = RecordWriterV2(ofile)
+        page = self._generate()[0]
+        writer.write_records(page)
+        writer.flush(finished=True)
+
+        output = ofile.getvalue()
+        body_length = int(output[:output.index("\n")].split(",")[2])
+        reader = csv.DictReader(StringIO(output[len(output) - body_length:]))
+        self.assertEqual(["_raw", "Duration", "ErrorMessage", "Id", "State"],
+                         [name for name in reader.fieldnames if not name.startswith("__mv_")])
+        records = list(reader)
+        self.assertEqual(["Timed out", "Tasks-2", "Failed"],
+                         [records[1][name] for name in ("ErrorMessage", "Id", "State")])
+        self.assertEqual("5 seconds", records[2]["Duration"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import hashlib
+import imp
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import octopus_api
+from splunklib.modularinput import EventWriter, SpillingEventWriter
+
+ta = imp.load_source("ta_octopus_deploy", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin", "TA-octopus_deploy.py"))
+
+_INPUT_DEFINITION = """<input>
+  <server_host>tiny</server_host>
+  <server_uri>https://127.0.0.1:8089</server_uri>
+  <checkpoint_dir>/tmp</checkpoint_dir>
+  <session_key>123102983109283019283</session_key>
+  <configuration>
+    <stanza name="octopus://deployments">
+      <param name="endpoint">deployments</param>
+      <param name="hostname">https://octopus</param>
+      <param name="verify_ssl">1</param>
+      <param name="api_key">%(api_key)s</param>
+      <param name="use_checkpoint">%(use_checkpoint)d</param>
+    </stanza>
+  </configuration>
+</input>
+"""
+
+_PAGES = [
+    {"Links": {"Page.Current": "/api/deployments?skip=0"},
+     "Items": [{"Id": "Deployments-5"}, {"Id": "Deployments-4"}]},
+    {"Links": {"Page.Current": "/api/deployments?skip=2"},
+     "Items": [{"Id": "Deployments-3"}, {"Id": "Deployments-2"}]},
+]
+
+
+class _RecordingEventWriter(EventWriter):
+
+    def __init__(self):
+        super(_RecordingEventWriter, self).__init__(StringIO(), StringIO())
+        self.events = []
+
+    def write_event(self, event):
+        self.events.append(json.loads(event.data)["Id"])
+
+
+class TestStreamEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.checkpoint_dir)
+        self.writer = _RecordingEventWriter()
+        self.logger = logging.getLogger("test_octopus_deploy")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logged = []
+        handler = logging.Handler()
+        handler.emit = lambda record: self.logged.append(record.getMessage())
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.fetched = []
+
+        def iter_pages(hostname, endpoint, api_key, verify_ssl):
+            self.assertEqual(("https://octopus", "deployments", "API-KEY"), (hostname, endpoint, api_key))
+            for page in _PAGES:
+                # Every earlier page has been written before the next one is fetched
+                self.fetched.append(list(self.writer.events))
+                yield page
+
+        stubs = [
+            (ta, "_CHECKPOINT_DIR", self.checkpoint_dir),
+            (ta, "setup_logging", lambda: self.logger),
+            (ta.OctopusDeploy, "get_password", lambda script, session_key, endpoint: "API-KEY"),
+            (octopus_api, "iter_pages", iter_pages)]
+        for owner, name, stub in stubs:
+            self.addCleanup(setattr, owner, name, getattr(owner, name))
+            setattr(owner, name, stub)
+
+    def _run(self, use_checkpoint, writer=None, api_key="&lt;nothing to see here&gt;", script=None):
+        script = script or ta.OctopusDeploy()
+        definition = _INPUT_DEFINITION % {"api_key": api_key, "use_checkpoint": use_checkpoint}
+        status = script.run_script(["TA-octopus_deploy.py"], writer or self.writer, StringIO(definition))
+        self.assertEqual(0, status)
+
+    def _masking_script(self, stored_api_key):
+        # Returns a script that records its calls to store and mask api_keys
+        # next to the pages fetched
+        calls = self.fetched
+        script = ta.OctopusDeploy()
+        script.stored_password = lambda session_key, endpoint: stored_api_key
+        script.encrypt_password = lambda endpoint, api_key, session_key: calls.append(("encrypt", endpoint, api_key))
+        script.mask_passwords = lambda session_key, masks: calls.append(("mask", masks))
+        return script
+
+    def test_pages_are_written_as_they_are_fetched(self):
+        self._run(0)
+        self.assertEqual(["Deployments-5", "Deployments-4", "Deployments-3", "Deployments-2"], self.writer.events)
+        self.assertEqual([[], ["Deployments-5", "Deployments-4"]], self.fetched)
+
+    def test_checkpoint(self):
+        checkpoint = hashlib.md5("octopus://deployments").hexdigest()
+        with open(os.path.join(self.checkpoint_dir, checkpoint), "w") as f:
+            f.write("3")
+
+        self._run(1)
+        self.assertEqual(["Deployments-5", "Deployments-4"], self.writer.events)
+        with open(os.path.join(self.checkpoint_dir, checkpoint)) as f:
+            self.assertEqual("5", f.read())
+
+    def test_new_api_key_is_masked_before_fetching(self):
+        self._run(0, api_key="CLEAR", script=self._masking_script(None))
+        self.assertEqual([
+            ("encrypt", "deployments", "CLEAR"),
+            ("mask", [("octopus://deployments", "deployments")]),
+            [], ["Deployments-5", "Deployments-4"]], self.fetched)
+
+    def test_stored_api_key_is_masked_after_all_inputs(self):
+        self._run(0, api_key="API-KEY", script=self._masking_script("API-KEY"))
+        self.assertEqual([
+            [], ["Deployments-5", "Deployments-4"],
+            ("mask", [("octopus://deployments", "deployments")])], self.fetched)
+
+    def test_event_writer_metrics_are_logged(self):
+        output = StringIO()
+        self._run(0, SpillingEventWriter(output, StringIO(), spill_dir=self.checkpoint_dir))
+        self.assertEqual(4, output.getvalue().count("<event"))
+        metrics = [message for message in self.logged if message.startswith("event writer after octopus://deployments")]
+        self.assertEqual(1, len(metrics))
+        self.assertIn("'blocked_time'", metrics[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import csv
+import json
+import unittest
+from StringIO import StringIO
+
+from splunklib.searchcommands import Configuration, ReportingCommand
+
+from tests import scp2
+
+# A chunk of the reduce phase that holds partial states from the map phase
+# and rows that did not pass through it, whose _partial field is empty
+_MIXED = '_partial,n\r\n"{""sum"":3}",\r\n,5\r\n"{""sum"":4}",\r\n,\r\n,7\r\n'
+
+
+class _Sum(object):
+    # Adds up n, counting the rows that have no n
+
+    def init(self):
+        return {"sum": 0, "rows": 0}
+
+    def merge(self, state, partial):
+        state["sum"] += partial["sum"]
+        return state
+
+    def finalize(self, state):
+        yield state
+
+
+@Configuration()
+class SumCommand(_Sum, ReportingCommand):
+
+    def update(self, state, record):
+        n = record.get("n")
+        if n:
+            state["sum"] += int(n)
+        state["rows"] += 1
+        return state
+
+
+@Configuration(columnar=True)
+class ColumnarSumCommand(_Sum, ReportingCommand):
+
+    def update(self, state, batch):
+        state["sum"] += sum(int(n) for n in batch["n"] if n)
+        state["rows"] += len(batch)
+        return state
+
+
+def _reduce(command, bodies):
+    output = scp2.process(command, ["phase=reduce"], bodies)
+    records = []
+    for metadata, body in scp2.output_chunks(output)[1:]:
+        if body:
+            records.extend(csv.DictReader(StringIO(body)))
+    return [(int(record["sum"]), int(record["rows"])) for record in records]
+
+
+class TestReportingCommand(unittest.TestCase):
+
+    def test_mixed_chunk(self):
+        self.assertEqual([(19, 3)], _reduce(SumCommand(), [_MIXED]))
+
+    def test_mixed_chunk_columnar(self):
+        self.assertEqual([(19, 3)], _reduce(ColumnarSumCommand(), [_MIXED]))
+
+    def test_rows_without_partials(self):
+        for command in SumCommand(), ColumnarSumCommand():
+            self.assertEqual([(12, 2)], _reduce(command, ["n\r\n5\r\n7\r\n"]))
+
+    def test_map_phase_sends_one_partial_per_chunk(self):
+        output = scp2.process(SumCommand(), ["phase=map"], ["n\r\n5\r\n7\r\n", "n\r\n1\r\n"])
+        partials = []
+        for metadata, body in scp2.output_chunks(output)[1:]:
+            partials.extend(record["_partial"] for record in csv.DictReader(StringIO(body)))
+        self.assertEqual([{"sum": 12, "rows": 2}, {"sum": 1, "rows": 1}], [json.loads(p) for p in partials])
+
+if __name__ == "__main__":
+    unittest.main()
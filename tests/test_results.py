@@ -0,0 +1,96 @@
+import json
+import unittest
+from StringIO import StringIO
+
+from splunklib import results
+
+
+class _Trickle(object):
+    # A stream whose read returns at most size characters at a time, as a
+    # response does
+
+    def __init__(self, data, size):
+        self.stream = StringIO(data)
+        self.size = size
+
+    def read(self, n=None):
+        return self.stream.read(self.size if n is None else min(n, self.size))
+
+
+# search/jobs/export writes one object per line, messages included
+_EXPORT = "\n".join(json.dumps(document) for document in [
+    {"preview": True, "offset": 0, "result": {"host": "octopus", "tags": ["deploy", "release"]}},
+    {"preview": True, "messages": [{"type": "INFO", "text": "Your timerange was substituted"}]},
+    {"preview": False, "offset": 0, "lastrow": True, "result": {"host": "octopus-2", "tags": "deploy"}}]) + "\n"
+
+# search/jobs/{search_id}/results writes a single object
+_RESULTS = json.dumps({
+    "preview": False, "init_offset": 0,
+    "messages": [{"type": "DEBUG", "text": "base lispy: [ AND ]"}],
+    "fields": [{"name": "host"}, {"name": "tags"}],
+    "results": [{"host": "octopus", "tags": ["deploy", "release"]}, {"host": "octopus-2", "tags": "deploy"}]})
+
+_CSV = '"host","tags"\r\noctopus,"deploy\nrelease"\r\n"octopus-2",deploy\r\n'
+
+
+class TestJSONResultsReader(unittest.TestCase):
+
+    def test_export(self):
+        reader = results.JSONResultsReader(StringIO(_EXPORT))
+        self.assertEqual(
+            [{"host": "octopus", "tags": ["deploy", "release"]},
+             results.Message("INFO", "Your timerange was substituted"),
+             {"host": "octopus-2", "tags": "deploy"}],
+            list(reader))
+        self.assertFalse(reader.is_preview)
+
+    def test_results(self):
+        reader = results.JSONResultsReader(StringIO(_RESULTS))
+        items = list(reader)
+        self.assertEqual(results.Message("DEBUG", "base lispy: [ AND ]"), items[0])
+        self.assertEqual(["deploy", "release"], items[1]["tags"])
+        self.assertEqual(["host", "tags"], items[1].keys())
+        self.assertIsInstance(items[1]["host"], str)
+        self.assertEqual(3, len(items))
+        self.assertFalse(reader.is_preview)
+
+    def test_empty_final_line(self):
+        for tail in "\n", "\r\n", "  \n", "":
+            self.assertEqual(3, len(list(results.JSONResultsReader(StringIO(_EXPORT + tail)))))
+        self.assertEqual(3, len(list(results.JSONResultsReader(StringIO(_EXPORT.rstrip("\n"))))))
+
+    def test_lines_across_reads(self):
+        self.assertEqual(
+            list(results.JSONResultsReader(StringIO(_EXPORT))),
+            list(results.JSONResultsReader(_Trickle(_EXPORT, 7))))
+
+    def test_empty_stream(self):
+        reader = results.JSONResultsReader(StringIO(""))
+        self.assertEqual([], list(reader))
+        self.assertIsNone(reader.is_preview)
+
+
+class TestCSVResultsReader(unittest.TestCase):
+
+    def test_results(self):
+        items = list(results.CSVResultsReader(StringIO(_CSV)))
+        self.assertEqual(
+            [{"host": "octopus", "tags": "deploy\nrelease"}, {"host": "octopus-2", "tags": "deploy"}], items)
+        self.assertEqual(["host", "tags"], items[0].keys())
+
+    def test_empty_final_line(self):
+        for tail in "\n", "\r\n":
+            self.assertEqual(2, len(list(results.CSVResultsReader(StringIO(_CSV + tail)))))
+        self.assertEqual(2, len(list(results.CSVResultsReader(StringIO(_CSV.rstrip("\r\n"))))))
+
+    def test_lines_across_reads(self):
+        self.assertEqual(
+            list(results.CSVResultsReader(StringIO(_CSV))), list(results.CSVResultsReader(_Trickle(_CSV, 5))))
+
+    def test_no_results(self):
+        self.assertEqual([], list(results.CSVResultsReader(StringIO('"host","tags"\r\n'))))
+        self.assertEqual([], list(results.CSVResultsReader(StringIO(""))))
+
+
+if __name__ == "__main__":
+    unittest.main()
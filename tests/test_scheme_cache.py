@@ -0,0 +1,69 @@
+import imp
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+ta = imp.load_source("ta_octopus_deploy", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin", "TA-octopus_deploy.py"))
+
+
+class TestSchemeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.checkpoint_dir)
+        self.checkpoint_dir_was = ta._CHECKPOINT_DIR
+        ta._CHECKPOINT_DIR = self.checkpoint_dir
+        self.addCleanup(setattr, ta, "_CHECKPOINT_DIR", self.checkpoint_dir_was)
+        self.script = ta.OctopusDeploy()
+        self.expected = ET.tostring(self.script.get_scheme().to_xml())
+
+    def test_cached_scheme_equals_scheme_xml(self):
+        path = self.script.scheme_cache_path()
+        self.assertEqual(self.checkpoint_dir, os.path.dirname(path))
+
+        self.assertEqual(self.expected, self.script.get_scheme_xml())
+        with open(path, "rb") as f:
+            self.assertEqual(self.expected, f.read())
+
+        def get_scheme():
+            self.fail("The cached scheme was not used")
+        self.script.get_scheme = get_scheme
+        self.assertEqual(self.expected, self.script.get_scheme_xml())
+
+    def test_other_versions_are_pruned(self):
+        for name in ("scheme-0.9.xml", "scheme-1.0.0.xml", "checkpoint"):
+            with open(os.path.join(self.checkpoint_dir, name), "wb") as f:
+                f.write("x")
+
+        path = self.script.scheme_cache_path()
+        self.script.get_scheme_xml()
+        self.assertEqual(sorted(["checkpoint", os.path.basename(path)]), sorted(os.listdir(self.checkpoint_dir)))
+
+    def test_missing_directory_is_created(self):
+        shutil.rmtree(self.checkpoint_dir)
+        self.assertEqual(self.expected, self.script.get_scheme_xml())
+        with open(self.script.scheme_cache_path(), "rb") as f:
+            self.assertEqual(self.expected, f.read())
+
+    def test_unwritable_cache(self):
+        # A file where the directory should be
+        shutil.rmtree(self.checkpoint_dir)
+        with open(self.checkpoint_dir, "wb") as f:
+            f.write("x")
+        try:
+            self.assertEqual(self.expected, self.script.get_scheme_xml())
+            self.assertEqual(self.expected, self.script.get_scheme_xml())
+        finally:
+            os.remove(self.checkpoint_dir)
+            os.mkdir(self.checkpoint_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
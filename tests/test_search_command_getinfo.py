@@ -0,0 +1,82 @@
+import imp
+import json
+import os
+import unittest
+from StringIO import StringIO
+
+from splunklib.searchcommands import Configuration, ReportingCommand, StreamingCommand
+
+octopuslookup = imp.load_source("octopuslookup_command", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin", "octopuslookup.py"))
+
+
+def _chunk(metadata):
+    metadata = json.dumps(metadata)
+    return "chunked 1.0,{},0\n{}".format(len(metadata), metadata)
+
+
+def getinfo(command, args=()):
+    # Returns the configuration a command reports to splunkd under SCP 2
+    searchinfo = {
+        "args": list(args), "raw_args": list(args), "dispatch_dir": os.path.dirname(os.path.abspath(__file__)),
+        "earliest_time": "0", "latest_time": "0", "search": "x", "app": "search", "splunkd_uri": None,
+        "maxresultrows": 10000, "sid": "1", "splunk_version": "6.5"}
+    ifile = StringIO(
+        _chunk({"action": "getinfo", "preview": False, "searchinfo": searchinfo}) +
+        _chunk({"action": "execute", "finished": True}))
+    ofile = StringIO()
+    command.process(["command.py"], ifile, ofile)
+
+    output = ofile.getvalue()
+    header, output = output.split("\n", 1)
+    return json.loads(output[:int(header.split(",")[1])])
+
+
+@Configuration()
+class DistributedCommand(StreamingCommand):
+    def stream(self, records):
+        return records
+
+
+@Configuration(distributed=False)
+class LocalCommand(StreamingCommand):
+    def stream(self, records):
+        return records
+
+
+@Configuration()
+class CountCommand(ReportingCommand):
+    def init(self):
+        return 0
+
+    def update(self, state, record):
+        return state + 1
+
+    def merge(self, state, partial):
+        return state + partial
+
+    def finalize(self, state):
+        yield {"count": state}
+
+
+class TestSearchCommandGetinfo(unittest.TestCase):
+
+    def test_distributed_streaming_command(self):
+        self.assertEqual("streaming", getinfo(DistributedCommand())["type"])
+
+    def test_local_streaming_command(self):
+        self.assertEqual("stateful", getinfo(LocalCommand())["type"])
+
+    def test_octopuslookup_runs_on_the_search_head(self):
+        info = getinfo(octopuslookup.OctopusLookupCommand(), ["endpoint=deployments"])
+        self.assertEqual("stateful", info["type"])
+        self.assertNotIn("distributed", info)
+
+    def test_reporting_command_map_phase_is_distributed(self):
+        self.assertEqual("streaming", getinfo(CountCommand(), ["phase=map"])["type"])
+
+    def test_reporting_command_reduce_phase(self):
+        self.assertEqual("reporting", getinfo(CountCommand(), ["phase=reduce"])["type"])
+
+if __name__ == "__main__":
+    unittest.main()
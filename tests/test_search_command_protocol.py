@@ -0,0 +1,117 @@
+import unittest
+
+from splunklib.searchcommands import Configuration, StreamingCommand
+from splunklib.searchcommands.internals import RecordBatch
+
+from tests import scp2
+
+
+class _Double(object):
+    # Adds double, twice n, to each record
+
+    def stream(self, records):
+        for record in records:
+            record["double"] = 2 * int(record["n"])
+            yield record
+
+
+class _ColumnarDouble(object):
+    # Adds double to each batch of records
+
+    def stream(self, batches):
+        for batch in batches:
+            batch["double"] = [2 * int(n) for n in batch["n"]]
+            yield batch
+
+
+@Configuration()
+class DoubleCommand(_Double, StreamingCommand):
+    pass
+
+
+@Configuration(pipelined=True)
+class PipelinedDoubleCommand(_Double, StreamingCommand):
+    pass
+
+
+@Configuration(columnar=True)
+class ColumnarDoubleCommand(_ColumnarDouble, StreamingCommand):
+    pass
+
+
+@Configuration(columnar=True, pipelined=True)
+class PipelinedColumnarDoubleCommand(_ColumnarDouble, StreamingCommand):
+    pass
+
+
+def _body(start, count):
+    # Every third row has a multi-value field
+    rows = ['%d,"a\nb",$a$;$b$\r\n' % i if i % 3 == 0 else "%d,x,\r\n" % i for i in range(start, start + count)]
+    return "n,tags,__mv_tags\r\n" + "".join(rows)
+
+
+# Chunks smaller than, the same size as, and twice the size of a batch of 1000
+# records, an empty one, and one that is split into two output chunks because
+# it holds more than maxresultrows (10000) records
+_BODIES = [_body(0, 5), _body(5, 1000), "", _body(1005, 2000), _body(3005, 10500), _body(13505, 1)]
+
+
+class TestProtocolV2(unittest.TestCase):
+
+    def setUp(self):
+        self.expected = scp2.process(DoubleCommand(), bodies=_BODIES)
+
+    def test_row_based_output(self):
+        chunks = scp2.output_chunks(self.expected)
+        self.assertEqual({"type": "streaming"}, chunks[0][0])
+        self.assertEqual(
+            [5, 1000, 0, 2000, 10000, 500, 1], [max(body.count("\r\n") - 1, 0) for _, body in chunks[1:]])
+        self.assertEqual(
+            [{"finished": False}] * 6 + [{"finished": True}], [metadata for metadata, _ in chunks[1:]])
+
+    def test_pipelined(self):
+        self.assertEqual(self.expected, scp2.process(PipelinedDoubleCommand(), bodies=_BODIES))
+
+    def test_pipelined_single_chunk(self):
+        for bodies in [_body(0, 1000)], [""]:
+            self.assertEqual(
+                scp2.process(DoubleCommand(), bodies=bodies), scp2.process(PipelinedDoubleCommand(), bodies=bodies))
+
+    def test_columnar(self):
+        self.assertEqual(self.expected, scp2.process(ColumnarDoubleCommand(), bodies=_BODIES))
+
+    def test_pipelined_columnar(self):
+        self.assertEqual(self.expected, scp2.process(PipelinedColumnarDoubleCommand(), bodies=_BODIES))
+
+
+class TestRecordBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = RecordBatch([("n", ["1", "2", "", "x"]), ("tags", ["a", ["b", "c"], "d", "e"])])
+
+    def test_records(self):
+        records = list(self.batch.records())
+        self.assertEqual(4, len(self.batch))
+        self.assertEqual(["n", "tags"], records[1].keys())
+        self.assertEqual(["2", ["b", "c"]], records[1].values())
+
+    def test_slice(self):
+        batch = self.batch.slice(1, 3)
+        self.assertEqual(2, len(batch))
+        self.assertEqual(["2", ""], batch["n"])
+        self.assertEqual(0, len(self.batch.slice(4, 4)))
+
+    def test_numeric(self):
+        values = list(self.batch.numeric("n"))
+        self.assertEqual([1.0, 2.0], values[:2])
+        self.assertTrue(all(value != value for value in values[2:]))  # NaN
+
+    def test_column_length(self):
+        with self.assertRaises(ValueError):
+            self.batch["double"] = [1, 2]
+        self.batch["n"] = [1, 2, 3, 4]
+        self.assertEqual([1, 2, 3, 4], self.batch["n"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import urlparse
+from StringIO import StringIO
+
+from splunklib import client
+from splunklib.binding import ResponseReader
+
+_ENTRY = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">
+  <title>octopus</title>
+  <entry>
+    <title>deployments</title>
+    <link href="/servicesNS/nobody/search/data/inputs/octopus/deployments" rel="alternate"/>
+    <content type="text/xml">
+      <s:dict>
+        <s:key name="eai:acl">
+          <s:dict>
+            <s:key name="app">search</s:key>
+            <s:key name="owner">nobody</s:key>
+            <s:key name="sharing">app</s:key>
+          </s:dict>
+        </s:key>
+        <s:key name="api_key">%s</s:key>
+      </s:dict>
+    </content>
+  </entry>
+</feed>
+"""
+
+
+class _Handler(object):
+    # Serves the deployments input, whose api_key is changed by a POST, and
+    # counts the requests by method
+
+    def __init__(self):
+        self.api_key = "clear"
+        self.requests = []
+
+    def __call__(self, url, message, **kwargs):
+        method = message["method"]
+        self.requests.append((method, urlparse.urlsplit(url).path))
+        if method == "POST" and message.get("body"):
+            self.api_key = urlparse.parse_qs(message["body"]).get("api_key", [self.api_key])[0]
+        return {"status": 200, "reason": "OK", "headers": [("content-type", "text/xml")],
+                "body": ResponseReader(StringIO(_ENTRY % self.api_key))}
+
+    @property
+    def gets(self):
+        return len([method for method, path in self.requests if method == "GET"])
+
+
+class TestStateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.addCleanup(setattr, client, "time", client.time)
+        client.time = lambda: self.now
+
+        self.handler = _Handler()
+        self.service = client.Service(
+            handler=self.handler, token="token", owner="nobody", app="search", state_cache_ttl=60)
+        self.entity = client.Entity(self.service, "data/inputs/octopus/deployments")
+        self.assertEqual(1, self.handler.gets)
+
+    def test_refresh_is_served_from_the_cache(self):
+        for _ in range(3):
+            self.assertEqual("clear", self.entity.refresh().content.api_key)
+        self.assertEqual(1, self.handler.gets)
+
+        # Another entity for the same path shares the state
+        client.Entity(self.service, "data/inputs/octopus/deployments")
+        self.assertEqual(1, self.handler.gets)
+
+    def test_expired_state_is_fetched_again(self):
+        self.now += 59
+        self.entity.refresh()
+        self.assertEqual(1, self.handler.gets)
+        self.now += 2
+        self.entity.refresh()
+        self.assertEqual(2, self.handler.gets)
+
+    def test_post_to_the_entity_invalidates_its_state(self):
+        self.service.post("data/inputs/octopus/deployments", api_key="masked")
+        self.assertEqual("masked", self.entity.refresh().content.api_key)
+        self.assertEqual(2, self.handler.gets)
+
+    def test_post_below_the_entity_invalidates_its_state(self):
+        self.service.post("data/inputs/octopus/deployments/disable")
+        self.entity.refresh()
+        self.assertEqual(2, self.handler.gets)
+
+    def test_delete_invalidates_the_state(self):
+        self.service.delete("/servicesNS/nobody/search/data/inputs/octopus/deployments")
+        self.entity.refresh()
+        self.assertEqual(2, self.handler.gets)
+
+    def test_other_posts_keep_the_state(self):
+        for path in "data/inputs/octopus", "data/inputs/octopus/deployments2", "storage/passwords":
+            self.service.post(path)
+        self.entity.refresh()
+        self.assertEqual(1, self.handler.gets)
+
+    def test_update_caches_the_state_it_returns(self):
+        self.entity.update(api_key="masked")
+        self.assertEqual("masked", self.entity.refresh().content.api_key)
+        self.assertEqual(1, self.handler.gets)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import urlparse
+from StringIO import StringIO
+
+from splunklib import client
+from splunklib.binding import ResponseReader
+
+_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">
+  <title>passwords</title>
+%s</feed>
+"""
+
+_ENTRY = """  <entry>
+    <title>%(realm)s:%(username)s:</title>
+    <id>https://localhost:8089/servicesNS/nobody/search/storage/passwords/%(realm)s%%3A%(username)s%%3A</id>
+    <link href="/servicesNS/nobody/search/storage/passwords/%(realm)s%%3A%(username)s%%3A" rel="alternate"/>
+    <content type="text/xml">
+      <s:dict>
+        <s:key name="clear_password">secret-%(username)s</s:key>
+        <s:key name="realm">%(realm)s</s:key>
+        <s:key name="username">%(username)s</s:key>
+      </s:dict>
+    </content>
+  </entry>
+"""
+
+
+class _Handler(object):
+    # Serves a storage/passwords listing. Like splunkd, a search argument
+    # matches a field loosely (here: as a substring).
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.queries = []
+
+    def __call__(self, url, message, **kwargs):
+        query = urlparse.parse_qs(urlparse.urlsplit(url).query)
+        self.queries.append(query)
+        credentials = self.credentials
+        for search in query.get("search", []):
+            field, _, value = search.partition("=")
+            credentials = [c for c in credentials if value in c[field]]
+        offset = int(query.get("offset", ["0"])[0])
+        count = int(query.get("count", ["30"])[0])
+        if count > 0:
+            credentials = credentials[offset:offset + count]
+        body = _FEED % "".join(_ENTRY % c for c in credentials)
+        return {"status": 200, "reason": "OK", "headers": [("content-type", "text/xml")],
+                "body": ResponseReader(StringIO(body))}
+
+
+class TestStoragePasswordsFind(unittest.TestCase):
+
+    def setUp(self):
+        credentials = [{"realm": "octopus", "username": "deployments-%d" % i} for i in range(250)]
+        credentials.insert(230, {"realm": "other", "username": "deployments"})
+        credentials.append({"realm": "octopus", "username": "deployments"})
+        self.handler = _Handler(credentials)
+        service = client.Service(handler=self.handler, token="token", owner="nobody", app="search")
+        self.storage_passwords = service.storage_passwords
+
+    def test_match_beyond_the_first_page(self):
+        found = self.storage_passwords.find(username="deployments")
+        self.assertEqual([("other", "deployments"), ("octopus", "deployments")],
+                         [(p.realm, p.username) for p in found])
+        self.assertTrue(len(self.handler.queries) > 1)
+
+    def test_a_single_search_term_is_sent(self):
+        found = self.storage_passwords.find(username="deployments", realm="octopus")
+        self.assertEqual([("octopus", "deployments")], [(p.realm, p.username) for p in found])
+        for query in self.handler.queries:
+            self.assertEqual(["username=deployments"], query["search"])
+
+    def test_realm_only(self):
+        found = self.storage_passwords.find(realm="other")
+        self.assertEqual([("other", "deployments")], [(p.realm, p.username) for p in found])
+        self.assertEqual(["realm=other"], self.handler.queries[0]["search"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import threading
+import unittest
+import urlparse
+from StringIO import StringIO
+
+from splunklib import client
+from splunklib.binding import HTTPError, ResponseReader
+
+_ENTRY = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">
+  <title>octopus</title>
+  <entry>
+    <title>%(name)s</title>
+    <link href="/servicesNS/nobody/search/data/inputs/octopus/%(name)s" rel="alternate"/>
+    <content type="text/xml">
+      <s:dict>
+        <s:key name="api_key">%(api_key)s</s:key>
+        <s:key name="eai:acl">
+          <s:dict>
+            <s:key name="app">search</s:key>
+            <s:key name="owner">nobody</s:key>
+            <s:key name="sharing">app</s:key>
+          </s:dict>
+        </s:key>
+      </s:dict>
+    </content>
+  </entry>
+</feed>
+"""
+
+_ERROR = """<?xml version="1.0" encoding="UTF-8"?>
+<response><messages><msg type="ERROR">Cannot write to %s</msg></messages></response>
+"""
+
+
+class _Handler(object):
+    # Serves octopus inputs; POSTs to the inputs named in failing fail
+
+    def __init__(self, failing):
+        self.failing = failing
+        self.api_keys = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, url, message, **kwargs):
+        name = urlparse.urlsplit(url).path.rstrip("/").rpartition("/")[2]
+        if message["method"] == "POST":
+            if name in self.failing:
+                return {"status": 500, "reason": "Internal Server Error", "headers": [],
+                        "body": ResponseReader(StringIO(_ERROR % name))}
+            with self.lock:
+                self.api_keys[name] = urlparse.parse_qs(message["body"])["api_key"][0]
+        body = _ENTRY % {"name": name, "api_key": self.api_keys.get(name, "clear")}
+        return {"status": 200, "reason": "OK", "headers": [("content-type", "text/xml")],
+                "body": ResponseReader(StringIO(body))}
+
+
+class TestUpdateEntities(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = _Handler(failing=set(["input-2", "input-5"]))
+        self.service = client.Service(handler=self.handler, token="token", owner="nobody", app="search")
+        self.entities = [client.Entity(self.service, "data/inputs/octopus/input-%d" % i) for i in range(8)]
+
+    def test_all_updates_succeed(self):
+        self.handler.failing.clear()
+        updated = self.service.update_entities(((e, {"api_key": "masked"}) for e in self.entities), refresh=True)
+        self.assertEqual(self.entities, updated)
+        self.assertEqual(["masked"] * 8, [e.content.api_key for e in updated])
+
+    def test_partial_failure_reports_the_failed_entities(self):
+        with self.assertRaises(client.BulkUpdateError) as context:
+            self.service.update_entities((e, {"api_key": "masked"}) for e in self.entities)
+        error = context.exception
+
+        self.assertEqual([self.entities[2], self.entities[5]], [entity for entity, _ in error.errors])
+        for _, cause in error.errors:
+            self.assertIsInstance(cause, HTTPError)
+            self.assertEqual(500, cause.status)
+        self.assertEqual([e for i, e in enumerate(self.entities) if i not in (2, 5)], error.updated)
+        self.assertIn("2 of 8 updates failed", str(error))
+        self.assertIn("input-2", str(error))
+
+        # Every other update was still applied
+        self.assertEqual(
+            sorted("input-%d" % i for i in range(8) if i not in (2, 5)), sorted(self.handler.api_keys))
+
+
+if __name__ == "__main__":
+    unittest.main()